@@ -4,6 +4,7 @@ from lux.components.core import LevelObject
 from lux.components.control import ControlPoint
 from lux.components.player import Player
 from lux.components.sprite import Sprite
+from lux.components.light import LightSource, Mirror, Filter, Portal
 
 __all__ = (
     'get_component_map',
@@ -11,7 +12,11 @@ __all__ = (
     'LevelObject',
     'ControlPoint',
     'Player',
-    'Sprite'
+    'Sprite',
+    'LightSource',
+    'Mirror',
+    'Filter',
+    'Portal'
 )
 
 def get_component_map() -> dict[str, type[Component]]:
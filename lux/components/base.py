@@ -8,17 +8,9 @@ class Resolvable(Protocol):
         ...
 
 
-class Component:
-    def __init__(self, UUID: int):
-        self._change_listeners: dict[str, set[Callable[[Component, str, Any], None]]] = {} # MAKE SURE THIS ISN'T LEAKING MEMORY ANYWHERE!!!!
-        self.UUID: int = UUID
-
-    def serialise(self) -> dict[str, Any]:
-        raise NotImplementedError()
-
-    @classmethod
-    def deserialise(cls, data: dict) -> tuple[Component, tuple[Resolvable, ...]]:
-        raise NotImplementedError()
+class Listenable:
+    def __init__(self):
+        self._change_listeners: dict[str, set[Callable[[Listenable, str, Any], None]]] = {} # MAKE SURE THIS ISN'T LEAKING MEMORY ANYWHERE!!!!
 
     # Change listeners for the systems that care about batching (looking at you sprite renderers)
     # They are attribute specific because idk maybe a system only cares about position?
@@ -45,3 +37,22 @@ class Component:
         callbacks = self._change_listeners.get(key, ())
         for callback in callbacks:
             callback(self, key, value)
+
+    def __getstate__(self):
+        # The listeners belong to whoever is listening, so a copy (or pickle) starts without any.
+        state = self.__dict__.copy()
+        state['_change_listeners'] = {}
+        return state
+
+
+class Component(Listenable):
+    def __init__(self, UUID: int):
+        super().__init__()
+        self.UUID: int = UUID
+
+    def serialise(self) -> dict[str, Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def deserialise(cls, data: dict) -> tuple[Component, tuple[Resolvable, ...]]:
+        raise NotImplementedError()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from typing import TypedDict
+
+from lux.components.base import Component, Resolvable
+from lux.components.core import LevelObject
+
+from util.uuid_ref import UUIDRef
+
+
+LightSourceDict = TypedDict(
+    'LightSourceDict',
+    {
+        'UUID': int,
+        'parent': int,
+        'width': float,
+        'length': float
+    }
+)
+
+
+class LightSource(Component):
+    """
+    A beam of light coming out of the parent's origin in its direction, in the parent's colour.
+    """
+
+    def __init__(self, UUID: int, parent: UUIDRef[LevelObject], width: float, length: float):
+        super().__init__(UUID)
+        self.parent: UUIDRef[LevelObject] = parent
+        self.width: float = width
+        self.length: float = length
+
+    def serialise(self) -> LightSourceDict:
+        return {
+            'UUID': self.UUID,
+            'parent': self.parent.value,
+            'width': self.width,
+            'length': self.length
+        }
+
+    @classmethod
+    def deserialise(cls, data: LightSourceDict) -> tuple[LightSource, tuple[Resolvable, ...]]:
+        parent = UUIDRef(data['parent'])
+        return cls(data['UUID'], parent, data['width'], data['length']), (parent,)
+
+
+InteractorDict = TypedDict(
+    'InteractorDict',
+    {
+        'UUID': int,
+        'parent': int,
+        'height': float
+    }
+)
+
+
+class Mirror(Component):
+    """
+    A flat mirror of the given height centred on the parent, facing along the parent's direction.
+    Only reflects the colours of the parent.
+    """
+
+    def __init__(self, UUID: int, parent: UUIDRef[LevelObject], height: float):
+        super().__init__(UUID)
+        self.parent: UUIDRef[LevelObject] = parent
+        self.height: float = height
+
+    def serialise(self) -> InteractorDict:
+        return {
+            'UUID': self.UUID,
+            'parent': self.parent.value,
+            'height': self.height
+        }
+
+    @classmethod
+    def deserialise(cls, data: InteractorDict) -> tuple[Mirror, tuple[Resolvable, ...]]:
+        parent = UUIDRef(data['parent'])
+        return cls(data['UUID'], parent, data['height']), (parent,)
+
+
+class Filter(Component):
+    """
+    A flat filter of the given height centred on the parent, which only lets the parent's colours through.
+    """
+
+    def __init__(self, UUID: int, parent: UUIDRef[LevelObject], height: float):
+        super().__init__(UUID)
+        self.parent: UUIDRef[LevelObject] = parent
+        self.height: float = height
+
+    def serialise(self) -> InteractorDict:
+        return {
+            'UUID': self.UUID,
+            'parent': self.parent.value,
+            'height': self.height
+        }
+
+    @classmethod
+    def deserialise(cls, data: InteractorDict) -> tuple[Filter, tuple[Resolvable, ...]]:
+        parent = UUIDRef(data['parent'])
+        return cls(data['UUID'], parent, data['height']), (parent,)
+
+
+PortalDict = TypedDict(
+    'PortalDict',
+    {
+        'UUID': int,
+        'parent': int,
+        'height': float,
+        'sibling': int
+    }
+)
+
+
+class Portal(Component):
+    """
+    One end of a pair of portals, light going into this one comes out of the sibling.
+    Both ends of the pair have to name each other as the sibling.
+    """
+
+    def __init__(self, UUID: int, parent: UUIDRef[LevelObject], height: float, sibling: UUIDRef[Portal]):
+        super().__init__(UUID)
+        self.parent: UUIDRef[LevelObject] = parent
+        self.height: float = height
+        self.sibling: UUIDRef[Portal] = sibling
+
+    def serialise(self) -> PortalDict:
+        return {
+            'UUID': self.UUID,
+            'parent': self.parent.value,
+            'height': self.height,
+            'sibling': self.sibling.value
+        }
+
+    @classmethod
+    def deserialise(cls, data: PortalDict) -> tuple[Portal, tuple[Resolvable, ...]]:
+        parent = UUIDRef(data['parent'])
+        sibling = UUIDRef(data['sibling'])
+        return cls(data['UUID'], parent, data['height'], sibling), (parent, sibling)
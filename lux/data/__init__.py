@@ -1,4 +1,5 @@
 import importlib.resources as pkg_resources
+import numpy as np
 from PIL import Image
 from tomlkit import parse, dumps, TOMLDocument
 
@@ -19,6 +20,8 @@ __all__ = (
     'save_config',
     'get_level_data',
     'save_level_data',
+    'get_baked_lighting',
+    'save_baked_lighting',
     'load_font',
     'get_shader',
     'get_music',
@@ -89,4 +92,18 @@ def save_level_data(name: str, data: TOMLDocument):
     level_name = f"{name}.toml"
     with pkg_resources.path(levels, level_name) as path:
         with open(path, 'w') as level_file:
-            level_file.write(dumps(data))
\ No newline at end of file
+            level_file.write(dumps(data))
+
+
+def get_baked_lighting(name: str) -> dict[str, np.ndarray]:
+    lighting_name = f"{name}.lighting.npz"
+    with pkg_resources.path(levels, lighting_name) as path:
+        with np.load(path, allow_pickle=False) as lighting_file:
+            return dict(lighting_file)
+
+
+def save_baked_lighting(name: str, arrays: dict[str, np.ndarray]):
+    lighting_name = f"{name}.lighting.npz"
+    with pkg_resources.path(levels, lighting_name) as path:
+        with open(path, 'wb') as lighting_file:
+            np.savez_compressed(lighting_file, **arrays)
@@ -0,0 +1,12 @@
+#version 330
+
+in vec4 vs_colour;
+in float vs_strength;
+
+out vec4 fs_colour;
+
+void main() {
+    // Once the light has run out there is nothing to draw.
+    if (vs_strength < 0.0) discard;
+    fs_colour = vs_colour;
+}
@@ -0,0 +1,159 @@
+"""
+Baked lighting, the beams of light sources which can't change saved next to the level data.
+
+Most puzzles have fixed light sources and only a few things that can be moved, so most of the beams come out the
+same every time. bake_lighting solves each light source once, and keeps the ones whose beams don't reach anything
+movable. At runtime a baked light source is just copied into the tree, and it only has to be solved again once
+something which has moved overlaps its beams (see BakedLighting.overlaps).
+
+Everything is kept as BeamTree arrays so the bake can be saved with numpy, without pickling anything.
+"""
+from __future__ import annotations
+from logging import getLogger
+from typing import Iterable, TYPE_CHECKING
+
+import numpy as np
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
+from lux.depreciated.engine.interactors import RayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.tree import BeamTree, LEFT, RIGHT
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.batched import EdgeBatch
+    from lux.depreciated.engine.broadphase import UniformGrid, LayeredBroadphase
+
+logger = getLogger("lux")
+
+__all__ = (
+    "BakedLighting",
+    "bake_lighting"
+)
+
+# The BeamTree arrays which are saved, in the order they are stored.
+_TREE_ARRAYS = ('source', 'direction', 'length', 'strength', 'colour', 'origin', 'heading', 'kind', 'truncated',
+                'parent', 'first_child', 'next_sibling')
+
+# How close something has to get to a baked beam to count as overlapping it. Beams which hit an interactor
+# end exactly on its edge, so this has to be more than nothing.
+_PADDING = 0.01
+
+
+def _get_beam_bounds(tree: BeamTree, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+    # The corners of each beam are the two sources and the two ends. A beam with no end, going straight
+    # along an axis, works out as nan on the other axis which fmin and fmax ignore.
+    source = tree.source[start:stop]
+    with np.errstate(invalid='ignore'):
+        end = source + tree.direction[start:stop] * tree.length[start:stop, :, None]
+    corners = (source[:, LEFT], source[:, RIGHT], end[:, LEFT], end[:, RIGHT])
+
+    low, high = corners[0].copy(), corners[0].copy()
+    for corner in corners[1:]:
+        np.fmin(low, corner, out=low)
+        np.fmax(high, corner, out=high)
+    return low - _PADDING, high + _PADDING
+
+
+def _any_overlap(beam_low: np.ndarray, beam_high: np.ndarray, low: Vec2, high: Vec2) -> bool:
+    return bool(np.any(
+        (beam_low[:, 0] <= high.x) & (low.x <= beam_high[:, 0]) &
+        (beam_low[:, 1] <= high.y) & (low.y <= beam_high[:, 1])
+    ))
+
+
+class BakedLighting:
+    """
+    The baked beams of every light source that could be baked, all in one BeamTree.
+    Each light source (by the UUID of its LightSource component) owns a contiguous run of the tree.
+
+    The digest is whatever the bake was made from, so a bake of a level which has since been edited can be spotted.
+    """
+    __slots__ = (
+        "digest",
+        "tree",
+        "_ranges",
+        "_low",
+        "_high"
+    )
+
+    def __init__(self, digest: str, tree: BeamTree, ranges: dict[int, tuple[int, int]]):
+        self.digest: str = digest
+        self.tree: BeamTree = tree
+        self._ranges: dict[int, tuple[int, int]] = ranges
+        self._low, self._high = _get_beam_bounds(tree, 0, len(tree))
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def __contains__(self, light: int):
+        return light in self._ranges
+
+    @property
+    def lights(self) -> tuple[int, ...]:
+        return tuple(self._ranges)
+
+    def overlaps(self, light: int, low: Vec2, high: Vec2) -> bool:
+        """
+        Whether the axis aligned box from low to high touches any of the baked beams of the light source.
+        """
+        start, stop = self._ranges[light]
+        return _any_overlap(self._low[start:stop], self._high[start:stop], low, high)
+
+    def copy_into(self, tree: BeamTree, light: int):
+        """
+        Add the baked beams of the light source to the tree, as if it had been solved into it.
+        """
+        start, stop = self._ranges[light]
+        tree.extend(self.tree, start, stop)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        count = len(self.tree)
+        arrays = {name: getattr(self.tree, name)[:count] for name in _TREE_ARRAYS}
+        arrays['digest'] = np.array(self.digest)
+        arrays['lights'] = np.array([(light, start, stop) for light, (start, stop) in self._ranges.items()], dtype=np.int64).reshape(-1, 3)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> BakedLighting:
+        missing = [name for name in _TREE_ARRAYS + ('digest', 'lights') if name not in arrays]
+        if missing:
+            raise ValueError(f"The baked lighting is missing {', '.join(missing)}")
+
+        count = len(arrays['kind'])
+        tree = BeamTree(max(count, 1))
+        for name in _TREE_ARRAYS:
+            getattr(tree, name)[:count] = arrays[name]
+        tree._count = count
+
+        ranges = {int(light): (int(start), int(stop)) for light, start, stop in arrays['lights']}
+        return cls(str(arrays['digest']), tree, ranges)
+
+
+def bake_lighting(digest: str, interactors: tuple[RayInteractor, ...], sources: Iterable[tuple[int, BeamLightRay]],
+                  movable: tuple[RayInteractor, ...] = (), edge_batch: EdgeBatch = None,
+                  broadphase: UniformGrid | LayeredBroadphase = None,
+                  guard: PropagationGuard | None = DEFAULT_GUARD) -> BakedLighting:
+    """
+    Solve every (light UUID, beam) of sources, and bake the ones whose beams don't overlap any of the movable interactors.
+    The light sources which can move themselves shouldn't be passed in at all.
+    """
+    baked = BeamTree()
+    scratch = BeamTree()
+    ranges: dict[int, tuple[int, int]] = dict()
+    movable_bounds = tuple(interactor.world_aabb for interactor in movable)
+
+    for light, beam in sources:
+        scratch.clear()
+        propogate_beam_into(scratch, interactors, beam, edge_batch=edge_batch, broadphase=broadphase, guard=guard)
+
+        low, high = _get_beam_bounds(scratch, 0, len(scratch))
+        if any(_any_overlap(low, high, m_low, m_high) for m_low, m_high in movable_bounds):
+            logger.debug(f"light source {light} reaches something movable, it won't be baked")
+            continue
+
+        start = baked.extend(scratch)
+        ranges[light] = (start, len(baked))
+
+    return BakedLighting(digest, baked, ranges)
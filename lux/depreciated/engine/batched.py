@@ -0,0 +1,342 @@
+from __future__ import annotations
+from math import sin, cos
+from typing import TYPE_CHECKING
+
+import numpy as np
+from pyglet.math import Vec2
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.registry import EdgeRegistry
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
+
+
+class EdgeBatch:
+    """
+    Every edge of every interactor packed into contiguous float arrays so the broad phase of
+    find_beam_edge_map can run over the whole edge set at once rather than one edge at a time.
+
+    The world space positions are only correct as of the last call to refresh, so call it once per
+    solve (or whenever an interactor moves) rather than rebuilding the whole batch.
+    Interactors in `static` never move, so their edges are put in world space once here and refresh skips them.
+    """
+
+    def __init__(self, interactors: tuple[RayInteractor, ...], static: tuple[RayInteractor, ...] = ()):
+        self.interactors: tuple[RayInteractor, ...] = tuple(interactors)
+
+        edges = tuple((idx, edge) for idx, interactor in enumerate(self.interactors) for edge in interactor.bounds)
+        count = len(edges)
+
+        # The edges of each interactor are contiguous, so we only need to know where they start.
+        self._interactor_index: dict[RayInteractor, int] = {interactor: idx for idx, interactor in enumerate(self.interactors)}
+        self._edge_offsets: list[int] = [0]
+        for interactor in self.interactors:
+            self._edge_offsets.append(self._edge_offsets[-1] + len(interactor.bounds))
+
+        self.edges: tuple[RayInteractorEdge, ...] = tuple(edge for _, edge in edges)
+        self.owner: np.ndarray = np.fromiter((idx for idx, _ in edges), dtype=np.intp, count=count)
+        self.bi_dir: np.ndarray = np.fromiter((edge.bi_dir for edge in self.edges), dtype=np.bool_, count=count)
+
+        # The local space edges, these never change.
+        self.local_start: np.ndarray = np.array([(edge.start.x, edge.start.y) for edge in self.edges], dtype=np.float64).reshape(count, 2)
+        self.local_end: np.ndarray = np.array([(edge.end.x, edge.end.y) for edge in self.edges], dtype=np.float64).reshape(count, 2)
+        self.local_direction: np.ndarray = np.array([(edge.direction.x, edge.direction.y) for edge in self.edges], dtype=np.float64).reshape(count, 2)
+
+        # The world space edges, these are updated by refresh.
+        self.start: np.ndarray = np.empty((count, 2), dtype=np.float64)
+        self.end: np.ndarray = np.empty((count, 2), dtype=np.float64)
+
+        # Which interactors (and which of their edges) refresh has to move. A slice when nothing is static
+        # so the common case doesn't pay for fancy indexing.
+        static = set(static)
+        self._dynamic: tuple[int, ...] = tuple(idx for idx, interactor in enumerate(self.interactors) if interactor not in static)
+        if len(self._dynamic) == len(self.interactors):
+            self._dynamic_rows: slice | np.ndarray = slice(None)
+        else:
+            self._dynamic_rows = np.flatnonzero(np.isin(self.owner, self._dynamic))
+
+        self._transform(range(len(self.interactors)), slice(None))
+
+    def __len__(self):
+        return len(self.edges)
+
+    def edge_indices(self, interactors: tuple[RayInteractor, ...]) -> np.ndarray:
+        """
+        Get the index of every edge which belongs to one of the interactors, in the order they appear in the batch.
+        """
+        offsets = self._edge_offsets
+        owners = sorted(self._interactor_index[interactor] for interactor in interactors)
+        if not owners:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([np.arange(offsets[idx], offsets[idx + 1], dtype=np.intp) for idx in owners])
+
+    def refresh(self):
+        self._transform(self._dynamic, self._dynamic_rows)
+
+    def _transform(self, interactors, rows: slice | np.ndarray):
+        # The sin and cos are found with the math module per interactor, so the rotation matches Vec2.rotate exactly.
+        count = len(self.interactors)
+        origins = np.zeros((count, 2), dtype=np.float64)
+        rotations = np.zeros((count, 2), dtype=np.float64)
+        for idx in interactors:
+            interactor = self.interactors[idx]
+            heading = interactor.direction.heading
+            origins[idx] = interactor.origin.x, interactor.origin.y
+            rotations[idx] = sin(heading), cos(heading)
+
+        owner = self.owner[rows]
+        origin = origins[owner]
+        s = rotations[owner, 0]
+        c = rotations[owner, 1]
+
+        for local, world in ((self.local_start, self.start), (self.local_end, self.end)):
+            x, y = local[rows, 0], local[rows, 1]
+            world[rows, 0] = origin[:, 0] + (c * x - s * y)
+            world[rows, 1] = origin[:, 1] + (s * x + c * y)
+
+
+def _cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+
+def _segment_intersection_fraction(px, py, rx, ry, q: Vec2, q_e: Vec2):
+    # The same maths as get_segment_intersection_fraction, but over every edge at once.
+    # Misses and parallel edges are returned as nan.
+    sx, sy = q_e.x - q.x, q_e.y - q.y
+    qpx, qpy = q.x - px, q.y - py
+
+    direction_interaction = _cross(rx, ry, sx, sy)
+    t = _cross(qpx, qpy, sx, sy) / direction_interaction
+    u = _cross(qpx, qpy, rx, ry) / direction_interaction
+
+    hit = (direction_interaction != 0.0) & (0.0 <= u) & (u <= 1.0) & (0.0 <= t) & (t <= 1.0)
+    return np.where(hit, t, np.nan)
+
+
+def find_beam_edge_map_batched(batch: EdgeBatch, parent,
+                               left_source, left_sink,
+                               right_source, right_sink,
+                               beam_dir, beam_normal,
+                               origin_dir, origin_normal,
+                               edge_indices: np.ndarray = None,
+                               registry: EdgeRegistry = None, pool: LightPool = None) -> tuple[dict[RayInteractorEdge, RayInteractor], list[tuple[Vec2, float, Vec2, RayInteractorEdge | int]]]:
+    """
+    The batched version of find_beam_edge_map. Gives exactly the same edge_to_interactor_map and edge_points,
+    but every test is done as a single array operation over the whole EdgeBatch. It keeps the hidden edges
+    find_beam_edge_map skips, they can't change the output and finding them costs more than testing them here.
+
+    If edge_indices is given only those edges of the batch are considered, e.g. the candidates from a broad phase.
+    If a registry is given the edges are registered with it rather than put in the map, like find_beam_edge_map.
+    """
+    edge_to_interactor_map = dict()
+    edge_points = []
+
+    if edge_indices is None:
+        start, end, local_direction = batch.start, batch.end, batch.local_direction
+    else:
+        start, end, local_direction = batch.start[edge_indices], batch.end[edge_indices], batch.local_direction[edge_indices]
+
+    if not len(start):
+        return edge_to_interactor_map, edge_points
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sx, sy = start[:, 0], start[:, 1]
+        ex, ey = end[:, 0], end[:, 1]
+        dx, dy = ex - sx, ey - sy
+
+        # Pre-calc some diffs that are used for bounds checking.
+        start_left_x, start_left_y = sx - left_sink.x, sy - left_sink.y
+        end_left_x, end_left_y = ex - left_sink.x, ey - left_sink.y
+        start_right_x, start_right_y = sx - right_source.x, sy - right_source.y
+        end_right_x, end_right_y = ex - right_source.x, ey - right_source.y
+
+        start_right_origin = start_right_x * origin_dir.x + start_right_y * origin_dir.y
+        end_right_origin = end_right_x * origin_dir.x + end_right_y * origin_dir.y
+        start_left_beam = start_left_x * beam_dir.x + start_left_y * beam_dir.y
+        end_left_beam = end_left_x * beam_dir.x + end_left_y * beam_dir.y
+
+        # First the edge aligns with the beam, second the edge is behind the beam, third the edge is ahead of the beam.
+        aligned = np.abs(local_direction[:, 0] * beam_dir.x + local_direction[:, 1] * beam_dir.y) == 1.0
+        behind = (start_right_origin <= 0.00001) & (end_right_origin <= 0.00001)
+        ahead = (start_left_beam >= -0.0001) & (end_left_beam >= -0.00001)
+        considered = ~(aligned | behind | ahead)
+
+        is_start_in_beam = ((start_right_origin >= -0.0001) & (start_left_beam <= 0.0001) &
+                            ((start_left_x * beam_normal.x + start_left_y * beam_normal.y >= -0.0001) ==
+                             (start_right_x * beam_normal.x + start_right_y * beam_normal.y <= 0.0001)))
+        is_end_in_beam = ((end_right_origin >= -0.0001) & (end_left_beam <= 0.0001) &
+                          ((end_left_x * beam_normal.x + end_left_y * beam_normal.y >= -0.0001) ==
+                           (end_right_x * beam_normal.x + end_right_y * beam_normal.y <= 0.0001)))
+        both_in_beam = is_start_in_beam & is_end_in_beam
+
+        # Fourth through seventh, the right, left, base, and end of the beam. In the same order as the scalar version
+        # so ties in the fraction are broken the same way.
+        fractions = np.stack((
+            _segment_intersection_fraction(sx, sy, dx, dy, right_source, right_sink),
+            _segment_intersection_fraction(sx, sy, dx, dy, left_source, left_sink),
+            _segment_intersection_fraction(sx, sy, dx, dy, right_source, left_source),
+            _segment_intersection_fraction(sx, sy, dx, dy, right_sink, left_sink),
+        ), axis=1)
+        hits = ~np.isnan(fractions)
+        hit_count = hits.sum(axis=1)
+        rows = np.arange(len(start))
+
+        first = np.argmin(np.where(hits, fractions, np.inf), axis=1)
+        last = 3 - np.argmax(np.where(hits, fractions, -np.inf)[:, ::-1], axis=1)
+        first_fraction = fractions[rows, first]
+        last_fraction = fractions[rows, last]
+
+        first_x, first_y = sx + dx * first_fraction, sy + dy * first_fraction
+        last_x, last_y = sx + dx * last_fraction, sy + dy * last_fraction
+
+        # With one intersection the point inside the beam is kept, otherwise the edge is clipped on both ends.
+        single = hit_count == 1
+        keep_start = both_in_beam | (single & is_start_in_beam)
+        keep_end = both_in_beam | (single & ~is_start_in_beam)
+
+        start_final_x = np.where(keep_start, sx, first_x)
+        start_final_y = np.where(keep_start, sy, first_y)
+        end_final_x = np.where(keep_end, ex, np.where(single, first_x, last_x))
+        end_final_y = np.where(keep_end, ey, np.where(single, first_y, last_y))
+        end_index = np.where(single, first, last)
+
+        final_diff_x, final_diff_y = start_final_x - end_final_x, start_final_y - end_final_y
+        clipped = ~both_in_beam & (hit_count > 0) & (final_diff_x * final_diff_x + final_diff_y * final_diff_y >= 0.0001)
+        kept = considered & (both_in_beam | clipped)
+
+        counters = instrument.COUNTERS
+        if counters is not None:
+            # Same early outs as find_beam_edge_map, each edge is only counted against the first one it fails.
+            not_aligned = ~aligned
+            not_behind = not_aligned & ~behind
+            outside = considered & ~both_in_beam & (hit_count == 0)
+            counters.edges_considered += len(start)
+            counters.culled_aligned += int(aligned.sum())
+            counters.culled_behind += int((not_aligned & behind).sum())
+            counters.culled_ahead += int((not_behind & ahead).sum())
+            counters.culled_outside += int(outside.sum())
+            counters.culled_degenerate += int((considered & ~both_in_beam & ~outside & ~clipped).sum())
+            counters.intersections += 4 * len(start)
+
+        # Find the intersection with the front of the beam. Edges fully inside the beam project along the beam onto
+        # the front, while clipped edges reuse the beam edge they were clipped against when there is one.
+        in_beam_divisor = _cross(beam_dir.x, beam_dir.y, origin_normal.x, origin_normal.y)
+        clipped_divisor = _cross(origin_normal.x, origin_normal.y, beam_dir.x, beam_dir.y)
+
+        def _front_intersection(final_x, final_y, index, kept_point):
+            in_beam_t = _cross(right_source.x - final_x, right_source.y - final_y, origin_normal.x, origin_normal.y) / in_beam_divisor
+            clipped_t = _cross(final_x - right_source.x, final_y - right_source.y, beam_dir.x, beam_dir.y) / clipped_divisor
+
+            x = np.where(both_in_beam, final_x + beam_dir.x * in_beam_t, right_source.x + origin_normal.x * clipped_t)
+            y = np.where(both_in_beam, final_y + beam_dir.y * in_beam_t, right_source.y + origin_normal.y * clipped_t)
+
+            reuse = ~both_in_beam & ~kept_point
+            x = np.where(reuse & (index == 0), right_source.x, np.where(reuse & (index == 1), left_source.x, np.where(reuse & (index == 2), final_x, x)))
+            y = np.where(reuse & (index == 0), right_source.y, np.where(reuse & (index == 1), left_source.y, np.where(reuse & (index == 2), final_y, y)))
+            return x, y
+
+        start_intersection_x, start_intersection_y = _front_intersection(start_final_x, start_final_y, first, keep_start)
+        end_intersection_x, end_intersection_y = _front_intersection(end_final_x, end_final_y, end_index, keep_end)
+
+        start_diff_x, start_diff_y = start_final_x - start_intersection_x, start_final_y - start_intersection_y
+        end_diff_x, end_diff_y = end_final_x - end_intersection_x, end_final_y - end_intersection_y
+        start_depth = start_diff_x * start_diff_x + start_diff_y * start_diff_y
+        end_depth = end_diff_x * end_diff_x + end_diff_y * end_diff_y
+
+    # Only the surviving edges are turned back into python objects. tolist gives python floats so the
+    # edges hash the same as the ones made by the scalar version.
+    kept_idx = np.flatnonzero(kept)
+    batch_idx = kept_idx if edge_indices is None else edge_indices[kept_idx]
+    columns = (start_final_x, start_final_y, end_final_x, end_final_y,
+               start_intersection_x, start_intersection_y, end_intersection_x, end_intersection_y,
+               start_depth, end_depth)
+    kept_values = zip(batch_idx.tolist(), *(column[kept_idx].tolist() for column in columns))
+
+    interactors = batch.interactors
+    edges = batch.edges
+    owner = batch.owner.tolist()
+    for idx, s_x, s_y, e_x, e_y, si_x, si_y, ei_x, ei_y, s_depth, e_depth in kept_values:
+        start_final = Vec2(s_x, s_y)
+        end_final = Vec2(e_x, e_y)
+
+        if pool is None:
+            edge_final = RayInteractorEdge(start_final, end_final, edges[idx].bi_dir)
+        else:
+            edge_final = pool.edge(start_final, end_final, edges[idx].bi_dir)
+        if registry is None:
+            edge_to_interactor_map[edge_final] = interactors[owner[idx]]
+        else:
+            edge_final = registry.register(edge_final, interactors[owner[idx]])
+
+        edge_points.append((start_final, s_depth, Vec2(si_x, si_y), edge_final))
+        edge_points.append((end_final, e_depth, Vec2(ei_x, ei_y), edge_final))
+
+    return edge_to_interactor_map, edge_points
+
+
+# How many ray-edge pairs are tested at once, so casting lots of rays against lots of edges doesn't blow up memory.
+_CAST_CHUNK_SIZE = 1 << 20
+
+
+def cast_rays_batched(batch: EdgeBatch, sources: np.ndarray, directions: np.ndarray, lengths: np.ndarray,
+                      edge_indices: np.ndarray = None) -> list[tuple[Vec2, RayInteractorEdge, RayInteractor] | None]:
+    """
+    The batched version of Ray.calculate_ray_interaction for many rays at once. sources and directions are (N, 2),
+    lengths is (N,). Gives the same closest hit point, edge, and interactor (or None) for each ray,
+    but every ray is tested against every edge of the batch in one go.
+
+    If edge_indices is given only those edges of the batch are considered, e.g. the candidates from a broad phase.
+    """
+    sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 2)
+    lengths = np.asarray(lengths, dtype=np.float64).reshape(-1)
+    ray_count = len(sources)
+    if len(directions) != ray_count or len(lengths) != ray_count:
+        raise ValueError("Every ray needs a source, direction, and length")
+
+    results: list[tuple[Vec2, RayInteractorEdge, RayInteractor] | None] = [None] * ray_count
+
+    if edge_indices is None:
+        edge_indices = np.arange(len(batch), dtype=np.intp)
+    if not ray_count or not len(edge_indices):
+        return results
+
+    # Edges along the columns, rays down the rows.
+    qx, qy = batch.start[edge_indices, 0][None, :], batch.start[edge_indices, 1][None, :]
+    sx, sy = batch.end[edge_indices, 0][None, :] - qx, batch.end[edge_indices, 1][None, :] - qy
+
+    # Same as the scalar version, the ray is the segment from its source to where it ends.
+    ends = sources + directions * lengths[:, None]
+    deltas = ends - sources
+
+    chunk = max(1, _CAST_CHUNK_SIZE // len(edge_indices))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for first in range(0, ray_count, chunk):
+            px, py = sources[first:first + chunk, 0][:, None], sources[first:first + chunk, 1][:, None]
+            rx, ry = deltas[first:first + chunk, 0][:, None], deltas[first:first + chunk, 1][:, None]
+            qpx, qpy = qx - px, qy - py
+
+            direction_interaction = _cross(rx, ry, sx, sy)
+            t = _cross(qpx, qpy, sx, sy) / direction_interaction
+            u = _cross(qpx, qpy, rx, ry) / direction_interaction
+            hit = (direction_interaction != 0.0) & (0.0 <= u) & (u <= 1.0) & (0.0 <= t) & (t <= 1.0)
+
+            hit_x, hit_y = px + rx * t, py + ry * t
+            diff_x, diff_y = hit_x - px, hit_y - py
+            dist = np.where(hit, diff_x * diff_x + diff_y * diff_y, np.inf)
+
+            # argmin takes the first of any equally close edges, just like the heap's insertion count does.
+            closest = np.argmin(dist, axis=1)
+            rows = np.arange(len(closest))
+            for row in np.flatnonzero(hit[rows, closest]):
+                column = closest[row]
+                edge_idx = edge_indices[column]
+                results[first + row] = (
+                    Vec2(float(hit_x[row, column]), float(hit_y[row, column])),
+                    batch.edges[edge_idx],
+                    batch.interactors[batch.owner[edge_idx]]
+                )
+
+    return results
@@ -0,0 +1,281 @@
+"""
+Timings for the beam engine. Run with `python -m lux.depreciated.engine.benchmark`.
+
+By default every scene in SCENES is generated at each size and propogate_beam, find_intersections, and
+BeamLightRay._propagate are timed on it, and the results are written out as JSON. The scenes are made from a
+fixed seed, so runs from different commits can be compared directly. See `--help` for the options.
+"""
+from __future__ import annotations
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from math import ceil, sqrt
+from random import Random
+from time import perf_counter
+from typing import Callable
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge, MirrorRayInteractor, FilterRayInteractor, PortalRayInteractor
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import find_intersections, propogate_beam
+from lux.depreciated.engine.sweep import ActiveEdges, OrderedActiveEdges
+from lux.util.colour import LuxColour
+
+SEED = 0
+SIZES = (16, 64, 256)
+REPEATS = 5
+
+
+def make_stacked_walls(count: int, width: float = 1000.0, depth: float = 2000.0, seed: int = 0) -> tuple[MirrorRayInteractor, ...]:
+    """
+    Walls across a beam going right, overlapping each other so the sweep is inside of lots of them at once.
+    """
+    rng = Random(seed)
+    walls = []
+    for _ in range(count):
+        height = rng.uniform(0.2, 1.0) * width
+        centre = rng.uniform(-(width - height) / 2.0, (width - height) / 2.0)
+        walls.append(MirrorRayInteractor(height, Vec2(rng.uniform(10.0, depth - 10.0), centre), Vec2(1.0, 0.0), LuxColour.WHITE))
+    return tuple(walls)
+
+
+def make_nested_walls(count: int, width: float = 1000.0, depth: float = 2000.0) -> tuple[MirrorRayInteractor, ...]:
+    """
+    Walls across a beam going right where each wall is wider than the one in front of it, so every wall ending
+    means finding the next nearest edge. The worst case for the sweep.
+    """
+    step = 1.0 / (count + 1)
+    return tuple(
+        MirrorRayInteractor(width * step * (idx + 1), Vec2(10.0 + (depth - 20.0) * step * (idx + 1), 0.0), Vec2(1.0, 0.0), LuxColour.WHITE)
+        for idx in range(count)
+    )
+
+
+def make_beam(width: float = 1000.0, depth: float = 2000.0) -> BeamLightRay:
+    return BeamLightRay(
+        LuxColour.WHITE,
+        Ray(Vec2(0.0, width / 2.0), Vec2(1.0, 0.0), depth, depth),
+        Ray(Vec2(0.0, -width / 2.0), Vec2(1.0, 0.0), depth, depth)
+    )
+
+
+def make_mirror_grid(count: int, width: float = 1000.0, depth: float = 2000.0, seed: int = SEED) -> tuple[MirrorRayInteractor, ...]:
+    """
+    Mirrors on a grid filling the beam, each turned a random amount, so light bounces all over the place.
+    """
+    rng = Random(seed)
+    side = ceil(sqrt(count))
+    step_x, step_y = depth / (side + 1), width / (side + 1)
+    return tuple(
+        MirrorRayInteractor(
+            min(step_x, step_y) * 0.6,
+            Vec2(step_x * (idx % side + 1), step_y * (idx // side + 1) - width / 2.0),
+            Vec2(1.0, 0.0).rotate(rng.uniform(0.0, 6.283185307179586)),
+            LuxColour.WHITE
+        )
+        for idx in range(count)
+    )
+
+
+def make_portal_pairs(count: int, width: float = 1000.0, depth: float = 2000.0, seed: int = SEED) -> tuple[PortalRayInteractor, ...]:
+    """
+    Pairs of portals thrown randomly into the beam, count is the number of portals so an odd one is left out.
+    """
+    rng = Random(seed)
+    height = width / max(4.0, sqrt(count))
+    portals = []
+    for _ in range(count // 2):
+        portals.extend(PortalRayInteractor.create_pair(
+            height, LuxColour.WHITE,
+            Vec2(rng.uniform(0.1, 0.9) * depth, rng.uniform(-0.4, 0.4) * width), Vec2(1.0, 0.0).rotate(rng.uniform(2.0, 4.2)),
+            Vec2(rng.uniform(0.1, 0.9) * depth, rng.uniform(-0.4, 0.4) * width), Vec2(1.0, 0.0).rotate(rng.uniform(0.0, 6.283185307179586))
+        ))
+    return tuple(portals)
+
+
+def make_filter_stack(count: int, width: float = 1000.0, depth: float = 2000.0, seed: int = SEED) -> tuple[FilterRayInteractor, ...]:
+    """
+    Filters across the beam one after the other, each a little shorter and tilted so the beam gets cut up as it goes.
+    The colours cycle through everything but black so the light doesn't just stop at the first one.
+    """
+    rng = Random(seed)
+    colours = (LuxColour.WHITE, LuxColour.YELLOW, LuxColour.CYAN, LuxColour.MAGENTA, LuxColour.RED, LuxColour.GREEN, LuxColour.BLUE)
+    step = depth / (count + 1)
+    filters = []
+    for idx in range(count):
+        height = width * rng.uniform(0.5, 1.2)
+        bounds = (RayInteractorEdge(Vec2(0.0, -height / 2.0), Vec2(0.0, height / 2.0), True),)
+        filters.append(FilterRayInteractor(
+            Vec2(step * (idx + 1), rng.uniform(-0.2, 0.2) * width),
+            Vec2(1.0, 0.0).rotate(rng.uniform(-0.5, 0.5)),
+            colours[idx % len(colours)],
+            bounds
+        ))
+    return tuple(filters)
+
+
+def make_maze(count: int, width: float = 1000.0, depth: float = 2000.0, seed: int = SEED) -> tuple[MirrorRayInteractor, ...]:
+    """
+    Walls along the lines of a grid with random gaps, like a maze. Most of the walls are black so they stop the light,
+    a quarter are mirrors.
+    """
+    rng = Random(seed)
+    side = ceil(sqrt(count))
+    step_x, step_y = depth / side, width / side
+    walls = []
+    for idx in range(count):
+        x, y = idx % side, idx // side
+        colour = LuxColour.WHITE if rng.random() < 0.25 else LuxColour.BLACK
+        if rng.random() < 0.5:
+            origin, direction, height = Vec2(step_x * (x + 1), step_y * (y + 0.5) - width / 2.0), Vec2(1.0, 0.0), step_y
+        else:
+            origin, direction, height = Vec2(step_x * (x + 0.5), step_y * (y + 1) - width / 2.0), Vec2(0.0, 1.0), step_x
+        walls.append(MirrorRayInteractor(height * rng.uniform(0.6, 0.95), origin, direction, colour))
+    return tuple(walls)
+
+
+SCENES: dict[str, Callable[[int, float, float, int], tuple[RayInteractor, ...]]] = {
+    "stacked": make_stacked_walls,
+    "mirror_grid": make_mirror_grid,
+    "portal_pairs": make_portal_pairs,
+    "filter_stack": make_filter_stack,
+    "maze": make_maze
+}
+
+
+def _time(function: Callable[[], int], repeats: int) -> dict:
+    """
+    Time function over the repeats with the EngineCounters on, so the edges tested come from the timed runs rather
+    than another one. Every run does the same work, so only the last run's count is kept. Edges of interactors
+    thrown away by their bounding circle were never tested so they aren't counted.
+    """
+    timings = []
+    beams = 0
+    counters = instrument.enable_counters()
+    try:
+        for _ in range(repeats):
+            counters.reset()
+            start = perf_counter()
+            beams = function()
+            timings.append((perf_counter() - start) * 1000.0)
+        edges_tested = counters.edges_considered
+    finally:
+        instrument.disable_counters()
+    return {"best_ms": min(timings), "mean_ms": sum(timings) / len(timings), "beams": beams, "edges_tested": edges_tested}
+
+
+def _count_tree(beams) -> int:
+    count = 0
+    to_count = list(beams)
+    while to_count:
+        beam = to_count.pop()
+        to_count.extend(beam.children)
+        count += 1
+    return count
+
+
+def benchmark_scene(name: str, size: int, seed: int = SEED, repeats: int = REPEATS,
+                    width: float = 1000.0, depth: float = 2000.0) -> list[dict]:
+    """
+    Time propogate_beam, find_intersections, and BeamLightRay._propagate on one generated scene.
+    Returns one result per function. If the engine fails on the scene the error is recorded instead of the times,
+    the result has no timings so the scene is skipped for that function.
+    """
+    interactors = SCENES[name](size, width, depth, seed)
+    edge_count = sum(len(interactor.bounds) for interactor in interactors)
+    edge_map = {edge: interactor for interactor in interactors for edge in interactor.world_bounds}
+
+    def run_propagate():
+        return _count_tree(propogate_beam(interactors, make_beam(width, depth)))
+
+    def run_find():
+        return len(find_intersections(interactors, make_beam(width, depth))[0])
+
+    def run_old_propagate():
+        return len(make_beam(width, depth)._propagate(edge_map))
+
+    results = []
+    for function, run in (("propogate_beam", run_propagate), ("find_intersections", run_find), ("BeamLightRay._propagate", run_old_propagate)):
+        result = {"scene": name, "size": size, "edges": edge_count, "function": function}
+        try:
+            result.update(_time(run, repeats))
+        except Exception as e:
+            # Anything timed up to the failure is thrown away, so a scene the engine can't solve is skipped
+            # rather than reported with the time it took to fall over.
+            result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+            continue
+        if function == "BeamLightRay._propagate":
+            # The old engine doesn't count anything, and it tests every edge against the beam.
+            result["edges_tested"] = edge_count
+        results.append(result)
+    return results
+
+
+def benchmark_corpus(scenes: tuple[str, ...] = tuple(SCENES), sizes: tuple[int, ...] = SIZES,
+                     seed: int = SEED, repeats: int = REPEATS) -> dict:
+    results = [result for name in scenes for size in sizes for result in benchmark_scene(name, size, seed, repeats)]
+    return {
+        "seed": seed,
+        "repeats": repeats,
+        "python": platform.python_version(),
+        # Which functions couldn't solve which scenes, so a missing timing isn't mistaken for a fast one.
+        "skipped": [f"{result['function']} on {result['scene']} {result['size']}: {result['error']}" for result in results if "error" in result],
+        "results": results
+    }
+
+
+def benchmark_sweep(make_walls=make_stacked_walls, sizes: tuple[int, ...] = (16, 64, 256, 1024), repeats: int = 5) -> list[tuple[int, float, float]]:
+    """
+    Time find_intersections with the unordered and ordered active edges. Returns (walls, unordered ms, ordered ms)
+    using the best of the repeats.
+    """
+    results = []
+    for size in sizes:
+        walls = make_walls(size)
+        timings = []
+        for active_edges_type in (ActiveEdges, OrderedActiveEdges):
+            best = float('inf')
+            for _ in range(repeats):
+                beam = make_beam()
+                start = perf_counter()
+                find_intersections(walls, beam, active_edges_type=active_edges_type)
+                best = min(best, perf_counter() - start)
+            timings.append(best * 1000.0)
+        results.append((size, timings[0], timings[1]))
+    return results
+
+
+def main(args: list[str] | None = None):
+    parser = ArgumentParser(prog="python -m lux.depreciated.engine.benchmark", description="Time the beam engine on generated scenes.")
+    parser.add_argument("--scenes", nargs="+", choices=tuple(SCENES), default=tuple(SCENES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", "-o", help="Where to write the JSON, defaults to stdout.")
+    parser.add_argument("--sweep", action="store_true", help="Compare the active edge types in find_intersections instead.")
+    options = parser.parse_args(args)
+
+    if options.sweep:
+        for name, make_walls in (("stacked", make_stacked_walls), ("nested", make_nested_walls)):
+            print(f"find_intersections active edges, {name} walls")
+            print(f"{'walls':>8} {'unordered':>12} {'ordered':>12}")
+            for size, unordered, ordered in benchmark_sweep(make_walls):
+                print(f"{size:>8} {unordered:>10.2f}ms {ordered:>10.2f}ms")
+        return
+
+    corpus = benchmark_corpus(tuple(options.scenes), tuple(options.sizes), options.seed, options.repeats)
+    if options.output is None:
+        json.dump(corpus, sys.stdout, indent=2)
+        print()
+    else:
+        with open(options.output, "w") as file:
+            json.dump(corpus, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from math import floor
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import RayInteractor
+
+# The edge tests in find_beam_edge_map have a little tolerance, so the bounds are padded to match.
+_PADDING = 0.001
+
+
+def get_interactor_aabb(interactor: RayInteractor) -> tuple[Vec2, Vec2]:
+    """
+    Find the world space axis aligned bounding box of every edge of an interactor.
+    """
+    return interactor.world_aabb
+
+
+class UniformGrid:
+    """
+    A broad phase over the bounds of every interactor, so a beam or ray only has to test the edges of the
+    interactors it could possibly touch.
+
+    Static interactors are inserted once and never looked at again. Dynamic interactors listen for changes
+    to their origin or direction and are refit into the grid whenever either is set.
+    """
+
+    def __init__(self, cell_size: float = 128.0):
+        if cell_size <= 0.0:
+            raise ValueError("The cell size of a UniformGrid has to be positive")
+
+        self.cell_size: float = cell_size
+
+        self._cells: dict[tuple[int, int], set[RayInteractor]] = dict()
+        self._interactor_cells: dict[RayInteractor, tuple[tuple[int, int], ...]] = dict()
+
+        # The order the interactors were inserted in. Queries are returned in this order so the edges of a beam
+        # are always processed in the same order as if every interactor had been tested.
+        self._insertion_order: dict[RayInteractor, int] = dict()
+        self._next_order: int = 0
+
+        self._dynamic: set[RayInteractor] = set()
+
+    def __len__(self):
+        return len(self._interactor_cells)
+
+    def __contains__(self, interactor: RayInteractor):
+        return interactor in self._interactor_cells
+
+    def _cell_range(self, low: Vec2, high: Vec2) -> tuple[int, int, int, int]:
+        return (
+            floor(low.x / self.cell_size), floor(low.y / self.cell_size),
+            floor(high.x / self.cell_size), floor(high.y / self.cell_size)
+        )
+
+    def _place(self, interactor: RayInteractor):
+        low, high = get_interactor_aabb(interactor)
+        low, high = low - Vec2(_PADDING, _PADDING), high + Vec2(_PADDING, _PADDING)
+        min_x, min_y, max_x, max_y = self._cell_range(low, high)
+
+        cells = tuple((x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+        for cell in cells:
+            if cell not in self._cells:
+                self._cells[cell] = set()
+            self._cells[cell].add(interactor)
+
+        self._interactor_cells[interactor] = cells
+
+    def _displace(self, interactor: RayInteractor):
+        for cell in self._interactor_cells.pop(interactor):
+            occupants = self._cells[cell]
+            occupants.discard(interactor)
+            if not occupants:
+                self._cells.pop(cell)
+
+    def insert(self, interactor: RayInteractor, static: bool = False):
+        if interactor in self._interactor_cells:
+            raise ValueError(f"{interactor} is already in the grid")
+
+        self._insertion_order[interactor] = self._next_order
+        self._next_order += 1
+
+        self._place(interactor)
+
+        if not static:
+            self._dynamic.add(interactor)
+            interactor.add_listeners(('origin', 'direction'), self._on_interactor_moved)
+
+    def extend(self, interactors: tuple[RayInteractor, ...], static: bool = False):
+        for interactor in interactors:
+            self.insert(interactor, static)
+
+    def remove(self, interactor: RayInteractor):
+        self._displace(interactor)
+        self._insertion_order.pop(interactor)
+
+        if interactor in self._dynamic:
+            self._dynamic.discard(interactor)
+            interactor.remove_listeners(('origin', 'direction'), self._on_interactor_moved)
+
+    def clear(self):
+        for interactor in tuple(self._interactor_cells):
+            self.remove(interactor)
+        self._next_order = 0
+
+    def refit(self, interactor: RayInteractor):
+        self._displace(interactor)
+        self._place(interactor)
+
+    def _on_interactor_moved(self, interactor: RayInteractor, attr: str, value: Vec2):
+        # The listener fires while the interactor is still being constructed, so make sure it has been placed.
+        if interactor in self._interactor_cells:
+            self.refit(interactor)
+
+    def _polygon_cells(self, points: tuple[Vec2, ...]):
+        """
+        Rasterise a convex polygon into the grid one row at a time. The polygon's extent in each row is found
+        by clipping every edge to the row, so no cell outside the polygon is visited.
+        """
+        cell_size = self.cell_size
+        min_row = floor(min(p.y for p in points) / cell_size)
+        max_row = floor(max(p.y for p in points) / cell_size)
+
+        for row in range(min_row, max_row + 1):
+            row_low = row * cell_size
+            row_high = row_low + cell_size
+
+            low_x = float('inf')
+            high_x = -float('inf')
+            for idx in range(len(points)):
+                a, b = points[idx - 1], points[idx]
+                dy = b.y - a.y
+
+                if dy == 0.0:
+                    if not (row_low <= a.y <= row_high):
+                        continue
+                    t_low, t_high = 0.0, 1.0
+                else:
+                    t_a = (row_low - a.y) / dy
+                    t_b = (row_high - a.y) / dy
+                    t_low, t_high = max(0.0, min(t_a, t_b)), min(1.0, max(t_a, t_b))
+                    if t_low > t_high:
+                        continue
+
+                x_low = a.x + (b.x - a.x) * t_low
+                x_high = a.x + (b.x - a.x) * t_high
+                low_x = min(low_x, x_low, x_high)
+                high_x = max(high_x, x_low, x_high)
+
+            if low_x > high_x:
+                continue
+
+            for column in range(floor(low_x / cell_size), floor(high_x / cell_size) + 1):
+                yield column, row
+
+    def query(self, points: tuple[Vec2, ...]) -> tuple[RayInteractor, ...]:
+        """
+        Find every interactor which shares a cell with the convex polygon (or segment) made by the points.
+        The interactors are returned in the order they were inserted.
+        """
+        cells = self._cells
+        candidates: set[RayInteractor] = set()
+        for cell in self._polygon_cells(points):
+            occupants = cells.get(cell)
+            if occupants:
+                candidates.update(occupants)
+
+        return tuple(sorted(candidates, key=self._insertion_order.__getitem__))
+
+    def query_beam(self, left_source: Vec2, left_sink: Vec2, right_source: Vec2, right_sink: Vec2) -> tuple[RayInteractor, ...]:
+        return self.query((right_source, right_sink, left_sink, left_source))
+
+    def query_segment(self, start: Vec2, end: Vec2) -> tuple[RayInteractor, ...]:
+        return self.query((start, end))
+
+
+class LayeredBroadphase:
+    """
+    A static grid and a dynamic grid queried as if they were one. The static grid holds the walls which are
+    baked once when the level is preloaded and never move, so only the small dynamic grid is refit as things move.
+
+    The static interactors always come before the dynamic ones, the same order as one grid they had been inserted into first.
+    """
+    __slots__ = (
+        "static",
+        "dynamic"
+    )
+
+    def __init__(self, static: UniformGrid, dynamic: UniformGrid):
+        self.static: UniformGrid = static
+        self.dynamic: UniformGrid = dynamic
+
+    def __len__(self):
+        return len(self.static) + len(self.dynamic)
+
+    def __contains__(self, interactor: RayInteractor):
+        return interactor in self.static or interactor in self.dynamic
+
+    def query(self, points: tuple[Vec2, ...]) -> tuple[RayInteractor, ...]:
+        return self.static.query(points) + self.dynamic.query(points)
+
+    def query_beam(self, left_source: Vec2, left_sink: Vec2, right_source: Vec2, right_sink: Vec2) -> tuple[RayInteractor, ...]:
+        return self.query((right_source, right_sink, left_sink, left_source))
+
+    def query_segment(self, start: Vec2, end: Vec2) -> tuple[RayInteractor, ...]:
+        return self.query((start, end))
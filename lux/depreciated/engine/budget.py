@@ -0,0 +1,209 @@
+from __future__ import annotations
+import heapq
+from itertools import count
+from logging import getLogger
+from time import perf_counter
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid
+from lux.depreciated.engine.cache import PropagationCache
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
+from lux.depreciated.engine.interactors import RayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import find_intersections
+from lux.depreciated.engine.solver import get_beam_aabb
+
+logger = getLogger("lux")
+
+
+def get_beam_priority(beam: BeamLightRay, view: tuple[Vec2, Vec2] | None = None) -> float:
+    """
+    How much a beam matters to what's on screen, its strength times how much of the view it could cover.
+    Without a view the width of the beam is used for its size instead.
+    """
+    strength = max(beam.left.strength, beam.right.strength)
+    if view is None:
+        return strength * (beam.left.source - beam.right.source).mag
+
+    low, high = get_beam_aabb(beam)
+    width = min(high.x, view[1].x) - max(low.x, view[0].x)
+    height = min(high.y, view[1].y) - max(low.y, view[0].y)
+    if width <= 0.0 or height <= 0.0:
+        return 0.0
+    return strength * width * height
+
+
+class BudgetedSolver:
+    """
+    Propagates the light sources like propogate_beam, but only does as much as the budget allows each frame.
+    The beams that matter most (see get_beam_priority) are split first and whatever is left over
+    is carried on to the next frame, so the tree is refined a little more every frame until it's done.
+
+    The budget is the number of beams made, and/or the milliseconds spent, per call to step. A beam's split is
+    only added to the tree if it fits in what is left of the frame's beams, otherwise it is held for the next frame.
+    So a frame only goes over max_beams when a single beam splits into more than that.
+    If an interactor moves or changes colour the tree is thrown away and started again on the next step.
+    The guard stops light being followed around in cycles, like propogate_beam.
+    """
+
+    def __init__(self, interactors: tuple[RayInteractor, ...], max_beams: int | None = None, max_ms: float | None = None,
+                 view: tuple[Vec2, Vec2] | None = None, edge_batch: EdgeBatch = None, broadphase: UniformGrid = None,
+                 cache: PropagationCache = None, guard: PropagationGuard | None = DEFAULT_GUARD):
+        if max_beams is not None and max_beams <= 0:
+            raise ValueError("A BudgetedSolver has to be able to make at least one beam a frame")
+        if max_ms is not None and max_ms <= 0.0:
+            raise ValueError("A BudgetedSolver has to be given some time each frame")
+
+        self.interactors: tuple[RayInteractor, ...] = tuple(interactors)
+        self.max_beams: int | None = max_beams
+        self.max_ms: float | None = max_ms
+        self.view: tuple[Vec2, Vec2] | None = view
+
+        self.edge_batch: EdgeBatch = edge_batch
+        self.broadphase: UniformGrid = broadphase
+        self.cache: PropagationCache = cache
+        self.guard: PropagationGuard | None = guard
+
+        self._sources: list[BeamLightRay] = []
+        self._roots: list[BeamLightRay] = []
+        # (-priority, order, beam, interactor it came out of, beam its children get added to, depth, guard states above it)
+        self._pending: list[tuple[float, int, BeamLightRay, RayInteractor | None, BeamLightRay | None, int, frozenset[tuple]]] = []
+        # A beam which was split but didn't fit in the last frame, (its entry in pending, replacements, edge map).
+        self._held: tuple | None = None
+        self._order = count()
+        self._dirty: bool = False
+
+        for interactor in self.interactors:
+            interactor.add_listeners(('origin', 'direction', 'colour'), self._on_interactor_changed)
+
+    def release(self):
+        """
+        Stop listening to the interactors, and kill the tree.
+        """
+        for interactor in self.interactors:
+            interactor.remove_listeners(('origin', 'direction', 'colour'), self._on_interactor_changed)
+        self._clear()
+
+    def _on_interactor_changed(self, interactor: RayInteractor, attr: str, value):
+        self._dirty = True
+
+    # -- Sources --
+
+    def add_source(self, beam: BeamLightRay):
+        self._sources.append(beam)
+        self._push(beam, None, None, 1, frozenset())
+
+    def remove_source(self, beam: BeamLightRay):
+        if beam not in self._sources:
+            raise ValueError(f"{beam} is not a source of this solver")
+        self._sources.remove(beam)
+        # If nothing was in its way the beam is one of the roots, and it belongs to the caller again.
+        # So only what came out of it goes when the tree is thrown away.
+        if beam in self._roots:
+            self._roots.remove(beam)
+            beam.propagate_kill()
+        self._dirty = True
+
+    @property
+    def sources(self) -> tuple[BeamLightRay, ...]:
+        return tuple(self._sources)
+
+    # -- Solving --
+
+    @property
+    def done(self):
+        return not self._dirty and not self._pending and self._held is None
+
+    @property
+    def pending(self):
+        return len(self._pending) + (self._held is not None)
+
+    def restart(self):
+        """
+        Throw away the tree, and start again from the sources.
+        """
+        self._clear()
+        for source in self._sources:
+            self._push(source, None, None, 1, frozenset())
+
+    def _clear(self):
+        for root in self._roots:
+            # If nothing was in the way find_intersections hands back the source itself, which we still need.
+            if root in self._sources:
+                root.propagate_kill()
+            else:
+                root.kill()
+        self._roots = []
+        self._pending = []
+        self._held = None
+        self._dirty = False
+
+    def _push(self, beam: BeamLightRay, parent: RayInteractor | None, attach_to: BeamLightRay | None,
+              depth: int, path: frozenset[tuple]):
+        heapq.heappush(self._pending, (-get_beam_priority(beam, self.view), next(self._order), beam, parent, attach_to, depth, path))
+
+    def step(self) -> tuple[BeamLightRay, ...]:
+        """
+        Split beams until the budget for this frame runs out, and return the top level beams like propogate_beam.
+        The tree is only complete once `done` is True.
+        """
+        if self._dirty:
+            self.restart()
+
+        made = 0
+        if self._held is not None:
+            entry, replacements, edge_map = self._held
+            self._held = None
+            made += self._attach(entry, replacements, edge_map)
+
+        deadline = None if self.max_ms is None else perf_counter() + self.max_ms / 1000.0
+        while self._pending:
+            if self.max_beams is not None and made >= self.max_beams:
+                break
+            if deadline is not None and made and perf_counter() >= deadline:
+                break
+
+            entry = heapq.heappop(self._pending)
+            _, _, beam, parent, _, _, _ = entry
+            if self.cache is None:
+                replacements, edge_map = find_intersections(self.interactors, beam, parent, self.edge_batch, self.broadphase)
+            else:
+                replacements, edge_map = self.cache.find_intersections(self.interactors, beam, parent, self.edge_batch, self.broadphase)
+
+            # Every beam of the split is made at once, so if they don't all fit they wait for the next frame.
+            if self.max_beams is not None and made and made + len(replacements) > self.max_beams:
+                self._held = (entry, replacements, edge_map)
+                break
+            made += self._attach(entry, replacements, edge_map)
+
+        return tuple(self._roots)
+
+    def _attach(self, entry: tuple, replacements: list, edge_map: dict) -> int:
+        # Add the beams a pending beam was split into to the tree, and queue up what comes out of them.
+        _, _, _, _, attach_to, depth, path = entry
+        children = tuple(child[0] for child in replacements)
+        if attach_to is None:
+            self._roots.extend(children)
+        else:
+            attach_to.add_children(children)
+
+        for child, edge, left_intersection, right_intersection in replacements:
+            interactor = edge_map.get(edge)
+            if interactor is None:
+                continue
+
+            for sub_child in interactor.ray_hit(child, edge, left_intersection, right_intersection):
+                if self.guard is None:
+                    self._push(sub_child, interactor, child, depth + 1, path)
+                    continue
+
+                state = self.guard.get_state(interactor, edge, sub_child)
+                reason = self.guard.check(sub_child, depth, state, path)
+                if reason is not None:
+                    child.truncated = reason
+                    continue
+                self._push(sub_child, interactor, child, depth + 1, path | {state})
+
+        return len(children)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.cone_light_ray import make_light_ray
+from lux.util.colour import LuxColour
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.batched import EdgeBatch
+    from lux.depreciated.engine.broadphase import UniformGrid
+
+# A segment is stored as everything needed to rebuild it, rather than the BeamLightRay itself.
+# The beams get children added to them once they are in a tree so they can't be shared between solves.
+_CachedSegment = tuple[LuxColour, Ray, Ray, RayInteractorEdge, RayInteractor | None, Vec2, Vec2]
+
+
+class PropagationCache:
+    """
+    A least recently used cache of how a beam gets split up by the interactors in its way.
+
+    The key is the beam, and the transform of every interactor that could be hit by it, quantised to `quantum`
+    so the tiny floating point drift from swinging an interactor back and forth still hits. Interactor colours
+    aren't part of the key because they don't change how a beam is split, only what comes out of ray_hit,
+    which is always called fresh.
+
+    The memory bound is the total number of segments stored. Once it is passed the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, max_segments: int = 16384, quantum: float = 0.0001):
+        if max_segments <= 0:
+            raise ValueError("A PropagationCache has to be able to hold at least one segment")
+
+        self.max_segments: int = max_segments
+        self.quantum: float = quantum
+
+        self._entries: OrderedDict[tuple, tuple[_CachedSegment, ...]] = OrderedDict()
+        self._size: int = 0
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return 0.0 if not total else self.hits / total
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -- Keys --
+
+    def _quantise(self, *values: float) -> tuple[int, ...]:
+        quantum = self.quantum
+        return tuple(round(value / quantum) for value in values)
+
+    def _ray_key(self, ray: Ray) -> tuple[int, ...]:
+        return self._quantise(ray.source.x, ray.source.y, ray.direction.x, ray.direction.y, ray.length, ray.strength)
+
+    def _beam_key(self, beam: LightRay) -> tuple:
+        return self._ray_key(beam.left), self._ray_key(beam.right), tuple(beam.colour)
+
+    def _interactor_key(self, interactor: RayInteractor) -> tuple:
+        # The interactor itself rather than its id, an id can be reused by a new interactor once the old one is gone
+        # and that would hit the old one's entries. Holding it keeps it alive until the entry is evicted or cleared.
+        return (interactor,) + self._quantise(interactor.origin.x, interactor.origin.y, interactor.direction.x, interactor.direction.y)
+
+    def _edge_key(self, edge: RayInteractorEdge, interactor: RayInteractor | None) -> tuple:
+        return (interactor, edge.bi_dir) + self._quantise(edge.start.x, edge.start.y, edge.end.x, edge.end.y)
+
+    # -- Storage --
+
+    def _get(self, key: tuple) -> tuple[_CachedSegment, ...] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: tuple, entry: tuple[_CachedSegment, ...]):
+        if len(entry) > self.max_segments:
+            return
+
+        self._entries[key] = entry
+        self._size += len(entry)
+
+        while self._size > self.max_segments:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def _store(replacements) -> tuple[_CachedSegment, ...]:
+        return tuple(
+            (child.colour, child.left, child.right, edge, interactor, left_intersection, right_intersection)
+            for child, edge, interactor, left_intersection, right_intersection in replacements
+        )
+
+    @staticmethod
+    def _restore(entry: tuple[_CachedSegment, ...]):
+        return tuple(
+            (make_light_ray(colour, left, right), edge, interactor, left_intersection, right_intersection)
+            for colour, left, right, edge, interactor, left_intersection, right_intersection in entry
+        )
+
+    # -- Cached propagation --
+
+    def find_intersections(self, interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None,
+                           edge_batch: EdgeBatch = None, broadphase: UniformGrid = None):
+        """
+        A drop in for find_intersections. The edge map only contains the edges the beams ended on.
+        """
+        # Importing here because new imports the cache.
+        from lux.depreciated.engine.new import find_intersections
+
+        candidates = interactors
+        if broadphase is not None:
+            left_sink = beam.left.source + beam.left.direction * beam.left.length
+            right_sink = beam.right.source + beam.right.direction * beam.right.length
+            candidates = broadphase.query_beam(beam.left.source, left_sink, beam.right.source, right_sink)
+
+        key = (self._beam_key(beam), tuple(self._interactor_key(interactor) for interactor in candidates))
+        entry = self._get(key)
+        if entry is None:
+            replacements, edge_map = find_intersections(interactors, beam, parent, edge_batch, broadphase)
+            entry = self._store((child, edge, edge_map.get(edge), left, right) for child, edge, left, right in replacements)
+            self._put(key, entry)
+
+        restored = self._restore(entry)
+        return (
+            [(child, edge, left, right) for child, edge, _, left, right in restored],
+            {edge: interactor for _, edge, interactor, _, _ in restored}
+        )
+
+    def propagate(self, beam: BeamLightRay, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor]):
+        """
+        A drop in for BeamLightRay._propagate.
+        """
+        # The edges handed back have to be the ones in the current map, otherwise propagate_ray can't look them up.
+        current_edges = {self._edge_key(edge, interactor): edge for edge, interactor in edge_to_interactor_map.items()}
+
+        key = (self._beam_key(beam), tuple(current_edges))
+        entry = self._get(key)
+        if entry is None:
+            entry = self._store(
+                (child, edge, edge_to_interactor_map.get(edge), left, right) for child, edge, left, right in beam._propagate(edge_to_interactor_map)
+            )
+            self._put(key, entry)
+
+        return tuple(
+            (child, current_edges.get(self._edge_key(edge, interactor), edge), left, right)
+            for child, edge, interactor, left, right in self._restore(entry)
+        )
@@ -0,0 +1,87 @@
+"""
+Limits on how far light gets followed, so mirrors and portals which face each other can't recurse forever.
+
+Nothing stops a beam bouncing between two mirrors except it running out of strength, and at a grazing angle that
+takes a very long time (or never happens if the beams have no length). The walkers ask a PropagationGuard before
+following light into an interactor, and when it says no they mark the beam which hit the interactor as truncated
+rather than going on.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Container
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+    from lux.depreciated.engine.lights.ray import LightRay
+
+__all__ = (
+    "TRUNCATED_DEPTH",
+    "TRUNCATED_STRENGTH",
+    "TRUNCATED_CYCLE",
+    "PropagationGuard",
+    "DEFAULT_GUARD"
+)
+
+# Why a beam was truncated, what ends up in LightRay.truncated.
+TRUNCATED_DEPTH = "depth"
+TRUNCATED_STRENGTH = "strength"
+TRUNCATED_CYCLE = "cycle"
+
+
+class PropagationGuard:
+    """
+    Decides whether the light coming out of an interactor should be followed.
+
+    It is cut off once the tree is max_depth beams deep, once none of it is stronger than min_strength,
+    or when the same interactor and edge sends out the same beam as somewhere further up the tree (a cycle).
+    Beams are compared to `precision` decimal places, ignoring strength, so a loop which is slowly
+    running out of strength is still caught the second time around.
+
+    The guard only holds the limits, the depth and the states further up the tree belong to the walk,
+    so one guard can be shared between threads.
+    """
+    __slots__ = (
+        "max_depth",
+        "min_strength",
+        "precision"
+    )
+
+    def __init__(self, max_depth: int = 256, min_strength: float = 0.0, precision: int = 3):
+        if max_depth < 1:
+            raise ValueError("A PropagationGuard has to allow at least one beam deep")
+        if precision < 0:
+            raise ValueError("A PropagationGuard can't compare beams to a negative number of decimal places")
+
+        self.max_depth: int = max_depth
+        self.min_strength: float = min_strength
+        self.precision: int = precision
+
+    def get_state(self, interactor: RayInteractor, edge: RayInteractorEdge, beam: LightRay) -> tuple:
+        """
+        What has to repeat for light to be going around in a cycle: which interactor and edge it came out of, and where it went.
+        """
+        precision = self.precision
+        left, right, direction = beam.left, beam.right, edge.direction
+        return (
+            interactor,
+            round(direction.x, precision), round(direction.y, precision),
+            round(left.source.x, precision), round(left.source.y, precision),
+            round(left.direction.x, precision), round(left.direction.y, precision),
+            round(right.source.x, precision), round(right.source.y, precision),
+            round(right.direction.x, precision), round(right.direction.y, precision)
+        )
+
+    def check(self, beam: LightRay, depth: int, state: tuple, path: Container[tuple]) -> str | None:
+        """
+        Why the beam shouldn't be followed, or None if it should. The depth is how deep the beam which hit
+        the interactor is (the sources are 1), and the path is the state of every beam followed to get here.
+        """
+        if depth >= self.max_depth:
+            return TRUNCATED_DEPTH
+        if max(beam.left.strength, beam.right.strength) <= self.min_strength:
+            return TRUNCATED_STRENGTH
+        if state in path:
+            return TRUNCATED_CYCLE
+        return None
+
+
+DEFAULT_GUARD = PropagationGuard()
@@ -0,0 +1,155 @@
+"""
+Opt-in counters for the hot paths of the beam engine.
+
+The engine checks `COUNTERS` once per call and only counts anything if it isn't None, so while the counters are off
+(the default) the only cost is that check. Turn them on with `enable_counters`, and call `EngineCounters.report`
+once a frame to hand the totals to the PERF_TRACKER.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from lux.util.duration_tracker import PerfTracker
+
+__all__ = (
+    "EngineCounters",
+    "COUNTERS",
+    "enable_counters",
+    "disable_counters"
+)
+
+
+class EngineCounters:
+    """
+    Running totals of the work the engine did, since the last reset.
+
+    interactors_culled is how many whole interactors were skipped by their bounding circle, their edges aren't
+    counted as considered. The other culled counts are per early out in find_beam_edge_map: edges parallel to
+    the beam, edges behind it, edges past the end of it, edges which turned out to be outside of it, and edges
+    which clipped down to nothing.
+    beams_truncated is how many times the guard stopped light being followed. The allocated counts are how many
+    LightRays and RayInteractorEdges were made, and the reused counts how many came out of a LightPool instead.
+    The sorts count how the endpoints of each beam were sorted with EndpointOrders: already in last solve's order,
+    repaired from it, or sorted from scratch.
+    """
+    __slots__ = (
+        "interactors_culled",
+        "edges_considered",
+        "culled_aligned",
+        "culled_behind",
+        "culled_ahead",
+        "culled_outside",
+        "culled_degenerate",
+        "intersections",
+        "beams_propagated",
+        "beams_emitted",
+        "beams_truncated",
+        "lights_allocated",
+        "lights_reused",
+        "edges_allocated",
+        "edges_reused",
+        "sorts_reused",
+        "sorts_repaired",
+        "sorts_full",
+        "depth",
+        "max_depth",
+        "depth_ns"
+    )
+
+    def __init__(self):
+        self.interactors_culled: int = 0
+        self.edges_considered: int = 0
+        self.culled_aligned: int = 0
+        self.culled_behind: int = 0
+        self.culled_ahead: int = 0
+        self.culled_outside: int = 0
+        self.culled_degenerate: int = 0
+        self.intersections: int = 0
+        self.beams_propagated: int = 0
+        self.beams_emitted: int = 0
+        self.beams_truncated: int = 0
+        self.lights_allocated: int = 0
+        self.lights_reused: int = 0
+        self.edges_allocated: int = 0
+        self.edges_reused: int = 0
+        self.sorts_reused: int = 0
+        self.sorts_repaired: int = 0
+        self.sorts_full: int = 0
+
+        # How deep the recursion is right now, and the deepest it got.
+        self.depth: int = 0
+        self.max_depth: int = 0
+        # The nanoseconds spent splitting beams at each depth of the tree, the sources are depth 1.
+        self.depth_ns: list[int] = []
+
+    def reset(self):
+        self.interactors_culled = 0
+        self.edges_considered = 0
+        self.culled_aligned = 0
+        self.culled_behind = 0
+        self.culled_ahead = 0
+        self.culled_outside = 0
+        self.culled_degenerate = 0
+        self.intersections = 0
+        self.beams_propagated = 0
+        self.beams_emitted = 0
+        self.beams_truncated = 0
+        self.lights_allocated = 0
+        self.lights_reused = 0
+        self.edges_allocated = 0
+        self.edges_reused = 0
+        self.sorts_reused = 0
+        self.sorts_repaired = 0
+        self.sorts_full = 0
+
+        self.depth = 0
+        self.max_depth = 0
+        self.depth_ns = []
+
+    def enter(self) -> int:
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+        return self.depth
+
+    def leave(self):
+        self.depth -= 1
+
+    def add_depth_time(self, depth: int, elapsed_ns: int):
+        depth_ns = self.depth_ns
+        while len(depth_ns) < depth:
+            depth_ns.append(0)
+        depth_ns[depth - 1] += elapsed_ns
+
+    def as_dict(self) -> dict[str, int]:
+        counts = {name: getattr(self, name) for name in self.__slots__ if name not in ("depth", "depth_ns")}
+        for depth, elapsed_ns in enumerate(self.depth_ns, 1):
+            counts[f"depth_{depth}_ns"] = elapsed_ns
+        return counts
+
+    def report(self, tracker: PerfTracker = None, context: str = "engine"):
+        """
+        Add the totals to the tracker as counts, and start again from zero. Defaults to the PERF_TRACKER, which is
+        only imported here since it needs imgui and nothing else in the engine does.
+        """
+        if tracker is None:
+            from lux.util.duration_tracker import PERF_TRACKER
+            tracker = PERF_TRACKER
+        for name, value in self.as_dict().items():
+            tracker.add_count(f"engine.{name}", value, (context,))
+        self.reset()
+
+
+COUNTERS: EngineCounters | None = None
+
+
+def enable_counters() -> EngineCounters:
+    global COUNTERS
+    if COUNTERS is None:
+        COUNTERS = EngineCounters()
+    return COUNTERS
+
+
+def disable_counters():
+    global COUNTERS
+    COUNTERS = None
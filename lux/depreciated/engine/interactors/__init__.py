@@ -1,4 +1,7 @@
+from lux.depreciated.engine.interactors.ray_interactor import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.interactors.filter import FilterRayInteractor
+from lux.depreciated.engine.interactors.mirror import MirrorRayInteractor
 from lux.depreciated.engine.interactors.portal import PortalRayInteractor
-from lux.engine.interactors.mirror import MirrorRayInteractor
+from lux.depreciated.engine.interactors.wall import WallRayInteractor
 
-__all__ = ("RayInteractor", "RayInteractorEdge", "FilterRayInteractor", "MirrorRayInteractor", "PortalRayInteractor")
+__all__ = ("RayInteractor", "RayInteractorEdge", "FilterRayInteractor", "MirrorRayInteractor", "PortalRayInteractor", "WallRayInteractor")
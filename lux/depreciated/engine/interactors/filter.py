@@ -1,15 +1,21 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
 from pyglet.math import Vec2
 
-from lux.engine.interactors import RayInteractor, RayInteractorEdge
-from lux.engine.lights.ray import Ray, LightRay
-from lux.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.cone_light_ray import make_light_ray
 from lux.util.colour import LuxColour
 
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
+
 
 class FilterRayInteractor(RayInteractor):
 
     def ray_hit(self, in_ray: LightRay, in_edge: RayInteractorEdge,
-                left_intersection: Vec2, right_intersection: Vec2) -> tuple[LightRay, ...]:
+                left_intersection: Vec2, right_intersection: Vec2, pool: LightPool = None) -> tuple[LightRay, ...]:
         new_colour = self.colour.mask(in_ray.colour)
         if new_colour == LuxColour.BLACK:
             return ()
@@ -22,9 +28,10 @@ class FilterRayInteractor(RayInteractor):
         new_left_length = in_ray.left.strength - in_ray.left.length
         new_right_length = in_ray.right.strength - in_ray.right.length
 
-        return (BeamLightRay(new_colour,
-                             Ray(left_intersection, in_ray.left.direction, new_left_length, new_left_length),
-                             Ray(right_intersection, in_ray.right.direction, new_right_length, new_right_length)),)
+        return (make_light_ray(new_colour,
+                               Ray(left_intersection, in_ray.left.direction, new_left_length, new_left_length),
+                               Ray(right_intersection, in_ray.right.direction, new_right_length, new_right_length),
+                               pool),)
 
 
 class PolygonFilterRayInteractor(FilterRayInteractor):
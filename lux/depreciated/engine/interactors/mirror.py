@@ -1,11 +1,18 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
 from pyglet.math import Vec2
 
-from lux.engine.lights import Ray
-from lux.engine.interactors import RayInteractorEdge, RayInteractor
+from lux.depreciated.engine.lights import Ray
+from lux.depreciated.engine.interactors import RayInteractorEdge, RayInteractor
 from lux.util.colour import LuxColour
 from lux.util.maths import Direction
 
-from lux.engine.lights.beam_light_ray import LightRay, BeamLightRay
+from lux.depreciated.engine.lights.beam_light_ray import LightRay
+from lux.depreciated.engine.lights.cone_light_ray import make_light_ray
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
 
 
 class MirrorRayInteractor(RayInteractor):
@@ -25,7 +32,7 @@ class MirrorRayInteractor(RayInteractor):
         return self._bounds[0]
 
     def ray_hit(self, in_ray: LightRay, in_edge: RayInteractorEdge,
-                left_intersection: Vec2, right_intersection: Vec2) -> tuple[LightRay, ...]:
+                left_intersection: Vec2, right_intersection: Vec2, pool: LightPool = None) -> tuple[LightRay, ...]:
 
         new_colour = self.colour.mask(in_ray.colour)
         if new_colour == LuxColour.BLACK:
@@ -64,4 +71,4 @@ class MirrorRayInteractor(RayInteractor):
             new_right_length
         )
 
-        return BeamLightRay(new_colour, left_ray, right_ray),
+        return make_light_ray(new_colour, left_ray, right_ray, pool),
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 
 from pyglet.math import Vec2
 
@@ -6,7 +7,11 @@ from lux.depreciated.engine.lights import Ray
 from lux.depreciated.engine.interactors import RayInteractorEdge, RayInteractor
 from lux.util.colour import LuxColour
 
-from lux.depreciated.engine.lights.beam_light_ray import LightRay, BeamLightRay
+from lux.depreciated.engine.lights.beam_light_ray import LightRay
+from lux.depreciated.engine.lights.cone_light_ray import make_light_ray
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
 
 
 class PortalRayInteractor(RayInteractor):
@@ -27,6 +32,10 @@ class PortalRayInteractor(RayInteractor):
     def edge(self):
         return self._bounds[0]
 
+    @property
+    def linked(self) -> tuple[RayInteractor, ...]:
+        return () if self._sibling is None else (self._sibling,)
+
     def set_siblings(self, sibling):
         self._sibling, sibling._sibling = sibling, self
         self._sibling_ratio = self._sibling.edge.diff.mag / self.edge.diff.mag
@@ -40,7 +49,7 @@ class PortalRayInteractor(RayInteractor):
         return (portal_a, portal_b)
 
     def ray_hit(self, in_ray: LightRay, in_edge: RayInteractorEdge,
-                left_intersection: Vec2, right_intersection: Vec2) -> tuple[LightRay, ...]:
+                left_intersection: Vec2, right_intersection: Vec2, pool: LightPool = None) -> tuple[LightRay, ...]:
         if self._sibling is None:
             return ()
 
@@ -54,25 +63,16 @@ class PortalRayInteractor(RayInteractor):
         if not in_edge.bi_dir and ((right_intersection - in_ray.origin).dot(edge_normal) >= 0.0 or (left_intersection - in_ray.origin).dot(edge_normal) >= 0.0):
             return ()
 
-        edge_start = self.origin + self.edge.start.rotate(self.direction.heading)
-        edge_end = self.origin + self.edge.end.rotate(self.direction.heading)
-        edge_diff = (edge_end - edge_start)
-        edge_len_sqr = edge_diff.dot(edge_diff)
+        world_edge = self.world_bounds[0]
+        edge_start = world_edge.start
 
         new_left_length = in_ray.left.strength - in_ray.left.length
         new_right_length = in_ray.right.strength - in_ray.right.length
 
-        sibling = self._sibling
-        sibling_edge = sibling.edge
-        sibling_origin = sibling.origin
-        sibling_heading = sibling.direction.heading
-
-        sibling_normal = sibling_edge.normal.rotate(sibling_heading)
-        sibling_direction = sibling_edge.direction.rotate(sibling_heading)
-
-        sibling_start = sibling_origin + sibling_edge.start.rotate(sibling_heading)
-        sibling_end = sibling_origin + sibling_edge.end.rotate(sibling_heading)
-        sibling_diff = sibling_end - sibling_start
+        sibling_edge = self._sibling.world_bounds[0]
+        sibling_normal = sibling_edge.normal
+        sibling_direction = sibling_edge.direction
+        sibling_end = sibling_edge.end
 
         # Figure the output edge direction. We mirror it in the normal direction because we want it to come
         # out of the portal edge rather than go into it.
@@ -84,8 +84,10 @@ class PortalRayInteractor(RayInteractor):
         right_mirror_component = in_ray.right.direction.dot(edge_direction)
         new_right_direction = - sibling_normal * right_parallel_component - sibling_direction * right_mirror_component
 
-        new_left_source = sibling_end + (left_intersection - edge_start) * self._sibling_ratio
-        new_right_source = sibling_end + (right_intersection - edge_start) * self._sibling_ratio
+        # The start of this edge comes out of the end of the sibling's, so the light is turned rather than mirrored
+        # and keeps its left on the left. Going along the sibling's edge, not this one, keeps it on the sibling.
+        new_left_source = sibling_end - sibling_direction * ((left_intersection - edge_start).dot(edge_direction) * self._sibling_ratio)
+        new_right_source = sibling_end - sibling_direction * ((right_intersection - edge_start).dot(edge_direction) * self._sibling_ratio)
 
         left_ray = Ray(
             new_left_source,
@@ -101,4 +103,4 @@ class PortalRayInteractor(RayInteractor):
             new_right_length
         )
 
-        return BeamLightRay(new_colour, left_ray, right_ray),
+        return make_light_ray(new_colour, left_ray, right_ray, pool),
@@ -1,9 +1,15 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 
 from pyglet.math import Vec2
 
+from lux.components.base import Listenable
 from lux.util.colour import LuxColour
-from lux.engine.lights.ray import LightRay
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.lights.ray import LightRay
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
 
 
 class RayInteractorEdge:
@@ -12,15 +18,25 @@ class RayInteractorEdge:
         "_end",
         "_direction",
         "_normal",
+        "_length_sqr",
         "_bi_dir"
     )
 
     def __init__(self, start: Vec2, end: Vec2, bi_dir: bool):
+        counters = instrument.COUNTERS
+        if counters is not None:
+            counters.edges_allocated += 1
+        self._set(start, end, bi_dir)
+
+    def _set(self, start: Vec2, end: Vec2, bi_dir: bool):
+        # Split out of __init__ so a LightPool can turn an old edge into a new one.
         self._start: Vec2 = start
         self._end: Vec2 = end
 
-        self._direction = (end - start).normalize()
+        diff = end - start
+        self._direction = diff.normalize()
         self._normal: Vec2 = Vec2(self._direction.y, -self._direction.x)
+        self._length_sqr: float = diff.dot(diff)
 
         self._bi_dir: bool = bi_dir
 
@@ -56,6 +72,10 @@ class RayInteractorEdge:
     def normal(self):
         return self._normal
 
+    @property
+    def length_sqr(self):
+        return self._length_sqr
+
     @property
     def bi_dir(self):
         return self._bi_dir
@@ -72,27 +92,94 @@ class RayInteractorEdge:
         )
 
 
-class RayInteractor:
+class RayInteractor(Listenable):
 
     def __init__(self, origin: Vec2, direction: Vec2, colour: LuxColour, bounds: tuple[RayInteractorEdge]):
+        super().__init__()
         self.origin = origin
         self.direction = direction
         self.colour = colour
 
         # The convex hull of the shape, does not necessarily represent the actual shape of the interactor
         self._bounds: tuple[RayInteractorEdge, ...] = bounds
+        self._world_bounds: tuple[RayInteractorEdge, ...] | None = None
+        self._world_aabb: tuple[Vec2, Vec2] | None = None
+        self._world_circle: tuple[Vec2, float] | None = None
+        # The bounding circle around the local bounds. Turning doesn't change the radius, so it's only found once.
+        self._local_circle: tuple[Vec2, float] | None = None
+
+    def __setattr__(self, key, value):
+        # Moving or turning means the world space bounds have to be rebuilt. This happens before the
+        # listeners are told, so they never see the old bounds.
+        if key == 'origin' or key == 'direction' or key == '_bounds':
+            object.__setattr__(self, '_world_bounds', None)
+            object.__setattr__(self, '_world_aabb', None)
+            object.__setattr__(self, '_world_circle', None)
+            if key == '_bounds':
+                object.__setattr__(self, '_local_circle', None)
+        super().__setattr__(key, value)
 
     @property
     def bounds(self):
         return self._bounds
 
+    @property
+    def world_bounds(self) -> tuple[RayInteractorEdge, ...]:
+        """
+        The bounds moved to where the interactor is. Only rebuilt the first time they're needed after a move.
+        """
+        if self._world_bounds is None:
+            heading = self.direction.heading
+            self._world_bounds = tuple(edge.adjust(self.origin, heading) for edge in self._bounds)
+        return self._world_bounds
+
+    @property
+    def world_aabb(self) -> tuple[Vec2, Vec2]:
+        """
+        The smallest axis aligned box (low, high) around the world bounds. Rebuilt along with the world bounds.
+        """
+        if self._world_aabb is None:
+            points = tuple(point for edge in self.world_bounds for point in (edge.start, edge.end))
+            self._world_aabb = (
+                Vec2(min(p.x for p in points), min(p.y for p in points)),
+                Vec2(max(p.x for p in points), max(p.y for p in points))
+            )
+        return self._world_aabb
+
+    @property
+    def bounding_circle(self) -> tuple[Vec2, float]:
+        """
+        A circle (centre, radius) in world space which every edge of the bounds is inside of, so a beam or ray
+        can skip the whole interactor with one test. It isn't the smallest circle, just one that is quick to find.
+        """
+        if self._world_circle is None:
+            if self._local_circle is None:
+                points = tuple(point for edge in self._bounds for point in (edge.start, edge.end))
+                centre = Vec2(
+                    (min(p.x for p in points) + max(p.x for p in points)) / 2.0,
+                    (min(p.y for p in points) + max(p.y for p in points)) / 2.0
+                )
+                self._local_circle = (centre, max((p - centre).mag for p in points))
+
+            centre, radius = self._local_circle
+            self._world_circle = (self.origin + centre.rotate(self.direction.heading), radius)
+        return self._world_circle
+
+    @property
+    def linked(self) -> tuple[RayInteractor, ...]:
+        """
+        Any other interactors whose output depends on where this interactor is, e.g. the sibling of a portal.
+        """
+        return ()
+
     def ray_hit(self, in_ray: LightRay, in_edge: RayInteractorEdge,
-                left_intersection: Vec2, right_intersection: Vec2) -> tuple[LightRay, ...]:
+                left_intersection: Vec2, right_intersection: Vec2, pool: LightPool = None) -> tuple[LightRay, ...]:
         """
         Take in a ray, and calculate where the ray will exit
 
         :param in_ray: The ray which is entering the object
         :param in_edge: The edge the ray has hit
+        :param pool: Where to get the exiting ray from, if the solve is using one
         :return: the exiting ray
         """
         raise NotImplementedError()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.lights.ray import LightRay
+from lux.util.colour import LuxColour
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.pool import LightPool
+
+
+class WallRayInteractor(RayInteractor):
+    """
+    A single wall of the level's bounds, which soaks up any light that hits it.
+
+    Walls never move, so the edge is given in world space and the interactor sits at the world origin facing right.
+    """
+
+    def __init__(self, start: Vec2, end: Vec2):
+        bounds = (RayInteractorEdge(start, end, True),)
+        super().__init__(Vec2(0.0, 0.0), Vec2(1.0, 0.0), LuxColour.WHITE, bounds)
+
+    @property
+    def edge(self):
+        return self._bounds[0]
+
+    def ray_hit(self, in_ray: LightRay, in_edge: RayInteractorEdge,
+                left_intersection: Vec2, right_intersection: Vec2, pool: LightPool = None) -> tuple[LightRay, ...]:
+        return ()
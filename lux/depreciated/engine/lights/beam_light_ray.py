@@ -15,22 +15,34 @@ if TYPE_CHECKING:
 logger = getLogger("lux")
 
 
+def _get_frame(left: Ray, right: Ray) -> tuple[Vec2, Vec2, Vec2]:
+    # The origin, direction, and normal of a beam between the two rays.
+    if left.direction != right.direction:
+        raise ValueError("The left and right edges of a Beam should be parallel")
+
+    origin = (left.source + right.source) / 2.0
+    normal = (left.source - right.source).normalize()
+    return origin, Vec2(normal.y, -normal.x), normal
+
+
 class BeamLightRay(LightRay):
     """
     When a light ray is completely parallel it makes finding the intersections much easier
     """
 
     def __init__(self, colour: LuxColour, left: Ray, right: Ray):
-        if left.direction != right.direction:
-            raise ValueError("The left and right edges of a Beam should be parallel")
-
-        origin = (left.source + right.source) / 2.0
-        normal = (left.source - right.source).normalize()
-        direction = Vec2(normal.y, -normal.x)
-
+        origin, direction, normal = _get_frame(left, right)
         super().__init__(origin, direction, colour, left, right)
         self.normal = normal
 
+    def _reset(self, colour: LuxColour, left: Ray, right: Ray):
+        """
+        Turn this into a new beam, for a LightPool. The children are left alone.
+        """
+        origin, direction, normal = _get_frame(left, right)
+        self._set(origin, direction, colour, left, right)
+        self.normal = normal
+
     def __str__(self):
         return f"BeamLightRay<({round(self.origin.x, 3)}, {round(self.origin.y, 3)}): {self.colour.name}>"
 
@@ -57,6 +69,11 @@ class BeamLightRay(LightRay):
             if (start_point - left_sink).dot(beam_dir) >= 0.0 and (end_point - left_sink).dot(beam_dir) >= 0.0:
                 continue
 
+            # An edge running along the beam is only ever seen side on, and there is nowhere it crosses the beam
+            # to measure depths from, so ignore it like find_beam_edge_map does.
+            if abs(edge.direction.dot(beam_dir)) == 1.0:
+                continue
+
             in_beam = False
 
             if ((start_point - left_source).dot(beam_normal) > 0.0) == ((start_point - right_source).dot(beam_normal) < 0.0):
@@ -98,10 +115,13 @@ class BeamLightRay(LightRay):
         right_sink = right_source + beam_dir * self.right.length
         left_sink = left_source + beam_dir * self.left.length
 
-        points_sorted = sorted(
-            self._generate_points(edge_to_interactor_map.keys()),
-            key=lambda p: (p[0] - right_source).dot(beam_normal)
-        )
+        # Sorted by (p[0] - right_source).dot(beam_normal) written out, with the index keeping ties in the order they were found.
+        points = tuple(self._generate_points(edge_to_interactor_map.keys()))
+        normal_x, normal_y = beam_normal.x, beam_normal.y
+        source_x, source_y = right_source.x, right_source.y
+        keys = [((p[0].x - source_x) * normal_x + (p[0].y - source_y) * normal_y, idx) for idx, p in enumerate(points)]
+        keys.sort()
+        points_sorted = [points[key[1]] for key in keys]
 
         finalised_beams: list[tuple[LightRay, RayInteractorEdge, Vec2, Vec2]] = list()
 
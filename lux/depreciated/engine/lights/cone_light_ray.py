@@ -0,0 +1,318 @@
+from __future__ import annotations
+from heapq import heappop, heappush
+from logging import getLogger
+from math import atan2, cos, sin, pi
+from typing import TYPE_CHECKING, Iterable
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.interactors import RayInteractorEdge
+from lux.util.colour import LuxColour
+from lux.util.maths import cross_2d, get_intersection
+
+if TYPE_CHECKING:
+    from lux.depreciated.engine.interactors import RayInteractor
+    from lux.depreciated.engine.pool import LightPool
+
+logger = getLogger("lux")
+
+# How far past the front of a cone an edge has to be before it can block it.
+# Without this the edge a cone comes out of (e.g. a mirror) would block the whole thing.
+_FRONT_TOLERANCE = 0.00001
+# Wedges thinner than this (in radians) are merged into the next one.
+_MIN_SPREAD = 1e-9
+# How close (relative to the distance) two edges have to be at an angle to count as meeting there.
+_DEPTH_TOLERANCE = 1e-9
+# How far along both edges a crossing has to be, so edges which only share a corner never cross.
+_CROSS_MARGIN = 1e-9
+
+
+def _get_frame(left: Ray, right: Ray, origin: Vec2 | None) -> tuple[Vec2, Vec2, float]:
+    # The origin, bisector, and spread of a cone between the two rays.
+    if origin is None:
+        if left.source == right.source:
+            origin = left.source
+        else:
+            origin = get_intersection(right.source, right.direction, left.source, left.direction)
+            if origin is None:
+                raise ValueError("The left and right edges of a Cone can't be parallel, use a Beam instead")
+
+    spread = atan2(cross_2d(right.direction, left.direction), right.direction.dot(left.direction))
+    if not 0.0 < spread < pi:
+        raise ValueError("The left edge of a Cone has to be less than half a turn counter-clockwise of the right edge")
+
+    return origin, (left.direction + right.direction).normalize(), spread
+
+
+class ConeLightRay(LightRay):
+    """
+    Light spreading out from a single point (the origin), like a lamp. Both the left and right rays point away
+    from the origin, with the left ray counter-clockwise from the right. The rays don't have to start at the origin,
+    so a cone coming off a mirror starts on the mirror, but still spreads out from where the original lamp would be.
+    """
+
+    def __init__(self, colour: LuxColour, left: Ray, right: Ray, origin: Vec2 = None):
+        origin, bisector, spread = _get_frame(left, right, origin)
+        super().__init__(origin, bisector, colour, left, right)
+        self.spread: float = spread
+
+    def _reset(self, colour: LuxColour, left: Ray, right: Ray, origin: Vec2 = None):
+        """
+        Turn this into a new cone, for a LightPool. The children are left alone.
+        """
+        origin, bisector, spread = _get_frame(left, right, origin)
+        self._set(origin, bisector, colour, left, right)
+        self.spread = spread
+
+    def __str__(self):
+        return f"ConeLightRay<({round(self.origin.x, 3)}, {round(self.origin.y, 3)}): {self.colour.name}>"
+
+    def _kill(self):
+        self.left = None
+        self.right = None
+
+    def _propagate(self, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor]) -> tuple[tuple[LightRay, RayInteractorEdge, Vec2, Vec2], ...]:
+        if self.left is None or self.right is None:
+            raise ValueError("This Light Cone has been killed how are you propagating it?")
+
+        replacements, _ = sweep_cone(self, edge_to_interactor_map.keys())
+        return tuple(replacements)
+
+
+def make_light_ray(colour: LuxColour, left: Ray, right: Ray, pool: LightPool = None) -> LightRay:
+    """
+    A beam if the rays are parallel, otherwise a cone. What the interactors use, so they can take either.
+    """
+    if pool is not None:
+        return pool.light(colour, left, right)
+    if left.direction == right.direction:
+        return BeamLightRay(colour, left, right)
+    return ConeLightRay(colour, left, right)
+
+
+def _clip_to_cone(start: Vec2, end: Vec2, planes: tuple[tuple[float, float, float, float, float], ...]) -> tuple[float, float] | None:
+    # Liang-Barsky against the sides of the cone. Each plane is (point x, point y, inward normal x, inward normal y, tolerance)
+    dx, dy = end.x - start.x, end.y - start.y
+    t_start, t_end = 0.0, 1.0
+    for px, py, nx, ny, tolerance in planes:
+        num = nx * (start.x - px) + ny * (start.y - py) - tolerance
+        den = nx * dx + ny * dy
+        if den == 0.0:
+            if num < 0.0:
+                return None
+            continue
+
+        t = -num / den
+        if den > 0.0:
+            if t > t_start:
+                t_start = t
+        elif t < t_end:
+            t_end = t
+
+        if t_start >= t_end:
+            return None
+    return t_start, t_end
+
+
+def sweep_cone(cone: ConeLightRay, edges: Iterable[RayInteractorEdge], pool: LightPool = None) -> tuple[list[tuple[ConeLightRay, RayInteractorEdge, Vec2, Vec2]], RayInteractorEdge]:
+    """
+    Split a cone up into the wedges which each only hit one edge, by sweeping around the origin from the right ray
+    to the left one. Returns the wedges like find_intersections, and the edge across the end of the cone which
+    the wedges that don't hit anything end on.
+
+    Every endpoint is sorted by its angle once, and the edges the sweep is inside of are kept ordered by
+    their distance from the origin at the angle the sweep is at, so this is O(n log n) in the number of edges.
+    Edges can cross inside the cone (a mirror through a polygon), so like OrderedActiveEdges the angle each
+    pair of neighbouring edges cross at is kept in a heap, and the pair is swapped when the sweep gets there.
+    """
+    origin = cone.origin
+    ox, oy = origin.x, origin.y
+    left, right = cone.left, cone.right
+    spread = cone.spread
+
+    right_dir = right.direction
+    rx, ry = right_dir.x, right_dir.y
+
+    right_sink = right.source + right_dir * right.length
+    left_sink = left.source + left.direction * left.length
+    back_edge = RayInteractorEdge(right_sink, left_sink, True) if pool is None else pool.edge(right_sink, left_sink, True)
+
+    # The sides of the cone, anticlockwise, skipping the front if the cone starts at a point.
+    planes = []
+    corners = (right.source, right_sink, left_sink, left.source)
+    for idx, (p, q) in enumerate(zip(corners, corners[1:] + corners[:1])):
+        side = q - p
+        if side.x == 0.0 and side.y == 0.0:
+            continue
+        side = side.normalize()
+        planes.append((p.x, p.y, -side.y, side.x, _FRONT_TOLERANCE if idx == 3 else 0.0))
+    planes = tuple(planes)
+
+    def get_angle(x: float, y: float) -> float:
+        x, y = x - ox, y - oy
+        return min(max(atan2(rx * y - ry * x, rx * x + ry * y), 0.0), spread)
+
+    # (edge it came from, start x, start y, diff x, diff y, start angle, end angle)
+    clipped: list[tuple[RayInteractorEdge, float, float, float, float, float, float]] = []
+    for edge in edges:
+        start, end = edge.start, edge.end
+        fractions = _clip_to_cone(start, end, planes)
+        if fractions is None:
+            continue
+
+        diff = end - start
+        ax, ay = start.x + diff.x * fractions[0], start.y + diff.y * fractions[0]
+        bx, by = start.x + diff.x * fractions[1], start.y + diff.y * fractions[1]
+        a_angle, b_angle = get_angle(ax, ay), get_angle(bx, by)
+        if a_angle == b_angle:
+            # The edge points straight at the origin, so it's seen side on.
+            continue
+        if a_angle > b_angle:
+            ax, ay, bx, by, a_angle, b_angle = bx, by, ax, ay, b_angle, a_angle
+        clipped.append((edge, ax, ay, bx - ax, by - ay, a_angle, b_angle))
+
+    clipped.append((back_edge, right_sink.x, right_sink.y, left_sink.x - right_sink.x, left_sink.y - right_sink.y, 0.0, spread))
+
+    def get_direction(angle: float) -> tuple[float, float]:
+        c, s = cos(angle), sin(angle)
+        return rx * c - ry * s, rx * s + ry * c
+
+    def get_depth(idx: int, angle: float) -> float:
+        _, ax, ay, dx, dy, _, _ = clipped[idx]
+        ux, uy = get_direction(angle)
+        den = ux * dy - uy * dx
+        if den == 0.0:
+            return float('inf')
+        return ((ax - ox) * dy - (ay - oy) * dx) / den
+
+    def in_front(a: int, b: int, angle: float) -> bool:
+        # Compare where the sweep is now. Only if the edges meet here (e.g. they share a corner) look a little
+        # further on to see which one carries on in front. Probing further on for every comparison would
+        # put the edges in the order they have past any crossing, rather than the order they have here.
+        depth_a, depth_b = get_depth(a, angle), get_depth(b, angle)
+        if abs(depth_a - depth_b) > _DEPTH_TOLERANCE * max(1.0, abs(depth_a)):
+            return depth_a < depth_b
+        probe = (angle + min(clipped[a][6], clipped[b][6])) / 2.0
+        return get_depth(a, probe) < get_depth(b, probe)
+
+    def behind(a: int, b: int, angle: float) -> bool:
+        depth_a, depth_b = get_depth(a, angle), get_depth(b, angle)
+        if abs(depth_a - depth_b) > _DEPTH_TOLERANCE * max(1.0, abs(depth_a)):
+            return depth_a > depth_b
+        probe = (angle + max(clipped[a][5], clipped[b][5])) / 2.0
+        return get_depth(a, probe) > get_depth(b, probe)
+
+    # Ends come before starts at the same angle so a corner never has both edges active at once.
+    events = sorted((angle, kind, idx) for idx, entry in enumerate(clipped) for angle, kind in ((entry[5], 1), (entry[6], 0)))
+
+    front = left.source - right.source
+    front_is_point = front.x == 0.0 and front.y == 0.0
+
+    def make_ray(angle: float, idx: int) -> tuple[Ray, Vec2]:
+        if angle == 0.0:
+            source, direction = right.source, right_dir
+        elif angle == spread:
+            source, direction = left.source, left.direction
+        else:
+            direction = Vec2(*get_direction(angle))
+            source = left.source if front_is_point else get_intersection(origin, direction, right.source, front)
+
+        hit = origin + direction * get_depth(idx, angle)
+        strength = right.strength + (angle / spread) * (left.strength - right.strength)
+        return Ray(source, direction, (hit - source).mag, strength), hit
+
+    active: list[int] = []
+    # (angle, edge in front, edge behind) for where neighbouring active edges cross, some of which are stale.
+    crossings: list[tuple[float, int, int]] = []
+
+    def push_crossing(pos: int, after: float):
+        if pos < 0 or pos + 1 >= len(active):
+            return
+        first, second = active[pos], active[pos + 1]
+        _, ax, ay, adx, ady, _, _ = clipped[first]
+        _, bx, by, bdx, bdy, _, _ = clipped[second]
+        den = adx * bdy - ady * bdx
+        if den == 0.0:
+            return
+        ex, ey = bx - ax, by - ay
+        t = (ex * bdy - ey * bdx) / den
+        u = (ex * ady - ey * adx) / den
+        if not (_CROSS_MARGIN < t < 1.0 - _CROSS_MARGIN and _CROSS_MARGIN < u < 1.0 - _CROSS_MARGIN):
+            return
+        crossing = get_angle(ax + adx * t, ay + ady * t)
+        if crossing > after:
+            heappush(crossings, (crossing, first, second))
+
+    current: int | None = None
+    last_angle = 0.0
+    replacements: list[tuple[ConeLightRay, RayInteractorEdge, Vec2, Vec2]] = []
+
+    event_count = len(events)
+    idx = 0
+    while idx < event_count:
+        if crossings and crossings[0][0] < events[idx][0]:
+            angle, first, second = heappop(crossings)
+            if first not in active:
+                continue
+            pos = active.index(first)
+            if pos + 1 == len(active) or active[pos + 1] != second:
+                # One of them has been next to something else since.
+                continue
+            active[pos], active[pos + 1] = second, first
+            push_crossing(pos - 1, angle)
+            push_crossing(pos + 1, angle)
+
+        else:
+            angle = events[idx][0]
+            while idx < event_count and events[idx][0] == angle:
+                _, kind, edge = events[idx]
+                idx += 1
+
+                # Binary search for where the edge goes (or is) in the active edges.
+                lo, hi = 0, len(active)
+                if kind:
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if in_front(active[mid], edge, angle):
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    active.insert(lo, edge)
+                    push_crossing(lo - 1, angle)
+                    push_crossing(lo, angle)
+                else:
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if active[mid] != edge and not behind(active[mid], edge, angle):
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    if lo == len(active) or active[lo] != edge:
+                        # Rounding put the order out near here, so look for it instead.
+                        lo = active.index(edge)
+                    del active[lo]
+                    push_crossing(lo - 1, angle)
+
+        nearest = active[0] if active else None
+        if nearest == current:
+            continue
+
+        if current is None:
+            last_angle = angle
+        elif angle - last_angle > _MIN_SPREAD:
+            right_ray, right_hit = make_ray(last_angle, current)
+            left_ray, left_hit = make_ray(angle, current)
+            wedge = ConeLightRay(cone.colour, left_ray, right_ray, origin) if pool is None else pool.cone(cone.colour, left_ray, right_ray, origin)
+            replacements.append((wedge, clipped[current][0], left_hit, right_hit))
+            last_angle = angle
+        # Otherwise the wedge is too thin to light anything (usually rounding around a corner),
+        # so the next wedge just starts where this one would have.
+        current = nearest
+
+    if not replacements:
+        # Only possible if the cone has no length, the same as a beam with no width.
+        logger.debug(f"{cone} found no wedges")
+
+    return replacements, back_edge
@@ -1,14 +1,18 @@
 from __future__ import annotations
-import heapq
 from logging import getLogger
+from time import perf_counter_ns
 from typing import NamedTuple, TYPE_CHECKING
 
 from pyglet.math import Vec2
 
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
 from lux.util.colour import LuxColour
 from lux.util.maths import get_segment_intersection
 if TYPE_CHECKING:
-    from lux.engine.interactors import RayInteractor, RayInteractorEdge
+    from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+    from lux.depreciated.engine.broadphase import UniformGrid
+    from lux.depreciated.engine.cache import PropagationCache
 
 logger = getLogger("lux")
 
@@ -42,36 +46,41 @@ class Ray(NamedTuple):
     def change_strength(self, new_strength: float):
         return Ray(self.source, self.direction, self.length, new_strength)
 
-    def calculate_ray_interaction(self, interactors: tuple[RayInteractor, ...]) -> tuple[Vec2, RayInteractorEdge, RayInteractor] | None:
-        intersecting_edges = []
-
+    def calculate_ray_interaction(self, interactors: tuple[RayInteractor, ...], broadphase: UniformGrid = None) -> tuple[Vec2, RayInteractorEdge, RayInteractor] | None:
         ray_start = self.source
         ray_end = ray_start + self.direction * self.length
+        ray_diff = ray_end - ray_start
+        ray_length_sqr = ray_diff.dot(ray_diff)
+
+        if broadphase is not None:
+            interactors = broadphase.query_segment(ray_start, ray_end)
 
+        # Only the closest hit matters, so keep a running best rather than sorting every hit.
+        closest: tuple[Vec2, RayInteractorEdge, RayInteractor] | None = None
+        closest_dist = float('inf')
         for interactor in interactors:
-            position = interactor.origin
-            heading = interactor.direction.heading
-            for edge in interactor.bounds:
-                start, end = (
-                    position + edge.start.rotate(heading),
-                    position + edge.end.rotate(heading),
-                )
-
-                interaction_point = get_segment_intersection(ray_start, ray_end, start, end)
+            # Skip the whole interactor if the ray doesn't get within its bounding circle.
+            centre, radius = interactor.bounding_circle
+            to_centre = centre - ray_start
+            fraction = 0.0 if ray_length_sqr == 0.0 else min(max(to_centre.dot(ray_diff) / ray_length_sqr, 0.0), 1.0)
+            offset = to_centre - ray_diff * fraction
+            if offset.dot(offset) > (radius + 0.0001)**2:
+                continue
+
+            for edge, world_edge in zip(interactor.bounds, interactor.world_bounds):
+                interaction_point = get_segment_intersection(ray_start, ray_end, world_edge.start, world_edge.end)
                 if interaction_point is None:
                     continue
 
                 diff = (interaction_point - ray_start)
                 dist = diff.dot(diff)
 
-                heapq.heappush(intersecting_edges, (dist, len(intersecting_edges), interaction_point, edge, interactor))
+                # Strictly closer, so ties go to the first hit found like they used to.
+                if dist < closest_dist:
+                    closest_dist = dist
+                    closest = (interaction_point, edge, interactor)
 
-        if not intersecting_edges:
-            return None
-
-        closest_edge = heapq.heappop(intersecting_edges)
-
-        return closest_edge[2:]
+        return closest
 
     def __str__(self) -> str:
         return f"Ray<({round(self.source.x, 3)}, {round(self.source.y, 3)}), dir ({round(self.direction.x, 3)}, {round(self.direction.y, 3)}), len {self.length}, str {self.strength}>"
@@ -80,6 +89,15 @@ class Ray(NamedTuple):
 class LightRay:
 
     def __init__(self, origin: Vec2, direction: Vec2, colour: LuxColour, left: Ray, right: Ray):
+        counters = instrument.COUNTERS
+        if counters is not None:
+            counters.lights_allocated += 1
+
+        self.children: set[LightRay] = set()
+        self._set(origin, direction, colour, left, right)
+
+    def _set(self, origin: Vec2, direction: Vec2, colour: LuxColour, left: Ray, right: Ray):
+        # Split out of __init__ so a LightPool can turn an old light into a new one.
         self.origin: Vec2 = origin
         self.direction: Vec2 = direction
         self.colour: LuxColour = colour
@@ -87,7 +105,8 @@ class LightRay:
         self.left: Ray = left
         self.right: Ray = right
 
-        self.children: set[LightRay] = set()
+        # Why the light coming out of whatever this beam hit wasn't followed (see guard.py), None if it was.
+        self.truncated: str | None = None
 
     def __str__(self):
         raise NotImplementedError()
@@ -111,35 +130,82 @@ class LightRay:
 
     def propagate_kill(self):
         # a.k.a purple guy method. (Thanks digi)
-        for child in self.children:
-            child.kill()
-            self.remove_child(child)
+        # Walks the tree with a stack rather than recursing, so a deep tree can't run out of python stack.
+        to_kill = list(self.children)
+        self.children.clear()
+        while to_kill:
+            child = to_kill.pop()
+            to_kill.extend(child.children)
+            child.children.clear()
+            child._kill()
 
     def _kill(self):
         raise NotImplementedError()
 
-    def propagate_ray(self, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor]) -> tuple[LightRay, ...]:
+    def propagate_ray(self, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor], cache: PropagationCache = None,
+                      guard: PropagationGuard | None = DEFAULT_GUARD) -> tuple[LightRay, ...]:
         # logger.debug(f"{self}: Propogating!")
         self.propagate_kill()
-        kids = 0
-        replacements = self._propagate(edge_to_interactor_map)
-        for child, edge, left_intersection, right_intersection in replacements:
-            kids += 1
-            interactor = edge_to_interactor_map.get(edge)
-            if interactor is None:
+        counters = instrument.COUNTERS
+
+        # The same walk as propogate_beam: depth first with a stack, where (None, ..., state) ends a subtree.
+        path: set[tuple] = set()
+        roots = ()
+        stack = [(self, None, 1, None)]
+        while stack:
+            beam, attach_to, depth, state = stack.pop()
+            if beam is None:
+                path.discard(state)
+                if counters is not None:
+                    counters.leave()
                 continue
 
-            sub_children = interactor.ray_hit(child, edge, left_intersection, right_intersection)
-            for sub_child in sub_children:
-                # logger.debug(sub_child.colour)
-                # child.add_child(sub_child)
-                child.add_children(sub_child.propagate_ray(edge_to_interactor_map))
+            stack.append((None, None, depth, state))
+            if state is not None:
+                path.add(state)
+
+            if counters is not None:
+                level = counters.enter()
+                start = perf_counter_ns()
+
+            if cache is None:
+                replacements = beam._propagate(edge_to_interactor_map)
+            else:
+                replacements = cache.propagate(beam, edge_to_interactor_map)
+
+            if counters is not None:
+                counters.add_depth_time(level, perf_counter_ns() - start)
+                counters.beams_propagated += 1
+                counters.edges_considered += len(edge_to_interactor_map)
+                counters.beams_emitted += len(replacements)
+
+            children = tuple(child[0] for child in replacements)
+            if attach_to is None:
+                roots = children
+            else:
+                attach_to.add_children(children)
+
+            for child, edge, left_intersection, right_intersection in replacements:
+                interactor = edge_to_interactor_map.get(edge)
+                if interactor is None:
+                    continue
 
-        return tuple(child[0] for child in replacements)
+                for sub_child in interactor.ray_hit(child, edge, left_intersection, right_intersection):
+                    if guard is None:
+                        stack.append((sub_child, child, depth + 1, None))
+                        continue
 
-    def _propagate(self, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor]) -> tuple[tuple[LightRay, RayInteractorEdge, Vec2, Vec2], ...]:
-        raise NotImplementedError()
+                    sub_state = guard.get_state(interactor, edge, sub_child)
+                    reason = guard.check(sub_child, depth, sub_state, path)
+                    if reason is not None:
+                        child.truncated = reason
+                        if counters is not None:
+                            counters.beams_truncated += 1
+                        continue
+
+                    stack.append((sub_child, child, depth + 1, sub_state))
 
+        return roots
 
-class ConeLightRay(LightRay):
-    pass
+    def _propagate(self, edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor]) -> tuple[tuple[LightRay, RayInteractorEdge, Vec2, Vec2], ...]:
+        raise NotImplementedError()
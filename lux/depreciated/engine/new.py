@@ -1,11 +1,25 @@
 from logging import getLogger
+from time import perf_counter_ns
+from typing import Iterable
 
 from pyglet.math import Vec2
 
-from lux.engine.interactors import RayInteractor, RayInteractorEdge
-from lux.engine.lights.beam_light_ray import BeamLightRay
-from lux.engine.lights.ray import Ray
-from lux.util.maths import get_intersection, get_intersection_fraction, get_segment_intersection_fraction
+from lux.depreciated.engine import instrument
+
+from lux.depreciated.engine.batched import EdgeBatch, find_beam_edge_map_batched
+from lux.depreciated.engine.broadphase import UniformGrid, LayeredBroadphase
+from lux.depreciated.engine.cache import PropagationCache
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.cone_light_ray import ConeLightRay, sweep_cone
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.order import EndpointOrders
+from lux.depreciated.engine.pool import LightPool
+from lux.depreciated.engine.registry import EdgeRegistry
+from lux.depreciated.engine.sweep import ActiveEdges, OrderedActiveEdges
+from lux.depreciated.engine.tree import BeamTree
+from lux.util.maths import cross_2d, get_intersection, get_intersection_fraction, get_segment_intersection_fraction
 
 logger = getLogger("lux")
 
@@ -16,9 +30,13 @@ def find_beam_edge_map(interactors, parent,
                        left_source, left_sink,
                        right_source, right_sink,
                        beam_dir, beam_normal,
-                       origin_dir, origin_normal) -> tuple[dict[RayInteractorEdge, RayInteractor], list[tuple[Vec2, float, Vec2, RayInteractorEdge]]]:
+                       origin_dir, origin_normal,
+                       registry: EdgeRegistry = None, pool: LightPool = None) -> tuple[dict[RayInteractorEdge, RayInteractor], list[tuple[Vec2, float, Vec2, RayInteractorEdge | int]]]:
+    # If there is a registry the edges are registered with it instead of being put in the map,
+    # and the points hold the id of their edge rather than the edge. If there is a pool the edges come from it.
     edge_to_interactor_map = dict()
     edge_points = []
+    counters = instrument.COUNTERS
 
     # Start by generating the adjusted edge, and clamping it to the bounds of the beam.
     # Then for the start and end
@@ -26,12 +44,27 @@ def find_beam_edge_map(interactors, parent,
         # if interactor == parent:
         #     continue
 
-        origin = interactor.origin
-        heading = interactor.direction.heading
+        # Before looking at any edges check the bounding circle, if the whole circle is behind, ahead,
+        # or off to one side of the beam then so is every edge. The tolerances are a little stricter than the
+        # edge checks below so this never throws away an edge they would have kept.
+        centre, radius = interactor.bounding_circle
+        centre_right = centre - right_source
+        right_side = centre_right.dot(beam_normal)
+        left_side = (centre - left_source).dot(beam_normal)
+        if (centre_right.dot(origin_dir) + radius <= 0.0 or
+                (centre - left_sink).dot(beam_dir) - radius >= 0.0 or
+                (right_side > radius + 0.001 and left_side > radius + 0.001) or
+                (right_side < -radius - 0.001 and left_side < -radius - 0.001)):
+            if counters is not None:
+                counters.interactors_culled += 1
+            continue
+
+        if counters is not None:
+            counters.edges_considered += len(interactor.bounds)
 
-        for original_edge in interactor.bounds:
-            start_point = origin + original_edge.start.rotate(heading)
-            end_point = origin + original_edge.end.rotate(heading)
+        for original_edge, world_edge in zip(interactor.bounds, interactor.world_bounds):
+            start_point = world_edge.start
+            end_point = world_edge.end
             edge_diff = end_point - start_point
 
             # # TODO: ACTUALLY SOLVE THIS ISSUE. Currently it breaks all the logic for deciding left and right.
@@ -49,14 +82,20 @@ def find_beam_edge_map(interactors, parent,
 
             # First check if the edge aligns with the beam. We want to ignore this edge case.
             if abs(original_edge.direction.dot(beam_dir)) == 1.0:
+                if counters is not None:
+                    counters.culled_aligned += 1
                 continue
 
             # Secondly check if the edge is behind the beam. In this case we can ignore it
             if start_right.dot(origin_dir) <= 0.00001 and end_right.dot(origin_dir) <= 0.00001:
+                if counters is not None:
+                    counters.culled_behind += 1
                 continue
 
             # Third check if the edge is ahead of the beam. In this case we can ignore it.
             if start_left.dot(beam_dir) >= -0.0001 and end_left.dot(beam_dir) >= -0.00001:
+                if counters is not None:
+                    counters.culled_ahead += 1
                 continue
 
             is_start_in_beam = ((start_right.dot(origin_dir) >= -0.0001) and (start_left.dot(beam_dir) <= 0.0001) and
@@ -76,9 +115,21 @@ def find_beam_edge_map(interactors, parent,
                 start_diff = start_final - start_intersection_point
                 end_diff = end_final - end_intersection_point
 
-                edge_final = RayInteractorEdge(start_point, end_point, original_edge.bi_dir)
-                edge_to_interactor_map[edge_final] = interactor
+                if pool is None:
+                    edge_final = RayInteractorEdge(start_point, end_point, original_edge.bi_dir)
+                else:
+                    edge_final = pool.edge(start_point, end_point, original_edge.bi_dir)
+                if registry is None:
+                    edge_to_interactor_map[edge_final] = interactor
+                else:
+                    edge_final = registry.register(edge_final, interactor)
+
+                if counters is not None:
+                    counters.intersections += 2
             else:
+                if counters is not None:
+                    counters.intersections += 4
+
                 # Fourth find if the edge intersects the right edge of the beam.
                 right_intersection = get_segment_intersection_fraction(start_point, end_point, right_source, right_sink)
                 right_start = right_source
@@ -99,6 +150,8 @@ def find_beam_edge_map(interactors, parent,
 
                 if not intersections:
                     # Because there are no intersections the edge is outside the beam
+                    if counters is not None:
+                        counters.culled_outside += 1
                     continue
                 elif len(intersections) == 1:
                     # There is one intersection
@@ -128,18 +181,30 @@ def find_beam_edge_map(interactors, parent,
                     end_final = start_point + edge_diff * end_fraction
 
                 if (start_final - end_final).dot(start_final - end_final) < 0.0001:
+                    if counters is not None:
+                        counters.culled_degenerate += 1
                     continue
 
                 # Make an edge out of the final start and end points
-                edge_final = RayInteractorEdge(start_final, end_final, original_edge.bi_dir)
-                edge_to_interactor_map[edge_final] = interactor
+                if pool is None:
+                    edge_final = RayInteractorEdge(start_final, end_final, original_edge.bi_dir)
+                else:
+                    edge_final = pool.edge(start_final, end_final, original_edge.bi_dir)
+                if registry is None:
+                    edge_to_interactor_map[edge_final] = interactor
+                else:
+                    edge_final = registry.register(edge_final, interactor)
 
                 # Find the intersection with the front of the beam, and the distance from that point
                 if start_intersection_point is None:
                     start_intersection_point = get_intersection(right_source, origin_normal, start_final, beam_dir)
+                    if counters is not None:
+                        counters.intersections += 1
 
                 if end_intersection_point is None:
                     end_intersection_point = get_intersection(right_source, origin_normal, end_final, beam_dir)
+                    if counters is not None:
+                        counters.intersections += 1
 
                 start_diff = start_final - start_intersection_point
                 end_diff = end_final - end_intersection_point
@@ -149,7 +214,46 @@ def find_beam_edge_map(interactors, parent,
     return edge_to_interactor_map, edge_points
 
 
-def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None):
+def find_cone_intersections(interactors: tuple[RayInteractor, ...], cone: ConeLightRay, parent: RayInteractor = None,
+                            broadphase: UniformGrid = None, pool: LightPool = None):
+    """
+    find_intersections for a cone. The angular sweep clips the edges itself, so the edges handed back are the whole
+    world space edges of the interactors. The edge batch isn't used since its broad phase only works for beams.
+    """
+    left, right = cone.left, cone.right
+    if broadphase is not None:
+        interactors = broadphase.query_beam(
+            left.source, left.source + left.direction * left.length,
+            right.source, right.source + right.direction * right.length
+        )
+
+    edge_to_interactor_map: dict[RayInteractorEdge, RayInteractor | None] = dict()
+    for interactor in interactors:
+        for world_edge in interactor.world_bounds:
+            edge_to_interactor_map[world_edge] = interactor
+
+    replacements, back_edge = sweep_cone(cone, tuple(edge_to_interactor_map), pool)
+    edge_to_interactor_map[back_edge] = None
+
+    counters = instrument.COUNTERS
+    if counters is not None:
+        counters.beams_propagated += 1
+        counters.edges_considered += len(edge_to_interactor_map) - 1
+        counters.beams_emitted += len(replacements)
+    return replacements, edge_to_interactor_map
+
+
+def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None,
+                       edge_batch: EdgeBatch = None, broadphase: UniformGrid = None,
+                       active_edges_type: type[ActiveEdges] = OrderedActiveEdges, coalesce: bool = True,
+                       pool: LightPool = None, orders: EndpointOrders = None, order_key: int = None):
+    if isinstance(beam, ConeLightRay):
+        return find_cone_intersections(interactors, beam, parent, broadphase, pool)
+
+    counters = instrument.COUNTERS
+    if counters is not None:
+        counters.beams_propagated += 1
+
     beam_colour = beam.colour
 
     left_source = beam.left.source
@@ -170,21 +274,50 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
 
     end_normal: Vec2 = (left_sink - right_sink) / end_width
 
-    edge_to_interactor_map, edge_points = find_beam_edge_map(interactors, parent,
-                                                             left_source, left_sink,
-                                                             right_source, right_sink,
-                                                             beam_dir, beam_normal,
-                                                             origin_dir, origin_normal)
-
-    back_edge = RayInteractorEdge(right_sink, left_sink, True)
-    edge_to_interactor_map[back_edge] = None
+    # Only the interactors whose bounds overlap the beam can possibly be hit.
+    edge_indices = None
+    if broadphase is not None:
+        interactors = broadphase.query_beam(left_source, left_sink, right_source, right_sink)
+        if edge_batch is not None:
+            edge_indices = edge_batch.edge_indices(interactors)
+
+    # The sweep works with the id of each edge, so it never has to hash one.
+    registry = EdgeRegistry()
+    edges = registry.edges
+
+    if edge_batch is None:
+        _, edge_points = find_beam_edge_map(interactors, parent,
+                                            left_source, left_sink,
+                                            right_source, right_sink,
+                                            beam_dir, beam_normal,
+                                            origin_dir, origin_normal,
+                                            registry, pool)
+    else:
+        # The interactors have been packed into an edge batch, so we can do the broad phase all at once.
+        _, edge_points = find_beam_edge_map_batched(edge_batch, parent,
+                                                    left_source, left_sink,
+                                                    right_source, right_sink,
+                                                    beam_dir, beam_normal,
+                                                    origin_dir, origin_normal,
+                                                    edge_indices, registry, pool)
+
+    back_edge = RayInteractorEdge(right_sink, left_sink, True) if pool is None else pool.edge(right_sink, left_sink, True)
+    back_edge = registry.register(back_edge, None)
     edge_points.append((right_sink, beam.right.length**2, right_source, back_edge))
 
     if len(edge_points) == 1:
-        return [(beam, back_edge, right_sink, left_sink)], edge_to_interactor_map
-
-    # Sort every point from left to right, breaking ties by depth
-    sorted_points = sorted(edge_points, key=lambda p: ((right_source - p[2]).dot(beam_normal), p[1]))
+        return [(beam, edges[back_edge], right_sink, left_sink)], registry.edge_map()
+
+    # Sort every point from left to right, breaking ties by depth and then by the order they were found in.
+    # The first key is (right_source - p[2]).dot(beam_normal) written out, so no Vec2s are made.
+    normal_x, normal_y = beam_normal.x, beam_normal.y
+    source_x, source_y = right_source.x, right_source.y
+    keys = [((source_x - p[2].x) * normal_x + (source_y - p[2].y) * normal_y, p[1], idx) for idx, p in enumerate(edge_points)]
+    if orders is None:
+        keys.sort()
+        sorted_points = [edge_points[key[2]] for key in keys]
+    else:
+        sorted_points = [edge_points[idx] for idx in orders.sort(order_key, keys)]
     sorted_points.append((left_sink, beam.left.length**2, left_source, back_edge))
 
     end_fraction = get_intersection_fraction(
@@ -192,7 +325,7 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
         sorted_points[0][2], beam_dir
     )
 
-    current_edge: RayInteractorEdge = sorted_points[0][-1]
+    current_edge: int = sorted_points[0][-1]
     right_ray: Ray = Ray(
         sorted_points[0][2],
         beam_dir,
@@ -200,8 +333,10 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
         right_strength + end_fraction * (left_strength - right_strength)
     )
 
-    active_edges: set[RayInteractorEdge] = {current_edge}
-    incomplete_edges: set[RayInteractorEdge] = set(edge_to_interactor_map.keys())
+    # Ordered by depth so finding the next nearest edge doesn't have to look at every edge we are inside of.
+    active_edges: ActiveEdges = active_edges_type(beam_dir, registry)
+    active_edges.add(current_edge, sorted_points[0][2])
+    incomplete_edges: set[int] = set(range(len(registry)))
     finalised_beams: list[tuple[BeamLightRay, RayInteractorEdge, Vec2, Vec2]] = []
     for end, length_sqr, start, edge in sorted_points[1:]:
         left_ray = None
@@ -210,13 +345,13 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
 
         if edge in active_edges:
             # This edge is ending
-            active_edges.discard(edge)
+            active_edges.discard(edge, start)
             starting = False
 
             incomplete_edges.discard(edge)
         else:
             # The edge is starting
-            active_edges.add(edge)
+            active_edges.add(edge, start)
             starting = True
 
         # logger.debug(f"{edge}")
@@ -227,10 +362,12 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
         # We need to find the distance from the current edge to do comparisons
         if edge != current_edge:
             current_intersection = get_intersection(
-                current_edge.start, current_edge.direction,
+                edges[current_edge].start, edges[current_edge].direction,
                 start, beam_dir
             )
             current_diff = (start - current_intersection)
+            if counters is not None:
+                counters.intersections += 1
         else:
             current_intersection = end
             current_diff = (start - end)
@@ -271,19 +408,7 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
             )
 
             if end != left_sink:
-                next_edge = None
-                closest_dist = float('inf')
-
-                for edge_ in active_edges:
-                    intersection = get_intersection(
-                        edge_.start, edge_.direction,
-                        start, beam_dir
-                    )
-
-                    intersection_dist = (intersection - start).mag
-                    if intersection_dist < closest_dist:
-                        next_edge = edge_
-                        closest_dist = intersection_dist
+                next_edge, closest_dist = active_edges.nearest(start)
 
                 assert next_edge is not None, "AHHHH There should always be at least one edge in active edges."
                 next_current_edge = next_edge
@@ -298,15 +423,18 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
         if left_ray is not None:
             # logger.debug("making a new beam")
             if left_ray.source != right_ray.source:
-                new_beam = BeamLightRay(
-                    beam_colour,
-                    left_ray,
-                    right_ray
-                )
+                if pool is None:
+                    new_beam = BeamLightRay(
+                        beam_colour,
+                        left_ray,
+                        right_ray
+                    )
+                else:
+                    new_beam = pool.beam(beam_colour, left_ray, right_ray)
                 left_intersection = left_ray.source + beam_dir * left_ray.length
                 right_intersection = right_ray.source + beam_dir * right_ray.length
 
-                finalised_beams.append((new_beam, current_edge, left_intersection, right_intersection))
+                finalised_beams.append((new_beam, edges[current_edge], left_intersection, right_intersection))
 
             right_ray = next_right_ray
             current_edge = next_current_edge
@@ -314,22 +442,154 @@ def find_intersections(interactors: tuple[RayInteractor, ...], beam: BeamLightRa
         if start == left_source:
             break
 
-    return finalised_beams, edge_to_interactor_map
+    edge_map = registry.edge_map()
+    if coalesce:
+        finalised_beams = coalesce_beams(finalised_beams, edge_map, pool=pool)
+    if counters is not None:
+        counters.beams_emitted += len(finalised_beams)
+    return finalised_beams, edge_map
+
+
+def coalesce_beams(replacements: list[tuple[BeamLightRay, RayInteractorEdge, Vec2, Vec2]],
+                   edge_map: dict[RayInteractorEdge, RayInteractor | None],
+                   tolerance: float = 0.0001, pool: LightPool = None) -> list[tuple[BeamLightRay, RayInteractorEdge, Vec2, Vec2]]:
+    """
+    Merge neighbouring beams out of find_intersections which would come out of the interactor exactly the same
+    way if they were one beam. That is when they are the same colour, touch along the front of the beam and where
+    they hit, and hit parallel edges of the same interactor facing the same way (e.g. a wall made of lots of pieces).
+    Otherwise each sliver would be propagated on its own, and so would everything that comes out of it.
+    """
+    if len(replacements) < 2:
+        return replacements
+
+    tolerance_sqr = tolerance * tolerance
+    merged = [replacements[0]]
+    for child, edge, left_intersection, right_intersection in replacements[1:]:
+        prev, prev_edge, prev_left_intersection, prev_right_intersection = merged[-1]
+
+        if edge is not prev_edge:
+            if edge_map.get(edge) is not edge_map.get(prev_edge) or edge.bi_dir != prev_edge.bi_dir:
+                merged.append((child, edge, left_intersection, right_intersection))
+                continue
+
+            direction, prev_direction = edge.direction, prev_edge.direction
+            if abs(cross_2d(direction, prev_direction)) > tolerance or direction.dot(prev_direction) <= 0.0:
+                merged.append((child, edge, left_intersection, right_intersection))
+                continue
+
+        front_gap = prev.left.source - child.right.source
+        hit_gap = prev_left_intersection - right_intersection
+        if child.colour != prev.colour or front_gap.dot(front_gap) > tolerance_sqr or hit_gap.dot(hit_gap) > tolerance_sqr:
+            merged.append((child, edge, left_intersection, right_intersection))
+            continue
+
+        joined = BeamLightRay(prev.colour, child.left, prev.right) if pool is None else pool.beam(prev.colour, child.left, prev.right)
+        merged[-1] = (joined, prev_edge, left_intersection, prev_right_intersection)
+
+    return merged
 
 
 # TODO: This obviously needs to be on the BeamLightRay object.
 # How to do that? I have no idea.
-def propogate_beam(interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None):
-    kids = 0
-    replacements, edge_map = find_intersections(interactors, beam, parent)
-    for child, edge, left_intersection, right_intersection in replacements:
-        kids += 1
-        interactor = edge_map.get(edge)
-        if interactor is None:
+def propogate_beam(interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None,
+                   edge_batch: EdgeBatch = None, broadphase: UniformGrid = None, cache: PropagationCache = None,
+                   guard: PropagationGuard | None = DEFAULT_GUARD, orders: EndpointOrders = None,
+                   depth: int = 1, path: Iterable[tuple] = ()) -> tuple[LightRay, ...]:
+    # Without a guard nothing stops mirrors or portals which face each other from going on forever.
+    # depth and path carry on a walk from partway down a tree (e.g. a subtree sent to another process),
+    # they are how deep the beam is and the guard states of every beam above it, including its own.
+    return _walk(interactors, beam, parent, edge_batch, broadphase, cache, guard, None, None, orders, depth, path)
+
+
+def propogate_beam_into(tree: BeamTree, interactors: tuple[RayInteractor, ...], beam: BeamLightRay, parent: RayInteractor = None,
+                        edge_batch: EdgeBatch = None, broadphase: UniformGrid | LayeredBroadphase = None, cache: PropagationCache = None,
+                        guard: PropagationGuard | None = DEFAULT_GUARD, pool: LightPool = None,
+                        orders: EndpointOrders = None) -> tuple[int, ...]:
+    """
+    The same walk as propogate_beam, but every beam is written into the tree instead of being linked to its
+    parent, so the LightRays only live as long as it takes to split them. Returns the indices of the top level beams.
+
+    Since nothing is kept the LightRays and edges can come from a pool, which the caller resets once a solve.
+    The same goes for the EndpointOrders, which start each beam's sort from the order it had last solve.
+    Neither is used by a PropagationCache, since it doesn't split the beams it has seen before.
+    """
+    if pool is not None and cache is not None:
+        raise ValueError("A LightPool can't be used with a PropagationCache, the cache holds on to the edges")
+    return _walk(interactors, beam, parent, edge_batch, broadphase, cache, guard, tree, pool, orders)
+
+
+def _walk(interactors: tuple[RayInteractor, ...], beam: LightRay, parent: RayInteractor | None,
+          edge_batch: EdgeBatch | None, broadphase: UniformGrid | LayeredBroadphase | None, cache: PropagationCache | None,
+          guard: PropagationGuard | None, tree: BeamTree | None, pool: LightPool | None, orders: EndpointOrders | None,
+          depth: int = 1, path: Iterable[tuple] = ()):
+    # Depth first, with a stack rather than recursion so a deep tree can't run out of python stack.
+    # Each entry is (beam, interactor it came out of, beam or tree index its children go under, depth, guard state,
+    # key of the beam in the orders). An entry without a beam marks the end of a beam's subtree, where its state comes off the path.
+    counters = instrument.COUNTERS
+    path: set[tuple] = set(path)
+    roots = []
+    stack = [(beam, parent, None, depth, None, None if orders is None else orders.root())]
+    while stack:
+        beam, parent, attach_to, depth, state, key = stack.pop()
+        if beam is None:
+            path.discard(state)
+            if counters is not None:
+                counters.leave()
             continue
 
-        sub_children = interactor.ray_hit(child, edge, left_intersection, right_intersection)
-        for sub_child in sub_children:
-            child.add_children(propogate_beam(interactors, sub_child, interactor))
+        stack.append((None, None, None, depth, state, None))
+        if state is not None:
+            path.add(state)
+
+        if counters is not None:
+            level = counters.enter()
+            start = perf_counter_ns()
+
+        if cache is None:
+            replacements, edge_map = find_intersections(interactors, beam, parent, edge_batch, broadphase, pool=pool,
+                                                        orders=orders, order_key=key)
+        else:
+            replacements, edge_map = cache.find_intersections(interactors, beam, parent, edge_batch, broadphase)
+
+        if counters is not None:
+            counters.add_depth_time(level, perf_counter_ns() - start)
+
+        if tree is None:
+            children = tuple(child[0] for child in replacements)
+            if attach_to is None:
+                roots.extend(children)
+            else:
+                attach_to.add_children(children)
+
+        for replacement, (child, edge, left_intersection, right_intersection) in enumerate(replacements):
+            if tree is None:
+                owner = child
+            else:
+                owner = tree.add(child, -1 if attach_to is None else attach_to)
+                if attach_to is None:
+                    roots.append(owner)
+
+            interactor = edge_map.get(edge)
+            if interactor is None:
+                continue
+
+            for idx, sub_child in enumerate(interactor.ray_hit(child, edge, left_intersection, right_intersection, pool)):
+                sub_key = None if orders is None else orders.child(key, replacement, idx)
+                if guard is None:
+                    stack.append((sub_child, interactor, owner, depth + 1, None, sub_key))
+                    continue
+
+                sub_state = guard.get_state(interactor, edge, sub_child)
+                reason = guard.check(sub_child, depth, sub_state, path)
+                if reason is not None:
+                    if tree is None:
+                        child.truncated = reason
+                    else:
+                        tree.truncate(owner, reason)
+                    if counters is not None:
+                        counters.beams_truncated += 1
+                    continue
+
+                stack.append((sub_child, interactor, owner, depth + 1, sub_state, sub_key))
 
-    return tuple(child[0] for child in replacements)
+    return tuple(roots)
@@ -0,0 +1,112 @@
+"""
+Remembering the order the endpoints of each beam were sorted into, so the next solve can start from it.
+
+Between two frames the beams barely move, so the endpoints of a beam nearly always come out in the same order.
+EndpointOrders keeps the permutation of every beam from the last solve. The next solve puts its endpoints into
+that order first, and if they are still sorted that's the end of it. If only a few are out of place the list is
+sorted from there, which python's sort (a timsort) repairs in close to one pass because it finds the runs which are
+already in order. Only when a lot has changed is it thrown away and sorted from scratch.
+
+A beam is known by where it is in the tree: which light source it started from, and which replacement and child it
+was at every split on the way. If that changes the beam just gets the wrong order to start from, which costs a full
+sort but never changes the result, since the keys always end in the endpoint's index to break ties.
+"""
+from __future__ import annotations
+from operator import gt
+
+from lux.depreciated.engine import instrument
+
+__all__ = (
+    "EndpointOrders",
+)
+
+
+class EndpointOrders:
+    """
+    The endpoint permutation of every beam from the last solve, and the ones made this solve.
+    Call reset before each solve, the orders which weren't used last solve are dropped then.
+
+    max_disorder is the fraction of neighbouring endpoints which can be out of order before the old order is
+    thrown away and the endpoints are sorted from scratch.
+    """
+    __slots__ = (
+        "max_disorder",
+        "_previous",
+        "_current",
+        "_roots"
+    )
+
+    def __init__(self, max_disorder: float = 0.25):
+        if not 0.0 <= max_disorder <= 1.0:
+            raise ValueError("The max disorder of EndpointOrders is a fraction, it has to be between 0 and 1")
+
+        self.max_disorder: float = max_disorder
+        self._previous: dict[int, list[int]] = dict()
+        self._current: dict[int, list[int]] = dict()
+        self._roots: int = 0
+
+    def reset(self):
+        """
+        Start a new solve, what was sorted during the last one is what the next one starts from.
+        """
+        self._previous = self._current
+        self._current = dict()
+        self._roots = 0
+
+    def release(self):
+        """
+        Forget every order, e.g. when the level is unloaded.
+        """
+        self._previous = dict()
+        self._current = dict()
+        self._roots = 0
+
+    def __len__(self):
+        return len(self._current)
+
+    def root(self) -> int:
+        """
+        The key of the next light source to be solved, they are numbered in the order they are solved.
+        """
+        key = self._roots
+        self._roots = key + 1
+        return key
+
+    @staticmethod
+    def child(key: int, replacement: int, child: int) -> int:
+        """
+        The key of a beam which came out of the beam with key, from its nth replacement and that replacement's nth child.
+        """
+        return hash((key, replacement, child))
+
+    def sort(self, key: int, keys: list[tuple]) -> list[int]:
+        """
+        The indices of keys in sorted order, starting from the order the beam with key was sorted into last time.
+        The keys have to be unique, so the result doesn't depend on the order they started in. Don't change the list returned.
+        """
+        count = len(keys)
+        order = self._previous.get(key)
+        counters = instrument.COUNTERS
+
+        if order is None or len(order) != count:
+            order = sorted(range(count), key=keys.__getitem__)
+            if counters is not None:
+                counters.sorts_full += 1
+        else:
+            ordered = [keys[idx] for idx in order]
+            descents = sum(map(gt, ordered, ordered[1:]))
+            if not descents:
+                if counters is not None:
+                    counters.sorts_reused += 1
+            elif descents <= count * self.max_disorder:
+                order = order.copy()
+                order.sort(key=keys.__getitem__)
+                if counters is not None:
+                    counters.sorts_repaired += 1
+            else:
+                order = sorted(range(count), key=keys.__getitem__)
+                if counters is not None:
+                    counters.sorts_full += 1
+
+        self._current[key] = order
+        return order
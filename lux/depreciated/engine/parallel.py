@@ -0,0 +1,191 @@
+from __future__ import annotations
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import count
+from logging import getLogger
+from multiprocessing.shared_memory import SharedMemory
+from os import getpid
+
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
+from lux.depreciated.engine.interactors import RayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import find_intersections, propogate_beam
+
+logger = getLogger("lux")
+
+_frame_ids = count()
+
+# The scene each worker process last loaded, as (frame name, interactors, edge batch, broadphase).
+_worker_scene: tuple[str, tuple[RayInteractor, ...], EdgeBatch | None, UniformGrid | None] | None = None
+
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name, track=False)
+    except TypeError:
+        # Before 3.13 attaching always registers the memory with the resource tracker. The workers share
+        # the main process's tracker though, so it is already registered and the main process still owns it.
+        return SharedMemory(name)
+
+
+def _load_scene(name: str, size: int, batched: bool, cell_size: float | None):
+    global _worker_scene
+    shared = _attach(name)
+    try:
+        interactors = pickle.loads(shared.buf[:size])
+    finally:
+        shared.close()
+
+    edge_batch = None if not batched else EdgeBatch(interactors)
+    broadphase = None
+    if cell_size is not None:
+        broadphase = UniformGrid(cell_size)
+        broadphase.extend(interactors, static=True)
+
+    _worker_scene = (name, interactors, edge_batch, broadphase)
+
+
+def _propagate_subtree(name: str, size: int, batched: bool, cell_size: float | None, guard: PropagationGuard | None,
+                       beam: BeamLightRay, parent_index: int, depth: int, path: tuple[tuple, ...]) -> tuple[BeamLightRay, ...]:
+    if _worker_scene is None or _worker_scene[0] != name:
+        _load_scene(name, size, batched, cell_size)
+
+    _, interactors, edge_batch, broadphase = _worker_scene
+    # The guard states were sent with the index of their interactor, since the worker has its own copies.
+    path = tuple((interactors[state[0]],) + state[1:] for state in path)
+    return propogate_beam(interactors, beam, interactors[parent_index], edge_batch, broadphase,
+                          guard=guard, depth=depth, path=path)
+
+
+class ParallelPropagator:
+    """
+    Propagates beams like propogate_beam, but once the tree is wide enough each sibling subtree is
+    propagated in a process pool and merged back in, giving the same tree as the serial version.
+
+    The interactors are pickled into shared memory once per frame with `ship`, each worker only unpickles
+    them the first time it sees a frame. Everything about the interactors has to be picklable, so the workers
+    rebuild their own edge batch and broadphase rather than being sent the main process's.
+    The guard stops light being followed around in cycles, like propogate_beam. Each subtree is sent with
+    how deep it is and the guard states above it, so it is cut off in the same place as the serial walk.
+    """
+
+    def __init__(self, max_workers: int | None = None, min_width: int = 8, batched: bool = False, cell_size: float | None = None,
+                 guard: PropagationGuard | None = DEFAULT_GUARD):
+        if min_width < 1:
+            raise ValueError("A ParallelPropagator needs a min_width of at least one")
+
+        self.min_width: int = min_width
+        self.batched: bool = batched
+        self.cell_size: float | None = cell_size
+        self.guard: PropagationGuard | None = guard
+
+        self._max_workers: int | None = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+
+        self._interactors: tuple[RayInteractor, ...] = ()
+        self._indices: dict[int, int] = {}
+        self._edge_batch: EdgeBatch | None = None
+        self._broadphase: UniformGrid | None = None
+        self._shared: SharedMemory | None = None
+        self._size: int = 0
+
+    def release(self):
+        """
+        Shut down the pool, and free the shipped scene.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._free()
+
+    def _free(self):
+        if self._shared is not None:
+            self._shared.close()
+            self._shared.unlink()
+            self._shared = None
+
+    def ship(self, interactors: tuple[RayInteractor, ...]):
+        """
+        Send the interactors as they are now to the workers, call this once a frame before propagating.
+        """
+        self._free()
+
+        self._interactors = tuple(interactors)
+        self._indices = {id(interactor): idx for idx, interactor in enumerate(self._interactors)}
+
+        # The top of the tree is still split on this process, so it wants the same acceleration as the workers.
+        self._edge_batch = None if not self.batched else EdgeBatch(self._interactors)
+        self._broadphase = None
+        if self.cell_size is not None:
+            self._broadphase = UniformGrid(self.cell_size)
+            self._broadphase.extend(self._interactors, static=True)
+
+        data = pickle.dumps(self._interactors, pickle.HIGHEST_PROTOCOL)
+        self._shared = SharedMemory(f"lux_{getpid()}_{next(_frame_ids)}", create=True, size=len(data))
+        self._shared.buf[:len(data)] = data
+        self._size = len(data)
+
+    def propagate(self, beam: BeamLightRay, parent: RayInteractor = None) -> tuple[BeamLightRay, ...]:
+        """
+        A drop in for propogate_beam using the shipped interactors.
+        """
+        if self._shared is None:
+            raise ValueError("The interactors have to be shipped before propagating")
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._max_workers)
+
+        interactors = self._interactors
+        guard = self.guard
+
+        # Split the tree breadth first on this process until there are enough subtrees to be worth sending off.
+        # Each level is (beam, interactor it came out of, beam its subtree gets added to, depth, guard states above it).
+        roots = []
+        level = [(beam, parent, None, 1, frozenset())]
+        subtrees: list[tuple[BeamLightRay, RayInteractor, BeamLightRay, int, frozenset[tuple]]] = []
+        while level:
+            next_level = []
+            for sub_beam, sub_parent, attach_to, depth, path in level:
+                replacements, edge_map = find_intersections(interactors, sub_beam, sub_parent, self._edge_batch, self._broadphase)
+                children = tuple(child[0] for child in replacements)
+                if attach_to is None:
+                    roots.extend(children)
+                else:
+                    attach_to.add_children(children)
+
+                for child, edge, left_intersection, right_intersection in replacements:
+                    interactor = edge_map.get(edge)
+                    if interactor is None:
+                        continue
+
+                    for sub_child in interactor.ray_hit(child, edge, left_intersection, right_intersection):
+                        if guard is None:
+                            next_level.append((sub_child, interactor, child, depth + 1, path))
+                            continue
+
+                        state = guard.get_state(interactor, edge, sub_child)
+                        reason = guard.check(sub_child, depth, state, path)
+                        if reason is not None:
+                            child.truncated = reason
+                            continue
+                        next_level.append((sub_child, interactor, child, depth + 1, path | {state}))
+
+            if len(next_level) >= self.min_width:
+                subtrees = next_level
+                break
+            level = next_level
+
+        indices = self._indices
+        futures: list[tuple[Future, BeamLightRay]] = [
+            (self._pool.submit(
+                _propagate_subtree, self._shared.name, self._size, self.batched, self.cell_size, guard,
+                sub_beam, indices[id(sub_parent)], depth, tuple((indices[id(state[0])],) + state[1:] for state in path)
+            ), attach_to)
+            for sub_beam, sub_parent, attach_to, depth, path in subtrees
+        ]
+        for future, attach_to in futures:
+            attach_to.add_children(future.result())
+
+        return tuple(roots)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from logging import getLogger
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.interactors.ray_interactor import RayInteractorEdge
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.cone_light_ray import ConeLightRay
+from lux.util.colour import LuxColour
+
+logger = getLogger("lux")
+
+
+class LightPool:
+    """
+    Free lists of the beams, cones, and edges made while solving, so a solve which is run every frame
+    reuses the last frame's objects instead of making new ones.
+
+    Everything handed out stays handed out until reset, which hands it all out again from the start.
+    That is only safe if nothing keeps hold of them past the reset, so use a pool with propogate_beam_into
+    (which copies what it keeps into a BeamTree) and not with propogate_beam or a PropagationCache.
+
+    The Rays and Vec2s inside are tuples, which can't be reused, so they are still made fresh every time.
+    """
+    __slots__ = (
+        "_beams",
+        "_beams_used",
+        "_cones",
+        "_cones_used",
+        "_edges",
+        "_edges_used"
+    )
+
+    def __init__(self):
+        self._beams: list[BeamLightRay] = []
+        self._beams_used: int = 0
+        self._cones: list[ConeLightRay] = []
+        self._cones_used: int = 0
+        self._edges: list[RayInteractorEdge] = []
+        self._edges_used: int = 0
+
+    def reset(self):
+        """
+        Take back everything that has been handed out, call this before each solve.
+        """
+        self._beams_used = 0
+        self._cones_used = 0
+        self._edges_used = 0
+
+    def release(self):
+        """
+        Throw away everything in the pool, e.g. when the level is unloaded.
+        """
+        self._beams = []
+        self._cones = []
+        self._edges = []
+        self.reset()
+
+    def __len__(self):
+        return len(self._beams) + len(self._cones) + len(self._edges)
+
+    @property
+    def in_use(self) -> int:
+        return self._beams_used + self._cones_used + self._edges_used
+
+    def beam(self, colour: LuxColour, left: Ray, right: Ray) -> BeamLightRay:
+        used = self._beams_used
+        if used == len(self._beams):
+            beam = BeamLightRay(colour, left, right)
+            self._beams.append(beam)
+        else:
+            beam = self._beams[used]
+            beam._reset(colour, left, right)
+            if instrument.COUNTERS is not None:
+                instrument.COUNTERS.lights_reused += 1
+        self._beams_used = used + 1
+        return beam
+
+    def cone(self, colour: LuxColour, left: Ray, right: Ray, origin: Vec2 = None) -> ConeLightRay:
+        used = self._cones_used
+        if used == len(self._cones):
+            cone = ConeLightRay(colour, left, right, origin)
+            self._cones.append(cone)
+        else:
+            cone = self._cones[used]
+            cone._reset(colour, left, right, origin)
+            if instrument.COUNTERS is not None:
+                instrument.COUNTERS.lights_reused += 1
+        self._cones_used = used + 1
+        return cone
+
+    def light(self, colour: LuxColour, left: Ray, right: Ray) -> LightRay:
+        """
+        A beam if the rays are parallel, otherwise a cone, like make_light_ray.
+        """
+        if left.direction == right.direction:
+            return self.beam(colour, left, right)
+        return self.cone(colour, left, right)
+
+    def edge(self, start: Vec2, end: Vec2, bi_dir: bool) -> RayInteractorEdge:
+        used = self._edges_used
+        if used == len(self._edges):
+            edge = RayInteractorEdge(start, end, bi_dir)
+            self._edges.append(edge)
+        else:
+            edge = self._edges[used]
+            edge._set(start, end, bi_dir)
+            if instrument.COUNTERS is not None:
+                instrument.COUNTERS.edges_reused += 1
+        self._edges_used = used + 1
+        return edge
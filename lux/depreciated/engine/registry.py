@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+
+
+class EdgeRegistry:
+    """
+    Gives every clipped edge found while splitting a beam an integer id, so the sweep can keep its
+    sets and maps of ints rather than hashing RayInteractorEdges (which formats a string every time).
+
+    The geometry is also kept as plain floats, one list per component, indexed by the id.
+    The ids are stable until the registry is cleared.
+    """
+    __slots__ = (
+        "edges",
+        "interactors",
+        "start_x",
+        "start_y",
+        "end_x",
+        "end_y",
+        "direction_x",
+        "direction_y"
+    )
+
+    def __init__(self):
+        self.edges: list[RayInteractorEdge] = []
+        self.interactors: list[RayInteractor | None] = []
+
+        self.start_x: list[float] = []
+        self.start_y: list[float] = []
+        self.end_x: list[float] = []
+        self.end_y: list[float] = []
+        self.direction_x: list[float] = []
+        self.direction_y: list[float] = []
+
+    def __len__(self):
+        return len(self.edges)
+
+    def register(self, edge: RayInteractorEdge, interactor: RayInteractor | None) -> int:
+        idx = len(self.edges)
+        self.edges.append(edge)
+        self.interactors.append(interactor)
+
+        start, end, direction = edge.start, edge.end, edge.direction
+        self.start_x.append(start.x)
+        self.start_y.append(start.y)
+        self.end_x.append(end.x)
+        self.end_y.append(end.y)
+        self.direction_x.append(direction.x)
+        self.direction_y.append(direction.y)
+
+        return idx
+
+    def clear(self):
+        for values in (self.edges, self.interactors, self.start_x, self.start_y,
+                       self.end_x, self.end_y, self.direction_x, self.direction_y):
+            values.clear()
+
+    def edge_map(self) -> dict[RayInteractorEdge, RayInteractor | None]:
+        """
+        The edge to interactor map find_intersections has always handed back, in the order the edges were registered.
+        """
+        return dict(zip(self.edges, self.interactors))
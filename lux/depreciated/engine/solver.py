@@ -0,0 +1,271 @@
+from __future__ import annotations
+from logging import getLogger
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid, get_interactor_aabb
+from lux.depreciated.engine.cache import PropagationCache
+from lux.depreciated.engine.guard import PropagationGuard, DEFAULT_GUARD
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import find_intersections
+
+logger = getLogger("lux")
+
+
+def get_beam_aabb(beam: BeamLightRay) -> tuple[Vec2, Vec2]:
+    left_sink = beam.left.source + beam.left.direction * beam.left.length
+    right_sink = beam.right.source + beam.right.direction * beam.right.length
+    points = (beam.left.source, left_sink, right_sink, beam.right.source)
+
+    return (
+        Vec2(min(p.x for p in points), min(p.y for p in points)),
+        Vec2(max(p.x for p in points), max(p.y for p in points))
+    )
+
+
+def _aabb_overlap(a: tuple[Vec2, Vec2], b: tuple[Vec2, Vec2]) -> bool:
+    return a[0].x <= b[1].x and b[0].x <= a[1].x and a[0].y <= b[1].y and b[0].y <= a[1].y
+
+
+class BeamSegment:
+    """
+    One of the beams a BeamNode was split into, along with the edge it ended on and the beams that came out.
+    """
+    __slots__ = (
+        "beam",
+        "edge",
+        "interactor",
+        "left_intersection",
+        "right_intersection",
+        "children"
+    )
+
+    def __init__(self, beam: BeamLightRay, edge: RayInteractorEdge, interactor: RayInteractor | None,
+                 left_intersection: Vec2, right_intersection: Vec2):
+        self.beam: BeamLightRay = beam
+        self.edge: RayInteractorEdge = edge
+        self.interactor: RayInteractor | None = interactor
+        self.left_intersection: Vec2 = left_intersection
+        self.right_intersection: Vec2 = right_intersection
+        self.children: tuple[BeamNode, ...] = ()
+
+
+class BeamNode:
+    """
+    A beam before it has been split up by the interactors in its way. Unlike the LightRay tree,
+    which only keeps the split up beams, this remembers what was propagated so it can be redone.
+    """
+    __slots__ = (
+        "beam",
+        "parent",
+        "bounds",
+        "segments",
+        "depth",
+        "path"
+    )
+
+    def __init__(self, beam: BeamLightRay, parent: RayInteractor | None, depth: int = 1, path: frozenset[tuple] = frozenset()):
+        self.beam: BeamLightRay = beam
+        self.parent: RayInteractor | None = parent
+        self.bounds: tuple[Vec2, Vec2] = get_beam_aabb(beam)
+        self.segments: tuple[BeamSegment, ...] = ()
+        # How deep the node is and the guard states of the beams above it, so it can be re-split on its own.
+        self.depth: int = depth
+        self.path: frozenset[tuple] = path
+
+
+class IncrementalSolver:
+    """
+    Propagates the light sources the same way propogate_beam does, but keeps the tree between solves.
+
+    The solver listens to the origin, direction, and colour of every interactor. When one changes only
+    the beams whose quads overlap where the interactor was or is now get re-propagated (with everything
+    downstream of them). Beams which hit an interactor that was only recoloured (or whose linked interactor moved)
+    keep their segments and only re-emit out of the interactor. Everything else is reused as is.
+    The guard stops light being followed around in cycles, like propogate_beam.
+    """
+
+    def __init__(self, interactors: tuple[RayInteractor, ...], edge_batch: EdgeBatch = None, broadphase: UniformGrid = None,
+                 cache: PropagationCache = None, guard: PropagationGuard | None = DEFAULT_GUARD):
+        self.interactors: tuple[RayInteractor, ...] = tuple(interactors)
+        self.edge_batch: EdgeBatch = edge_batch
+        self.broadphase: UniformGrid = broadphase
+        self.cache: PropagationCache = cache
+        self.guard: PropagationGuard | None = guard
+
+        self._roots: list[BeamNode] = []
+
+        # Where every interactor was during the last solve, so we know what a moved interactor used to cover.
+        self._solved_bounds: dict[RayInteractor, tuple[Vec2, Vec2]] = {
+            interactor: get_interactor_aabb(interactor) for interactor in self.interactors
+        }
+        self._moved: set[RayInteractor] = set()
+        self._recoloured: set[RayInteractor] = set()
+
+        for interactor in self.interactors:
+            interactor.add_listeners(('origin', 'direction'), self._on_interactor_moved)
+            interactor.add_listener('colour', self._on_interactor_recoloured)
+
+    def release(self):
+        """
+        Stop listening to the interactors, and kill the tree.
+        """
+        for interactor in self.interactors:
+            interactor.remove_listeners(('origin', 'direction'), self._on_interactor_moved)
+            interactor.remove_listener('colour', self._on_interactor_recoloured)
+
+        for root in self._roots:
+            self._discard(root)
+        self._roots = []
+
+    @property
+    def is_dirty(self):
+        return bool(self._moved or self._recoloured)
+
+    def _on_interactor_moved(self, interactor: RayInteractor, attr: str, value: Vec2):
+        self._moved.add(interactor)
+
+    def _on_interactor_recoloured(self, interactor: RayInteractor, attr: str, value):
+        self._recoloured.add(interactor)
+
+    # -- Sources --
+
+    def add_source(self, beam: BeamLightRay):
+        self._roots.append(self._build(beam, None, 1, frozenset()))
+
+    def remove_source(self, beam: BeamLightRay):
+        for root in self._roots:
+            if root.beam is beam:
+                self._discard(root)
+                self._roots.remove(root)
+                return
+        raise ValueError(f"{beam} is not a source of this solver")
+
+    @property
+    def sources(self) -> tuple[BeamLightRay, ...]:
+        return tuple(root.beam for root in self._roots)
+
+    # -- Solving --
+
+    def solve(self) -> tuple[BeamLightRay, ...]:
+        """
+        Bring the tree up to date with the interactors, and return the top level beams like propogate_beam.
+        """
+        if self.is_dirty:
+            if self._moved and self.edge_batch is not None:
+                self.edge_batch.refresh()
+
+            # Both where the moved interactors were, and where they are now.
+            regions = []
+            for interactor in self._moved:
+                regions.append(self._solved_bounds[interactor])
+                new_bounds = get_interactor_aabb(interactor)
+                regions.append(new_bounds)
+                self._solved_bounds[interactor] = new_bounds
+
+            # Anything which hits these interactors may come out differently, even if where it hits doesn't change.
+            re_emit = set(self._recoloured)
+            for interactor in self._moved:
+                re_emit.add(interactor)
+                re_emit.update(interactor.linked)
+
+            self._moved = set()
+            self._recoloured = set()
+
+            for root in self._roots:
+                self._update(root, regions, re_emit)
+
+        return tuple(segment.beam for root in self._roots for segment in root.segments)
+
+    def _update(self, root: BeamNode, regions: list[tuple[Vec2, Vec2]], re_emit: set[RayInteractor]):
+        # Depth first with a stack like _grow, each entry is (node, segment of the node above it). When a node is
+        # re-split the beams under that segment have to be linked again, which waits until everything below is done.
+        relink = []
+        stack = [(root, None)]
+        while stack:
+            node, above = stack.pop()
+            if any(_aabb_overlap(node.bounds, region) for region in regions):
+                self._kill_segments(node)
+                self._grow([(node, None)])
+                if above is not None:
+                    relink.append(above)
+                continue
+
+            for segment in node.segments:
+                if segment.interactor in re_emit:
+                    segment.beam.propagate_kill()
+                    self._grow([(child, segment.beam) for child in reversed(self._emit(node, segment))])
+                    continue
+                stack.extend((child, segment) for child in segment.children)
+
+        for segment in relink:
+            segment.beam.children.clear()
+            for child in segment.children:
+                segment.beam.add_children(tuple(child_segment.beam for child_segment in child.segments))
+
+    def _build(self, beam: BeamLightRay, parent: RayInteractor | None, depth: int, path: frozenset[tuple]) -> BeamNode:
+        node = BeamNode(beam, parent, depth, path)
+        self._grow([(node, None)])
+        return node
+
+    def _grow(self, stack: list[tuple[BeamNode, BeamLightRay | None]]):
+        # Split the nodes and everything that comes out of them. With a stack rather than recursion like _walk,
+        # so a deep mirror chain can't run out of python stack. Each entry is (node, beam its segments go under).
+        while stack:
+            node, attach_to = stack.pop()
+            node.segments = self._split(node)
+            if attach_to is not None:
+                attach_to.add_children(tuple(segment.beam for segment in node.segments))
+
+            for segment in reversed(node.segments):
+                stack.extend((child, segment.beam) for child in reversed(self._emit(node, segment)))
+
+    def _split(self, node: BeamNode) -> tuple[BeamSegment, ...]:
+        beam, parent = node.beam, node.parent
+        if self.cache is None:
+            replacements, edge_map = find_intersections(self.interactors, beam, parent, self.edge_batch, self.broadphase)
+        else:
+            replacements, edge_map = self.cache.find_intersections(self.interactors, beam, parent, self.edge_batch, self.broadphase)
+
+        return tuple(
+            BeamSegment(child, edge, edge_map.get(edge), left_intersection, right_intersection)
+            for child, edge, left_intersection, right_intersection in replacements
+        )
+
+    def _emit(self, node: BeamNode, segment: BeamSegment) -> tuple[BeamNode, ...]:
+        # Set up the nodes for the light coming out of the segment, they are split by _grow.
+        segment.children = ()
+        segment.beam.truncated = None
+        if segment.interactor is None:
+            return ()
+
+        sub_children = segment.interactor.ray_hit(segment.beam, segment.edge, segment.left_intersection, segment.right_intersection)
+        children = []
+        for sub_child in sub_children:
+            if self.guard is None:
+                children.append(BeamNode(sub_child, segment.interactor, node.depth + 1, node.path))
+                continue
+
+            state = self.guard.get_state(segment.interactor, segment.edge, sub_child)
+            reason = self.guard.check(sub_child, node.depth, state, node.path)
+            if reason is not None:
+                segment.beam.truncated = reason
+                continue
+            children.append(BeamNode(sub_child, segment.interactor, node.depth + 1, node.path | {state}))
+
+        segment.children = tuple(children)
+        return segment.children
+
+    def _kill_segments(self, node: BeamNode):
+        for segment in node.segments:
+            # If nothing was in the way find_intersections hands back the beam itself, which we still need.
+            if segment.beam is node.beam:
+                segment.beam.propagate_kill()
+            else:
+                segment.beam.kill()
+
+    def _discard(self, node: BeamNode):
+        self._kill_segments(node)
+        node.segments = ()
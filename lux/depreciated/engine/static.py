@@ -0,0 +1,79 @@
+"""
+Baking a level's bounds, the walls which never move, into an edge index once when the level is preloaded.
+
+Walls are most of the edges in a level, so rather than transforming and testing them like everything else they are
+turned into one WallRayInteractor per segment (so each gets its own tight bounding box and circle) and put into a
+static UniformGrid which nothing ever refits. The interactors which can move get their own small grid when the
+level is loaded, and a LayeredBroadphase queries the two together.
+"""
+from __future__ import annotations
+from logging import getLogger
+from typing import Iterable, Mapping
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.broadphase import UniformGrid
+from lux.depreciated.engine.interactors import WallRayInteractor
+
+logger = getLogger("lux")
+
+__all__ = (
+    "StaticGeometry",
+    "bake_bounds"
+)
+
+
+class StaticGeometry:
+    """
+    The baked walls of a level and the grid they are indexed by. Don't insert anything into the grid,
+    it is shared by every load of the level.
+    """
+    __slots__ = (
+        "_walls",
+        "_grid"
+    )
+
+    def __init__(self, walls: tuple[WallRayInteractor, ...], cell_size: float = 128.0):
+        self._walls: tuple[WallRayInteractor, ...] = tuple(walls)
+        self._grid: UniformGrid = UniformGrid(cell_size)
+        self._grid.extend(self._walls, static=True)
+
+        # Find everything the engine would otherwise work out lazily during the first solve.
+        for wall in self._walls:
+            wall.bounding_circle
+
+    def __len__(self):
+        return len(self._walls)
+
+    @property
+    def walls(self) -> tuple[WallRayInteractor, ...]:
+        return self._walls
+
+    @property
+    def grid(self) -> UniformGrid:
+        return self._grid
+
+
+def bake_bounds(bounds: Iterable[Mapping], cell_size: float = 128.0) -> StaticGeometry:
+    """
+    Turn the bounds of a level's data into StaticGeometry. Each entry is a chain of `points` joined by walls,
+    and if `closed` is true the last point is joined back to the first.
+    """
+    walls: list[WallRayInteractor] = []
+    for idx, chain in enumerate(bounds):
+        points = tuple(Vec2(float(x), float(y)) for x, y in chain['points'])
+        if len(points) < 2:
+            raise ValueError(f"bounds {idx} needs at least two points to make a wall")
+
+        segments = list(zip(points, points[1:]))
+        if chain.get('closed', False) and len(points) > 2:
+            segments.append((points[-1], points[0]))
+
+        for start, end in segments:
+            # A repeated point would make a wall with no length, which has no direction.
+            if start == end:
+                continue
+            walls.append(WallRayInteractor(start, end))
+
+    logger.debug(f"baked {len(walls)} walls")
+    return StaticGeometry(tuple(walls), cell_size)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import RayInteractorEdge
+from lux.depreciated.engine.registry import EdgeRegistry
+from lux.util.maths import get_intersection
+
+
+def get_edge_depth(edge: RayInteractorEdge, position: Vec2, beam_dir: Vec2) -> float:
+    """
+    How far along the beam from the position on the front of the beam the edge is.
+    """
+    intersection = get_intersection(
+        edge.start, edge.direction,
+        position, beam_dir
+    )
+    if intersection is None:
+        # The edge runs along the beam, so the closest it gets is whichever end is nearer.
+        return min(abs((edge.start - position).dot(beam_dir)), abs((edge.end - position).dot(beam_dir)))
+    return (intersection - position).mag
+
+
+class ActiveEdges:
+    """
+    The edges the sweep in find_intersections is currently inside of, by their id in the registry.
+
+    This is the original unordered version, every time the nearest edge is needed all the active edges are checked.
+    """
+
+    def __init__(self, beam_dir: Vec2, registry: EdgeRegistry):
+        self.beam_dir: Vec2 = beam_dir
+        self.registry: EdgeRegistry = registry
+        self._edges: set[int] = set()
+
+    def __contains__(self, edge: int):
+        return edge in self._edges
+
+    def __len__(self):
+        return len(self._edges)
+
+    def add(self, edge: int, position: Vec2):
+        self._edges.add(edge)
+
+    def discard(self, edge: int, position: Vec2):
+        self._edges.discard(edge)
+
+    def nearest(self, position: Vec2) -> tuple[int | None, float]:
+        next_edge = None
+        closest_dist = float('inf')
+
+        edges = self.registry.edges
+        for edge in self._edges:
+            intersection_dist = get_edge_depth(edges[edge], position, self.beam_dir)
+            if intersection_dist < closest_dist:
+                next_edge = edge
+                closest_dist = intersection_dist
+
+        return next_edge, closest_dist
+
+
+class OrderedActiveEdges(ActiveEdges):
+    """
+    The active edges kept sorted by their depth along the beam, so the nearest edge is always at the front.
+    Finding where an edge goes (or is) is a binary search, so each event only needs O(log n) depth calculations.
+    The order is a plain list though, so adding or discarding an edge still shifts the ones after it along.
+    That is O(n), but only a memmove.
+
+    Between events the depth of every edge changes linearly with how far across the beam the sweep is, so the order
+    only breaks where two edges cross. Like a Bentley-Ottmann sweep, where each pair of neighbours in the order would
+    cross is kept in a heap. Once the sweep passes one of those the order is sorted again and the heap is rebuilt,
+    which is O(n log n) for each crossing, but edges only cross where interactors overlap. Edges running along the
+    beam don't have a linear depth, so they are kept to one side and always checked. The nearest edge is picked
+    exactly like ActiveEdges does (including which edge wins a tie), so the sweep can't tell the two apart.
+    """
+
+    def __init__(self, beam_dir: Vec2, registry: EdgeRegistry):
+        super().__init__(beam_dir, registry)
+        # Each edge is stored with the numbers needed to find its depth, so ordering doesn't make any Vec2s.
+        # (edge, start x, start y, direction x, direction y, 1 / (beam_dir x direction), depth at 0, change in depth)
+        # The last two give the depth at any point as depth at 0 + change in depth * across - along, see _across.
+        self._order: list[tuple] = []
+        # (where across the beam, edge, edge) for the neighbours in the order which will cross.
+        self._crossings: list[tuple[float, int, int]] = []
+        # The edges running along the beam.
+        self._loose: set[int] = set()
+
+    def _entry(self, edge: int) -> tuple:
+        registry = self.registry
+        sx, sy = registry.start_x[edge], registry.start_y[edge]
+        dx, dy = registry.direction_x[edge], registry.direction_y[edge]
+        bx, by = self.beam_dir.x, self.beam_dir.y
+        cross = bx * dy - by * dx
+        if cross == 0.0:
+            return edge, sx, sy, dx, dy, None, 0.0, 0.0
+        inv_cross = 1.0 / cross
+        return edge, sx, sy, dx, dy, inv_cross, (sx * dy - sy * dx) * inv_cross, (bx * dx + by * dy) * inv_cross
+
+    def _across(self, position: Vec2) -> float:
+        # How far across the beam the position is, this only goes up as the sweep goes on.
+        return position.y * self.beam_dir.x - position.x * self.beam_dir.y
+
+    def _depth_at(self, position: Vec2):
+        px, py = position.x, position.y
+
+        def depth(entry: tuple) -> float:
+            # Signed, an edge a tiny bit behind the position (within the clipping tolerances) is negative.
+            _, sx, sy, dx, dy, inv_cross, _, _ = entry
+            return ((sx - px) * dy - (sy - py) * dx) * inv_cross
+
+        return depth
+
+    def _push(self, first: tuple, second: tuple, across: float):
+        # Where two neighbours will cross, if they haven't already.
+        slope = first[7] - second[7]
+        if slope != 0.0:
+            crossing = (second[6] - first[6]) / slope
+            if crossing >= across:
+                heappush(self._crossings, (crossing, first[0], second[0]))
+
+    def _advance(self, position: Vec2) -> float:
+        # Bring the order up to date with the position, returns how far across the beam it is.
+        across = self._across(position)
+        crossings, edges = self._crossings, self._edges
+        crossed = False
+        # Edges crossing exactly here are still as deep as each other, so they wait until the sweep is past.
+        while crossings and crossings[0][0] < across:
+            _, first, second = heappop(crossings)
+            crossed = crossed or (first in edges and second in edges)
+
+        if crossed:
+            order = self._order
+            order.sort(key=self._depth_at(position))
+            self._crossings = []
+            for first, second in zip(order, order[1:]):
+                self._push(first, second, across)
+        return across
+
+    # The sweep only adds edges that aren't active, and discards edges that are, so neither checks.
+
+    def add(self, edge: int, position: Vec2):
+        self._edges.add(edge)
+        entry = self._entry(edge)
+        if entry[5] is None:
+            self._loose.add(edge)
+            return
+
+        across = self._advance(position)
+        order = self._order
+        key = self._depth_at(position)
+        idx = bisect_right(order, key(entry), key=key)
+        order.insert(idx, entry)
+
+        if idx > 0:
+            self._push(order[idx - 1], entry, across)
+        if idx + 1 < len(order):
+            self._push(entry, order[idx + 1], across)
+
+    def discard(self, edge: int, position: Vec2):
+        self._edges.discard(edge)
+        if edge in self._loose:
+            self._loose.discard(edge)
+            return
+
+        across = self._advance(position)
+        order = self._order
+        key = self._depth_at(position)
+        depth = key(self._entry(edge))
+        idx = bisect_left(order, depth, key=key)
+
+        # Edges that are equally deep sit next to each other, so walk along them to find the right one.
+        while idx < len(order) and order[idx][0] != edge and key(order[idx]) == depth:
+            idx += 1
+
+        if idx >= len(order) or order[idx][0] != edge:
+            # Rounding put it a little out of place, fall back on finding it the slow way.
+            idx = next(idx for idx, entry in enumerate(order) if entry[0] == edge)
+
+        del order[idx]
+        if 0 < idx < len(order):
+            self._push(order[idx - 1], order[idx], across)
+
+    def nearest(self, position: Vec2) -> tuple[int | None, float]:
+        order, loose = self._order, self._loose
+        if not order and not loose:
+            return None, float('inf')
+
+        edges, beam_dir = self.registry.edges, self.beam_dir
+        candidates = {edge: get_edge_depth(edges[edge], position, beam_dir) for edge in loose}
+        if order:
+            self._advance(position)
+            key = self._depth_at(position)
+
+            # The quick depth can be off in the last few digits, so every edge about as deep as the front is a candidate.
+            # The depth handed back is how far away the edge is, so one just behind the position counts too.
+            front = abs(key(order[0]))
+            limit = front + 0.000001 * max(1.0, front)
+            for entry in order:
+                if key(entry) > limit:
+                    break
+                candidates[entry[0]] = get_edge_depth(edges[entry[0]], position, beam_dir)
+
+        # The depth handed back has to match the unordered version exactly, so it isn't the quick one.
+        closest_dist = min(candidates.values())
+        if not closest_dist < float('inf'):
+            return None, float('inf')
+
+        tied = [edge for edge, depth in candidates.items() if depth == closest_dist]
+        if len(tied) > 1:
+            # ActiveEdges keeps the first it finds going through the set, so ties have to go the same way.
+            return next(edge for edge in self._edges if edge in candidates and candidates[edge] == closest_dist), closest_dist
+        return tied[0], closest_dist
@@ -0,0 +1,166 @@
+from __future__ import annotations
+from logging import getLogger
+
+import numpy as np
+
+from lux.depreciated.engine.lights.ray import LightRay
+from lux.depreciated.engine.tree import BeamTree, LEFT, RIGHT
+
+logger = getLogger("lux")
+
+# x, y, red, green, blue, alpha, strength
+FLOATS_PER_VERTEX = 7
+VERTEX_FORMAT = "2f 4f 1f"
+VERTEX_ATTRIBUTES = ("in_pos", "in_colour", "in_strength")
+
+# Two triangles per beam, so the whole tree is one draw call without an index buffer.
+VERTICES_PER_BEAM = 6
+FLOATS_PER_BEAM = FLOATS_PER_VERTEX * VERTICES_PER_BEAM
+
+# Which corner each vertex is: right source, right sink, left sink, then right source, left sink, left source.
+_CORNERS = np.array((0, 1, 2, 0, 2, 3), dtype=np.intp)
+
+
+class BeamTessellator:
+    """
+    Turns a tree of beams into triangles, written into one interleaved float32 array (see VERTEX_FORMAT)
+    ready to be uploaded and drawn in one go. Nothing here needs a GL context.
+
+    The array is allocated up front and doubles whenever a tree doesn't fit. It is only ever shrunk by release,
+    so once a level has been solved a few times tessellating doesn't allocate a new array.
+
+    Each corner of a beam gets the strength the light has left there: the ray's strength at the source,
+    and its strength minus its length at the sink.
+    """
+
+    def __init__(self, capacity: int = 64, alpha: float = 100.0 / 255.0):
+        if capacity <= 0:
+            raise ValueError("A BeamTessellator has to have room for at least one beam")
+
+        self.alpha: float = alpha
+        self._initial_capacity: int = capacity
+        self._data: np.ndarray = np.zeros(capacity * FLOATS_PER_BEAM, dtype=np.float32)
+        self._beams: int = 0
+
+    def release(self):
+        """
+        Forget the last tree and drop the array back to its starting size, e.g. when the level is unloaded.
+        """
+        self._data = np.zeros(self._initial_capacity * FLOATS_PER_BEAM, dtype=np.float32)
+        self._beams = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data) // FLOATS_PER_BEAM
+
+    @property
+    def beams(self) -> int:
+        return self._beams
+
+    @property
+    def vertices(self) -> int:
+        return self._beams * VERTICES_PER_BEAM
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        The vertices of the last tree. This is a view of the array, so it changes with the next tessellate.
+        """
+        return self._data[:self._beams * FLOATS_PER_BEAM]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        How many bytes the whole array takes up, what a GPU buffer needs to hold it however full it gets.
+        """
+        return self._data.nbytes
+
+    def reserve(self, beams: int):
+        capacity = self.capacity
+        if beams <= capacity:
+            return
+
+        while capacity < beams:
+            capacity *= 2
+
+        data = np.zeros(capacity * FLOATS_PER_BEAM, dtype=np.float32)
+        data[:len(self._data)] = self._data
+        self._data = data
+
+    def clear(self):
+        self._beams = 0
+
+    def tessellate(self, roots: tuple[LightRay, ...]) -> int:
+        """
+        Walk the tree under the roots and write every beam into the array. Returns how many beams were written.
+        """
+        # Pull the numbers out of the tree first, one flat row per beam, so the array can be filled all at once.
+        # (right source, right sink, left sink, left source, red, green, blue, and the strength at each corner)
+        rows: list[float] = []
+        to_visit = list(roots)
+        while to_visit:
+            beam = to_visit.pop()
+            to_visit.extend(beam.children)
+
+            left, right = beam.left, beam.right
+            if left is None or right is None:
+                # Killed, there is nothing left to draw.
+                continue
+
+            right_source, left_source = right.source, left.source
+            right_dir, left_dir = right.direction, left.direction
+            right_length, left_length = right.length, left.length
+            colour = beam.colour
+
+            rows.extend((
+                right_source.x, right_source.y,
+                right_source.x + right_dir.x * right_length, right_source.y + right_dir.y * right_length,
+                left_source.x + left_dir.x * left_length, left_source.y + left_dir.y * left_length,
+                left_source.x, left_source.y,
+                colour.red, colour.green, colour.blue,
+                right.strength, right.strength - right_length, left.strength - left_length, left.strength
+            ))
+
+        beams = len(rows) // 15
+        self.reserve(beams)
+        self._beams = beams
+        if not beams:
+            return 0
+
+        beam_data = np.array(rows, dtype=np.float32).reshape(beams, 15)
+        vertices = self._data[:beams * FLOATS_PER_BEAM].reshape(beams, VERTICES_PER_BEAM, FLOATS_PER_VERTEX)
+
+        vertices[:, :, 0:2] = beam_data[:, 0:8].reshape(beams, 4, 2)[:, _CORNERS]
+        vertices[:, :, 2:5] = beam_data[:, None, 8:11]
+        vertices[:, :, 5] = self.alpha
+        vertices[:, :, 6] = beam_data[:, 11:15][:, _CORNERS]
+
+        return beams
+
+    def tessellate_tree(self, tree: BeamTree) -> int:
+        """
+        Write every beam of a BeamTree into the array. The tree is already flat, so there is nothing to walk.
+        """
+        beams = len(tree)
+        self.reserve(beams)
+        self._beams = beams
+        if not beams:
+            return 0
+
+        source, direction = tree.source[:beams], tree.direction[:beams]
+        length, strength = tree.length[:beams], tree.strength[:beams]
+        sink = source + direction * length[:, :, None]
+
+        corners = np.stack((source[:, RIGHT], sink[:, RIGHT], sink[:, LEFT], source[:, LEFT]), axis=1)
+        corner_strength = np.stack((
+            strength[:, RIGHT], strength[:, RIGHT] - length[:, RIGHT],
+            strength[:, LEFT] - length[:, LEFT], strength[:, LEFT]
+        ), axis=1)
+
+        vertices = self._data[:beams * FLOATS_PER_BEAM].reshape(beams, VERTICES_PER_BEAM, FLOATS_PER_VERTEX)
+        vertices[:, :, 0:2] = corners[:, _CORNERS]
+        vertices[:, :, 2:5] = tree.colour[:beams, None]
+        vertices[:, :, 5] = self.alpha
+        vertices[:, :, 6] = corner_strength[:, _CORNERS]
+
+        return beams
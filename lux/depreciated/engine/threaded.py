@@ -0,0 +1,203 @@
+from __future__ import annotations
+from copy import deepcopy
+from itertools import count
+from logging import getLogger
+from threading import Condition, Thread
+from time import perf_counter
+from typing import NamedTuple
+
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid, LayeredBroadphase
+from lux.depreciated.engine.interactors import RayInteractor
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.cone_light_ray import make_light_ray
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.order import EndpointOrders
+from lux.depreciated.engine.pool import LightPool
+from lux.depreciated.engine.static import StaticGeometry
+from lux.depreciated.engine.tree import BeamTree, BeamView
+from lux.util.colour import LuxColour
+
+logger = getLogger("lux")
+
+
+class FrozenBeam(NamedTuple):
+    """
+    A beam and everything that came out of it, which can't be changed once solved.
+    """
+    colour: LuxColour
+    left: Ray
+    right: Ray
+    truncated: str | None
+    children: tuple[FrozenBeam, ...]
+
+
+class SolvedTree(NamedTuple):
+    """
+    A finished solve. The tree belongs to the solve, nothing writes to it once it has been handed over.
+    """
+    frame: int
+    tree: BeamTree
+    solve_ms: float
+
+    @property
+    def beams(self) -> tuple[FrozenBeam, ...]:
+        return tuple(freeze_beam(root) for root in self.tree.roots)
+
+
+def freeze_beam(beam: LightRay | BeamView) -> FrozenBeam:
+    return FrozenBeam(beam.colour, beam.left, beam.right, beam.truncated, tuple(freeze_beam(child) for child in beam.children))
+
+
+class ThreadedSolver:
+    """
+    Solves the light sources on a worker thread, so a slow solve never holds up the frame.
+
+    Each frame `submit` snapshots the origin, direction, and colour of every interactor (and the sources)
+    which the worker copies onto its own private clones of the interactors before solving. If the worker is still
+    busy only the newest snapshot is kept. Each solve goes into a new BeamTree, which is swapped in as `result`
+    all at once, so the renderer keeps drawing the last tree until the next one is ready.
+
+    A level's static geometry never moves, so the walls are shared with the worker rather than copied, and the
+    beams find what they might hit through the level's grid layered over a grid of the clones.
+    The LightRays and edges made while solving come out of the worker's own LightPool, and the order
+    each beam's endpoints were sorted into is kept in its own EndpointOrders, like LightSystem.
+
+    The interactors can't be added to or removed from once the solver is made.
+    """
+
+    def __init__(self, interactors: tuple[RayInteractor, ...], batched: bool = False, static: StaticGeometry = None):
+        self.interactors: tuple[RayInteractor, ...] = tuple(interactors)
+        self._sources: list[BeamLightRay] = []
+
+        # The worker only ever touches its own copies, the main thread is free to move the originals mid solve.
+        # The walls are put in the memo so deepcopy hands back the walls themselves.
+        walls = () if static is None else static.walls
+        clones = deepcopy(self.interactors, {id(wall): wall for wall in walls})
+        self._moving: tuple[RayInteractor, ...] = clones
+        self._clones: tuple[RayInteractor, ...] = walls + clones
+        self._edge_batch: EdgeBatch | None = None if not batched else EdgeBatch(self._clones, static=walls)
+        self._broadphase: LayeredBroadphase | None = None
+        if static is not None:
+            # The grid listens to the clones, so it is refit as the worker moves them.
+            grid = UniformGrid()
+            grid.extend(clones)
+            self._broadphase = LayeredBroadphase(static.grid, grid)
+
+        self._pool: LightPool = LightPool()
+        self._orders: EndpointOrders = EndpointOrders()
+
+        self._frames = count(1)
+        self._submitted: int = 0
+        self._snapshot: tuple[int, tuple, tuple] | None = None
+        self._result: SolvedTree | None = None
+        self._stopping: bool = False
+
+        self._condition = Condition()
+        self._thread = Thread(target=self._run, name="lux-light-solver", daemon=True)
+        self._thread.start()
+
+    def release(self):
+        """
+        Stop the worker thread once it finishes whatever it is solving.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    # -- Sources --
+
+    def add_source(self, beam: BeamLightRay):
+        self._sources.append(beam)
+
+    def remove_source(self, beam: BeamLightRay):
+        if beam not in self._sources:
+            raise ValueError(f"{beam} is not a source of this solver")
+        self._sources.remove(beam)
+
+    @property
+    def sources(self) -> tuple[BeamLightRay, ...]:
+        return tuple(self._sources)
+
+    # -- Solving --
+
+    @property
+    def result(self) -> SolvedTree | None:
+        """
+        The most recently finished tree, or None if nothing has finished yet.
+        """
+        return self._result
+
+    @property
+    def busy(self):
+        result = self._result
+        return self._submitted != (0 if result is None else result.frame)
+
+    def submit(self, sources: tuple[BeamLightRay, ...] = None) -> int:
+        """
+        Snapshot the interactors and sources as they are now and hand them to the worker. Returns the frame number
+        the tree will have. If sources are given they are solved instead of the solver's own.
+        """
+        transforms = tuple((interactor.origin, interactor.direction, interactor.colour) for interactor in self.interactors)
+        sources = tuple((source.colour, source.left, source.right) for source in (self._sources if sources is None else sources))
+
+        with self._condition:
+            self._submitted = frame = next(self._frames)
+            self._snapshot = (frame, transforms, sources)
+            self._condition.notify_all()
+
+        return frame
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until the last submitted frame has been solved (or failed). Returns whether it was.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self.busy or self._stopping, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._snapshot is not None or self._stopping)
+                if self._stopping:
+                    return
+                frame, transforms, sources = self._snapshot
+                self._snapshot = None
+
+            start = perf_counter()
+            try:
+                tree = self._solve(transforms, sources)
+            except Exception:
+                # Keep showing the last tree, this frame is just lost.
+                logger.exception(f"light solve for frame {frame} failed")
+                tree = BeamTree() if self._result is None else self._result.tree
+
+            solve_ms = (perf_counter() - start) * 1000.0
+            with self._condition:
+                self._result = SolvedTree(frame, tree, solve_ms)
+                self._condition.notify_all()
+
+    def _solve(self, transforms: tuple[tuple[Vec2, Vec2, LuxColour], ...], sources: tuple[tuple[LuxColour, Ray, Ray], ...]) -> BeamTree:
+        for clone, (origin, direction, colour) in zip(self._moving, transforms):
+            if clone.origin != origin:
+                clone.origin = origin
+            if clone.direction != direction:
+                clone.direction = direction
+            clone.colour = colour
+
+        if self._edge_batch is not None:
+            self._edge_batch.refresh()
+
+        # The last tree has been handed over, so this one starts out big enough to hold it.
+        last = self._result
+        tree = BeamTree() if last is None else BeamTree(max(len(last.tree), 1))
+        self._pool.reset()
+        self._orders.reset()
+        for colour, left, right in sources:
+            propogate_beam_into(tree, self._clones, make_light_ray(colour, left, right), edge_batch=self._edge_batch,
+                                broadphase=self._broadphase, pool=self._pool, orders=self._orders)
+        return tree
@@ -0,0 +1,260 @@
+from __future__ import annotations
+from logging import getLogger
+
+import numpy as np
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.guard import TRUNCATED_DEPTH, TRUNCATED_STRENGTH, TRUNCATED_CYCLE
+from lux.depreciated.engine.lights.ray import Ray, LightRay
+from lux.depreciated.engine.lights.cone_light_ray import ConeLightRay
+from lux.util.colour import LuxColour
+
+logger = getLogger("lux")
+
+# Which side of a beam each ray is in the source, direction, length, and strength arrays.
+LEFT = 0
+RIGHT = 1
+
+# What kind of LightRay each beam was.
+KIND_BEAM = 0
+KIND_CONE = 1
+
+# LightRay.truncated as a number, 0 is not truncated.
+_TRUNCATED_CODES = {None: 0, TRUNCATED_DEPTH: 1, TRUNCATED_STRENGTH: 2, TRUNCATED_CYCLE: 3}
+_TRUNCATED_REASONS = (None, TRUNCATED_DEPTH, TRUNCATED_STRENGTH, TRUNCATED_CYCLE)
+
+
+class BeamTree:
+    """
+    A whole tree of beams kept in parallel arrays rather than as LightRay objects linked by sets.
+
+    Each beam is one index into the arrays. The rays are stored side by side (see LEFT and RIGHT), and the
+    tree is linked by index: every beam knows its parent, its first child, and its next sibling (-1 if there isn't one).
+    The arrays are allocated up front and double whenever the tree doesn't fit, and clear only forgets how
+    many beams there are, so a tree which is rebuilt every frame stops allocating once it is big enough.
+
+    BeamView gives the old LightRay attributes for a single beam, for code which wants to walk the tree.
+    """
+
+    def __init__(self, capacity: int = 256):
+        if capacity <= 0:
+            raise ValueError("A BeamTree has to have room for at least one beam")
+
+        self._initial_capacity: int = capacity
+        self._count: int = 0
+        # Bumped every time the tree is cleared, so a view can tell it's looking at a beam which has gone.
+        self._generation: int = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.source: np.ndarray = np.zeros((capacity, 2, 2), dtype=np.float64)
+        self.direction: np.ndarray = np.zeros((capacity, 2, 2), dtype=np.float64)
+        self.length: np.ndarray = np.zeros((capacity, 2), dtype=np.float64)
+        self.strength: np.ndarray = np.zeros((capacity, 2), dtype=np.float64)
+        self.colour: np.ndarray = np.zeros((capacity, 3), dtype=np.bool_)
+        # The origin and direction of the LightRay itself, the point a cone spreads out from.
+        self.origin: np.ndarray = np.zeros((capacity, 2), dtype=np.float64)
+        self.heading: np.ndarray = np.zeros((capacity, 2), dtype=np.float64)
+        self.kind: np.ndarray = np.zeros(capacity, dtype=np.int8)
+        self.truncated: np.ndarray = np.zeros(capacity, dtype=np.int8)
+
+        self.parent: np.ndarray = np.full(capacity, -1, dtype=np.int32)
+        self.first_child: np.ndarray = np.full(capacity, -1, dtype=np.int32)
+        self.next_sibling: np.ndarray = np.full(capacity, -1, dtype=np.int32)
+
+    def release(self):
+        """
+        Forget every beam and drop the arrays back to their starting size, e.g. when the level is unloaded.
+        """
+        self._allocate(self._initial_capacity)
+        self._count = 0
+        self._generation += 1
+
+    def clear(self):
+        self._count = 0
+        self._generation += 1
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self.kind)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def reserve(self, beams: int):
+        capacity = self.capacity
+        if beams <= capacity:
+            return
+
+        while capacity < beams:
+            capacity *= 2
+
+        count = self._count
+        old = (self.source, self.direction, self.length, self.strength, self.colour, self.origin, self.heading,
+               self.kind, self.truncated, self.parent, self.first_child, self.next_sibling)
+        self._allocate(capacity)
+        new = (self.source, self.direction, self.length, self.strength, self.colour, self.origin, self.heading,
+               self.kind, self.truncated, self.parent, self.first_child, self.next_sibling)
+        for old_array, new_array in zip(old, new):
+            new_array[:count] = old_array[:count]
+
+    def add(self, beam: LightRay, parent: int = -1) -> int:
+        """
+        Copy a beam into the tree as the newest child of parent (-1 for a root), and return its index.
+        """
+        idx = self._count
+        if idx == self.capacity:
+            self.reserve(idx + 1)
+        self._count = idx + 1
+
+        left, right = beam.left, beam.right
+        self.source[idx] = ((left.source.x, left.source.y), (right.source.x, right.source.y))
+        self.direction[idx] = ((left.direction.x, left.direction.y), (right.direction.x, right.direction.y))
+        self.length[idx] = (left.length, right.length)
+        self.strength[idx] = (left.strength, right.strength)
+        self.colour[idx] = beam.colour
+        self.origin[idx] = (beam.origin.x, beam.origin.y)
+        self.heading[idx] = (beam.direction.x, beam.direction.y)
+        self.kind[idx] = KIND_CONE if isinstance(beam, ConeLightRay) else KIND_BEAM
+        self.truncated[idx] = _TRUNCATED_CODES[beam.truncated]
+
+        # The children aren't ordered (they were a set), so the new child just goes on the front.
+        self.parent[idx] = parent
+        self.first_child[idx] = -1
+        if parent == -1:
+            self.next_sibling[idx] = -1
+        else:
+            self.next_sibling[idx] = self.first_child[parent]
+            self.first_child[parent] = idx
+        return idx
+
+    def extend(self, other: BeamTree, start: int = 0, stop: int = None) -> int:
+        """
+        Copy the beams start to stop of another tree onto the end of this one, and return the index of the first.
+        The beams have to be whole trees, none of them can link to a beam outside of the range.
+        """
+        stop = len(other) if stop is None else stop
+        if not 0 <= start <= stop <= len(other):
+            raise ValueError(f"Can't copy beams {start} to {stop} out of a tree of {len(other)}")
+
+        count = self._count
+        added = stop - start
+        self.reserve(count + added)
+        self._count = count + added
+
+        for name in ('source', 'direction', 'length', 'strength', 'colour', 'origin', 'heading', 'kind', 'truncated'):
+            getattr(self, name)[count:count + added] = getattr(other, name)[start:stop]
+
+        # The links move with the beams, but -1 still means there isn't one.
+        shift = count - start
+        for name in ('parent', 'first_child', 'next_sibling'):
+            links = getattr(other, name)[start:stop]
+            getattr(self, name)[count:count + added] = np.where(links == -1, -1, links + shift)
+        return count
+
+    def truncate(self, idx: int, reason: str):
+        self.truncated[idx] = _TRUNCATED_CODES[reason]
+
+    def get_children(self, idx: int) -> tuple[int, ...]:
+        children = []
+        child = self.first_child[idx]
+        while child != -1:
+            children.append(int(child))
+            child = self.next_sibling[child]
+        return tuple(children)
+
+    @property
+    def roots(self) -> tuple[BeamView, ...]:
+        return tuple(BeamView(self, int(idx)) for idx in np.flatnonzero(self.parent[:self._count] == -1))
+
+    def view(self, idx: int) -> BeamView:
+        if not 0 <= idx < self._count:
+            raise ValueError(f"There is no beam {idx} in a tree of {self._count}")
+        return BeamView(self, idx)
+
+
+class BeamView:
+    """
+    One beam of a BeamTree, read only, with the same attributes as a LightRay.
+    Clearing the tree invalidates every view of it.
+    """
+    __slots__ = (
+        "tree",
+        "index",
+        "_generation"
+    )
+
+    def __init__(self, tree: BeamTree, index: int):
+        self.tree: BeamTree = tree
+        self.index: int = index
+        self._generation: int = tree.generation
+
+    def _check(self) -> BeamTree:
+        if self._generation != self.tree.generation:
+            raise ValueError(f"beam {self.index} was cleared out of its tree")
+        return self.tree
+
+    def __eq__(self, other):
+        return isinstance(other, BeamView) and self.tree is other.tree and self.index == other.index and self._generation == other._generation
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index, self._generation))
+
+    def __str__(self):
+        return f"BeamView<{self.index}: {self.colour.name}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _get_ray(self, side: int) -> Ray:
+        tree = self._check()
+        idx = self.index
+        source, direction = tree.source[idx, side], tree.direction[idx, side]
+        return Ray(Vec2(float(source[0]), float(source[1])), Vec2(float(direction[0]), float(direction[1])),
+                   float(tree.length[idx, side]), float(tree.strength[idx, side]))
+
+    @property
+    def left(self) -> Ray:
+        return self._get_ray(LEFT)
+
+    @property
+    def right(self) -> Ray:
+        return self._get_ray(RIGHT)
+
+    @property
+    def colour(self) -> LuxColour:
+        colour = self._check().colour[self.index]
+        return LuxColour(bool(colour[0]), bool(colour[1]), bool(colour[2]))
+
+    @property
+    def origin(self) -> Vec2:
+        origin = self._check().origin[self.index]
+        return Vec2(float(origin[0]), float(origin[1]))
+
+    @property
+    def direction(self) -> Vec2:
+        heading = self._check().heading[self.index]
+        return Vec2(float(heading[0]), float(heading[1]))
+
+    @property
+    def is_cone(self) -> bool:
+        return bool(self._check().kind[self.index] == KIND_CONE)
+
+    @property
+    def truncated(self) -> str | None:
+        return _TRUNCATED_REASONS[self._check().truncated[self.index]]
+
+    @property
+    def parent(self) -> BeamView | None:
+        tree = self._check()
+        parent = int(tree.parent[self.index])
+        return None if parent == -1 else BeamView(tree, parent)
+
+    @property
+    def children(self) -> tuple[BeamView, ...]:
+        tree = self._check()
+        return tuple(BeamView(tree, child) for child in tree.get_children(self.index))
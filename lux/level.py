@@ -1,11 +1,16 @@
+from hashlib import sha1
+from json import dumps
+from logging import getLogger
 from weakref import WeakSet
 from typing import TypedDict, TypeVar
 
 from lux.components.base import Component
 from lux.components import get_component_map
-from lux.data import get_config, get_level_data, get_texture
+from lux.data import get_config, get_level_data, get_texture, get_baked_lighting, save_baked_lighting
 from lux.systems.base import System, UpdateLoopSystem, DrawLoopSystem
-from lux.systems import get_system_requirement_map
+from lux.systems import get_system_requirement_map, LightSystem
+from lux.depreciated.engine.bake import BakedLighting
+from lux.depreciated.engine.static import StaticGeometry, bake_bounds
 
 # This is so cursed, but it is a built-in safety for debugging -.- human error and all that.
 import sys
@@ -30,17 +35,35 @@ LevelConfigDict = TypedDict(
     }
 )
 
+BoundsDict = TypedDict(
+    "BoundsDict",
+    {
+        'points': list[list[float, float]],
+        'closed': bool
+    }
+)
+
 LevelDataDict = TypedDict(
     "LevelDataDict",
     {
         "challenge_times": list[float, float, float],
-        "bounds": list,
+        "bounds": list[BoundsDict],
         "components": dict[str, list[dict]]
     }
 )
 
 C = TypeVar('C', bound=Component)
 
+logger = getLogger("lux")
+
+
+def get_lighting_digest(data: LevelDataDict) -> str:
+    """
+    A digest of the level data the beams come from, so baked lighting can tell when the level has changed since.
+    """
+    lit = {'bounds': data.get('bounds', []), 'components': data['components']}
+    return sha1(dumps(lit, sort_keys=True, default=str).encode()).hexdigest()
+
 
 class Level:
 
@@ -52,6 +75,10 @@ class Level:
         # Only this parent Level object should hold strong refs to a component or system
         self.UUID_map: dict[int, Component] = None
         self.systems: tuple[System, ...] = None
+        # The walls of the level, baked once at preload because they never move.
+        self.static_geometry: StaticGeometry = None
+        # The beams of the light sources which can't change, if the level has been baked.
+        self.baked_lighting: BakedLighting = None
 
         # These are helper storages used to quickly retrieve items
         self.component_map: dict[type[Component], WeakSet[Component]] = None
@@ -68,10 +95,12 @@ class Level:
 
     def preload(self, data: LevelDataDict):
         """
-        Create the systems required for the particular level, but don't create any components
+        Create the systems required for the particular level, and bake its bounds, but don't create any components
         """
         self._raw_data = data
         components = data['components']
+        self.static_geometry = bake_bounds(data.get('bounds', ()))
+        self.baked_lighting = self._get_baked_lighting(data)
 
         component_map = get_component_map()
         requirement_map = get_system_requirement_map()
@@ -96,6 +125,47 @@ class Level:
         self.update_systems = tuple(sorted(update_systems, key=lambda s: s.update_priority))
         self.draw_systems = tuple(sorted(draw_systems, key=lambda s: s.draw_priority))
 
+    def _get_baked_lighting(self, data: LevelDataDict) -> BakedLighting | None:
+        try:
+            baked = BakedLighting.from_arrays(get_baked_lighting(self._name))
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"The baked lighting of {self._name} can't be read, it needs baking again: {e}")
+            return None
+
+        if baked.digest != get_lighting_digest(data):
+            logger.warning(f"The baked lighting of {self._name} is out of date, it needs baking again")
+            return None
+        return baked
+
+    def bake_lighting(self):
+        """
+        Solve the light sources with everything where the level data puts it, and save the beams of the ones which
+        only reach static interactors next to the level data. Anything a ControlPoint or the player can move is movable.
+        """
+        if self._raw_data is None:
+            raise ValueError("Level has not be preloaded cannot bake it yet")
+        if self._loaded:
+            raise ValueError("Level is loaded, things may have moved since so it can't be baked")
+
+        light_system = next((system for system in self.systems if isinstance(system, LightSystem)), None)
+        if light_system is None:
+            raise ValueError(f"Level {self._name} has no light sources to bake")
+
+        components = self._raw_data['components']
+        movable = {dof['target'] for point in components.get('ControlPoint', ()) for dof in point.get('dof', ())}
+        movable.update(player['parent'] for player in components.get('Player', ()))
+
+        self.load()
+        try:
+            baked = light_system.bake(get_lighting_digest(self._raw_data), frozenset(movable))
+        finally:
+            self.unload()
+
+        save_baked_lighting(self._name, baked.to_arrays())
+        self.baked_lighting = baked
+
     def load(self):
         """
         Load the components of the levels and finish initialising systems.
@@ -6,6 +6,7 @@ from lux.systems.player import PlayerInputSystem, PlayerStateSystem
 from lux.systems.player_renderer import PlayerRenderer
 from lux.systems.debug import DebugRenderer
 from lux.systems.sprite_renderer import SpriteRenderer
+from lux.systems.light import LightSystem
 
 
 # Due to how get_system_requirement_map works we don't actually need to have any systems in this system, but eh.
@@ -17,7 +18,8 @@ __all__ = (
     'PlayerStateSystem',
     'PlayerRenderer',
     'SpriteRenderer',
-    'DebugRenderer'
+    'DebugRenderer',
+    'LightSystem'
 )
 
 
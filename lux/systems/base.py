@@ -1,8 +1,12 @@
-from typing import Protocol, TypeVar
+from typing import Protocol, TypeVar, TYPE_CHECKING
 from weakref import WeakSet
 
 from lux.components.base import Component
 
+if TYPE_CHECKING:
+    from lux.depreciated.engine.bake import BakedLighting
+    from lux.depreciated.engine.static import StaticGeometry
+
 
 class UpdateLoopSystem(Protocol):
     update_priority: int
@@ -22,6 +26,8 @@ C = TypeVar('C', bound=Component)
 
 
 class _ComponentSource(Protocol):
+    static_geometry: "StaticGeometry"
+    baked_lighting: "BakedLighting | None"
 
     def get_components(self, component: type[C]) -> WeakSet[C]:
         pass
@@ -0,0 +1,347 @@
+from logging import getLogger
+from typing import Container
+
+from arcade.gl import BufferDescription
+from pyglet.math import Vec2
+
+from lux.get_window import get_window
+from lux.data import get_shader
+from lux.systems.base import System, _ComponentSource
+from lux.components import LevelObject, LightSource, Mirror, Filter, Portal
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.bake import BakedLighting, bake_lighting
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid, LayeredBroadphase
+from lux.depreciated.engine.interactors import RayInteractor, RayInteractorEdge, MirrorRayInteractor, FilterRayInteractor, PortalRayInteractor
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.tessellate import BeamTessellator, VERTEX_FORMAT, VERTEX_ATTRIBUTES
+from lux.depreciated.engine.threaded import ThreadedSolver
+from lux.depreciated.engine.tree import BeamTree, BeamView
+
+from util.uuid_ref import UUIDRef
+
+logger = getLogger("lux")
+
+
+class LightSystem(System):
+    """
+    Runs the beam engine over the light components of a level.
+
+    Everything is gathered once at load: an interactor for every mirror, filter, and portal, packed into an
+    EdgeBatch, and a flat tuple of the light sources. Afterwards the level objects tell us when they move so
+    nothing is walked each frame, and the beams are only propagated again on frames where something changed.
+
+    The level's walls were baked into StaticGeometry when it was preloaded. They go in the EdgeBatch too, but as
+    static so refreshing it never moves them, and the beams find what they might hit through a small grid of the
+    interactors which can move layered over the level's static grid.
+
+    If the level has baked lighting the baked light sources are copied into the tree rather than solved. Once
+    something moves the first place it was and where it is now are checked against the baked beams, and any light
+    source it overlaps is solved like the rest from then on.
+
+    The live light sources are solved on a ThreadedSolver, so a big solve doesn't stall the frames while it runs.
+    The engine is pure python and holds the GIL, but it is handed back often enough that frames keep drawing the
+    last beams (a 446ms solve of 256 mirrors only stretched frames to ~14ms, rather than blocking for all of it).
+    Once a newer solve is ready it is copied into the tree along with the baked light sources which weren't live
+    when it was submitted. If a solve fails the solver keeps its last tree, so the last beams are still there.
+    The beams are tessellated into one array when they change, and drawn with a single draw call.
+    """
+    requires = frozenset((LightSource, Mirror, Filter, Portal))
+    update_priority: int = 2
+    draw_priority: int = 1
+
+    def __init__(self):
+        super().__init__()
+        self._interactors: tuple[RayInteractor, ...] = None
+        self._edge_batch: EdgeBatch = None
+        self._grid: UniformGrid = None
+        self._broadphase: LayeredBroadphase = None
+
+        # (UUID, parent, width, length) of every light source.
+        self._sources: tuple[tuple[int, UUIDRef[LevelObject], float, float], ...] = None
+        # The interactors which belong to each level object, by the level object's UUID.
+        self._parent_map: dict[int, tuple[RayInteractor, ...]] = None
+        self._parents: tuple[UUIDRef[LevelObject], ...] = None
+
+        self._baked: BakedLighting = None
+        # The light sources which aren't baked, or whose bake something has moved into.
+        self._live: set[int] = None
+        # The world space bounds of every interactor which has moved from where it was when the level loaded,
+        # and the ones which have moved since the baked light sources were last checked.
+        self._rest_bounds: dict[RayInteractor, tuple[Vec2, Vec2]] = None
+        self._moved: set[RayInteractor] = None
+
+        self._solver: ThreadedSolver = None
+        # The baked light sources to copy in alongside each frame the solver has been handed.
+        self._baked_frames: dict[int, tuple[int, ...]] = None
+        self._shown: int = -1
+
+        self._tree: BeamTree = BeamTree()
+        self._dirty: bool = False
+
+        self._tessellator: BeamTessellator = BeamTessellator()
+        self._uploaded: bool = False
+
+        self._ctx = get_window().ctx
+        self._program = self._ctx.program(
+            vertex_shader=get_shader("beam_vs"),
+            fragment_shader=get_shader("beam_fs")
+        )
+        self._buffer = self._ctx.buffer(reserve=self._tessellator.nbytes, usage="dynamic")
+        self._geometry = self._ctx.geometry(
+            [BufferDescription(self._buffer, VERTEX_FORMAT, VERTEX_ATTRIBUTES)],
+            mode=self._ctx.TRIANGLES
+        )
+
+    def preload(self):
+        self._interactors = None
+        self._edge_batch = None
+        self._grid = None
+        self._broadphase = None
+        self._sources = None
+        self._parent_map = None
+        self._parents = None
+        self._baked = None
+        self._live = None
+        self._rest_bounds = None
+        self._moved = None
+        self._solver = None
+        self._baked_frames = None
+        self._shown = -1
+        self._tree.clear()
+        self._dirty = False
+        self._tessellator.clear()
+        self._uploaded = False
+
+    def load(self, source: _ComponentSource):
+        parent_map: dict[int, list[RayInteractor]] = dict()
+        parents: dict[int, UUIDRef[LevelObject]] = dict()
+        interactors: list[RayInteractor] = []
+
+        def add(parent: UUIDRef[LevelObject], interactor: RayInteractor):
+            interactors.append(interactor)
+            parent_map.setdefault(parent.UUID, []).append(interactor)
+            parents[parent.UUID] = parent
+
+        for mirror in source.get_components(Mirror):
+            parent = mirror.parent
+            add(parent, MirrorRayInteractor(mirror.height, parent.origin, parent.direction, parent.colour))
+
+        for filter_ in source.get_components(Filter):
+            parent = filter_.parent
+            bounds = (RayInteractorEdge(Vec2(0.0, -filter_.height/2.0), Vec2(0.0, filter_.height/2.0), True),)
+            add(parent, FilterRayInteractor(parent.origin, parent.direction, parent.colour, bounds))
+
+        portals: dict[int, tuple[Portal, PortalRayInteractor]] = dict()
+        for portal in source.get_components(Portal):
+            parent = portal.parent
+            interactor = PortalRayInteractor(portal.height, parent.origin, parent.direction, parent.colour)
+            portals[portal.UUID] = (portal, interactor)
+            add(parent, interactor)
+
+        for portal, interactor in portals.values():
+            sibling = portals.get(portal.sibling.value)
+            if sibling is None:
+                raise ValueError(f"The sibling of portal {portal.UUID} isn't a portal")
+            if interactor.linked == ():
+                interactor.set_siblings(sibling[1])
+
+        static = source.static_geometry
+        self._interactors = static.walls + tuple(interactors)
+        self._edge_batch = EdgeBatch(self._interactors, static=static.walls)
+
+        # The grid listens to the interactors, so it is refit whenever _on_parent_changed moves one.
+        self._grid = UniformGrid()
+        self._grid.extend(tuple(interactors))
+        self._broadphase = LayeredBroadphase(static.grid, self._grid)
+
+        self._sources = tuple(
+            (light.UUID, light.parent, light.width, light.length) for light in source.get_components(LightSource)
+        )
+        for _, light_parent, _, _ in self._sources:
+            parents[light_parent.UUID] = light_parent
+
+        self._baked = source.baked_lighting
+        baked = () if self._baked is None else self._baked
+        self._live = {light for light, _, _, _ in self._sources if light not in baked}
+        self._rest_bounds = dict()
+        self._moved = set()
+
+        self._parent_map = {UUID: tuple(owned) for UUID, owned in parent_map.items()}
+        self._parents = tuple(parents.values())
+        for parent in self._parents:
+            parent.add_listeners(('origin', 'direction', 'colour'), self._on_parent_changed)
+
+        self._solver = ThreadedSolver(tuple(interactors), static=static)
+        self._baked_frames = dict()
+        self._shown = -1
+        self._dirty = True
+
+    def unload(self):
+        if self._parents is not None:
+            for parent in self._parents:
+                parent.remove_listeners(('origin', 'direction', 'colour'), self._on_parent_changed)
+
+        if self._grid is not None:
+            self._grid.clear()
+
+        if self._solver is not None:
+            self._solver.release()
+
+        self._interactors = None
+        self._edge_batch = None
+        self._grid = None
+        self._broadphase = None
+        self._sources = None
+        self._parent_map = None
+        self._parents = None
+        self._baked = None
+        self._live = None
+        self._rest_bounds = None
+        self._moved = None
+        self._solver = None
+        self._baked_frames = None
+        self._shown = -1
+        self._tree.release()
+
+        self._tessellator.release()
+        self._uploaded = False
+
+    def _on_parent_changed(self, level_object: LevelObject, attr: str, value):
+        for interactor in self._parent_map.get(level_object.UUID, ()):
+            if interactor not in self._rest_bounds:
+                self._rest_bounds[interactor] = interactor.world_aabb
+            setattr(interactor, attr, value)
+            self._moved.add(interactor)
+
+        for light, parent, _, _ in self._sources:
+            if parent.UUID == level_object.UUID:
+                self._live.add(light)
+        self._dirty = True
+
+    def _check_baked(self):
+        baked = self._baked
+        for light in baked.lights:
+            if light in self._live:
+                continue
+
+            for interactor in self._moved:
+                low, high = interactor.world_aabb
+                rest_low, rest_high = self._rest_bounds[interactor]
+                if baked.overlaps(light, low, high) or baked.overlaps(light, rest_low, rest_high):
+                    logger.debug(f"something moved into the baked light source {light}, solving it from now on")
+                    self._live.add(light)
+                    break
+        self._moved.clear()
+
+    def bake(self, digest: str, movable: Container[int]) -> BakedLighting:
+        """
+        Bake the light sources as they are now. The interactors of the level objects in movable are treated as
+        movable, and a light source whose own level object is in movable isn't baked at all.
+        """
+        if self._sources is None:
+            raise ValueError("The LightSystem has to be loaded before it can bake anything")
+
+        self._edge_batch.refresh()
+        movable_interactors = tuple(
+            interactor for UUID in movable for interactor in self._parent_map.get(UUID, ())
+        )
+        sources = (
+            (light, self._make_beam(parent, width, length))
+            for light, parent, width, length in self._sources if parent.UUID not in movable
+        )
+        return bake_lighting(digest, self._interactors, sources, movable_interactors,
+                             edge_batch=self._edge_batch, broadphase=self._broadphase)
+
+    @staticmethod
+    def _make_beam(parent: UUIDRef[LevelObject], width: float, length: float) -> BeamLightRay:
+        origin, direction = parent.origin, parent.direction
+        side = Vec2(-direction.y, direction.x) * (width / 2.0)
+        return BeamLightRay(
+            parent.colour,
+            Ray(origin + side, direction, length, length),
+            Ray(origin - side, direction, length, length)
+        )
+
+    @property
+    def tree(self) -> BeamTree:
+        return self._tree
+
+    @property
+    def beams(self) -> tuple[BeamView, ...]:
+        return self._tree.roots
+
+    def update(self, dt: float):
+        if self._dirty:
+            self._dirty = False
+            self._submit()
+        self._show()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Block until the last submitted solve is finished and show it, e.g. before taking a screenshot.
+        Returns False if it timed out.
+        """
+        if self._solver is None:
+            return True
+        if self._dirty:
+            self._dirty = False
+            self._submit()
+        finished = self._solver.wait(timeout)
+        self._show()
+        return finished
+
+    def _submit(self):
+        if self._moved and self._baked is not None:
+            self._check_baked()
+
+        beams = []
+        baked = []
+        for light, parent, width, length in self._sources:
+            if light in self._live:
+                beams.append(self._make_beam(parent, width, length))
+            else:
+                baked.append(light)
+
+        frame = self._solver.submit(tuple(beams))
+        self._baked_frames[frame] = tuple(baked)
+
+    def _show(self):
+        result = self._solver.result if self._solver is not None else None
+        if result is None or result.frame == self._shown:
+            return
+        self._shown = result.frame
+
+        # Frames the worker skipped over are never shown.
+        baked = self._baked_frames.pop(result.frame)
+        for frame in tuple(self._baked_frames):
+            if frame < result.frame:
+                self._baked_frames.pop(frame)
+
+        tree = self._tree
+        tree.clear()
+        tree.extend(result.tree)
+        for light in baked:
+            self._baked.copy_into(tree, light)
+
+        if instrument.COUNTERS is not None:
+            instrument.COUNTERS.report(context="light")
+
+        self._tessellator.tessellate_tree(tree)
+        self._uploaded = False
+
+    def draw(self):
+        tessellator = self._tessellator
+        if not tessellator.beams:
+            return
+
+        if not self._uploaded:
+            # The buffer follows the tessellator, so it only grows when the array does.
+            if self._buffer.size < tessellator.nbytes:
+                self._buffer.orphan(size=tessellator.nbytes)
+            self._buffer.write(tessellator.data)
+            self._uploaded = True
+
+        self._geometry.render(self._program, vertices=tessellator.vertices)
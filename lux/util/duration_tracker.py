@@ -21,12 +21,23 @@ class FuncTracker:
     contexts: set[str] = field(default_factory=lambda: {""})
 
 
+@dataclass(slots=True)
+class CountTracker:
+    total: float = 0
+    update_total: float = 0
+    update_total_history: list[float] = field(default_factory=list)
+    contexts: set[str] = field(default_factory=lambda: {""})
+
+
 class PerfTracker:
 
     def __init__(self):
         self._funcs: dict[Callable, FuncTracker] = {}
         self._contexts: dict[str, set[Callable]] = {"": set()}
 
+        self._counts: dict[str, CountTracker] = {}
+        self._count_contexts: dict[str, set[str]] = {"": set()}
+
     def track_function(self, func: Callable, contexts: tuple[str, ...] = ()):
         if func in self._funcs:
             raise KeyError("This function is already being tracked")
@@ -40,6 +51,31 @@ class PerfTracker:
             context_set.add(func)
             self._contexts[context] = context_set
 
+    def track_count(self, name: str, contexts: tuple[str, ...] = ()):
+        if name in self._counts:
+            raise KeyError("This count is already being tracked")
+
+        tracker = CountTracker()
+        self._counts[name] = tracker
+        self._count_contexts[""].add(name)
+        for context in contexts:
+            tracker.contexts.add(context)
+            self._count_contexts.setdefault(context, set()).add(name)
+
+    def add_count(self, name: str, amount: float = 1, contexts: tuple[str, ...] = ()):
+        """
+        Add to a named count, like the number of edges the light engine culled. Starts tracking it if it's new.
+        """
+        tracker = self._counts.get(name)
+        if tracker is None:
+            self.track_count(name, contexts)
+            tracker = self._counts[name]
+        tracker.total += amount
+        tracker.update_total += amount
+
+    def get_count(self, name: str) -> CountTracker:
+        return self._counts[name]
+
     def __setitem__(self, func: Callable, elapsed_time: float):
         tracker = self._funcs[func]
         tracker.timings.append(elapsed_time)
@@ -54,12 +90,16 @@ class PerfTracker:
             tracker.update_count = 0
             tracker.update_elapsed = 0.0
 
+        for tracker in self._counts.values():
+            tracker.update_total_history.append(tracker.update_total)
+            tracker.update_total = 0
+
     def imgui_draw(self, *contexts):
         for context in contexts:
             expanded, visible = imgui.collapsing_header(f"Function Timings: {context}")
 
             if expanded:
-                for func in self._contexts[context]:
+                for func in self._contexts.get(context, ()):
                     if imgui.is_item_hovered():
                         imgui.set_tooltip(f"{func}")
                     tracker = self._funcs[func]
@@ -83,6 +123,21 @@ class PerfTracker:
 
                     imgui.text(f"{func.__qualname__} - avg: {avg_timing * 1e-6 :.3f}ms - count: {tracker.count} - avg update elapsed: {avg_elapsed * 1e-6 :.3f} - avg call count: {avg_counts}")
 
+            if not self._count_contexts.get(context):
+                continue
+
+            expanded, visible = imgui.collapsing_header(f"Counts: {context}")
+            if expanded:
+                for name in sorted(self._count_contexts[context]):
+                    tracker = self._counts[name]
+                    history = tracker.update_total_history
+                    update_count = min(len(history), 10)
+                    if not update_count:
+                        imgui.text(f"{name} - total: {tracker.total}")
+                        continue
+
+                    avg_total = sum(history[-update_count:]) / update_count
+                    imgui.text(f"{name} - total: {tracker.total} - last update: {history[-1]} - avg update: {avg_total:.1f}")
 
         imgui.separator()
 
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import logging
+from io import BytesIO
+
+import arcade
+import numpy as np
+import pytest
+from pyglet.math import Vec2
+
+from lux.components import Mirror
+from lux.depreciated.engine.bake import BakedLighting, bake_lighting
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.tree import BeamTree
+from lux.get_window import get_window, set_window
+from lux.level import Level
+from lux.systems.light import LightSystem
+
+from .scenes import beam, outcome, scene, tree_signature
+from .test_light_system import make_level
+
+SEEDS = range(20)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def window():
+    last = get_window()
+    window = arcade.Window(100, 100, visible=False)
+    set_window(window)
+    yield window
+    set_window(last)
+    window.close()
+
+
+def solve(interactors, light) -> list:
+    tree = BeamTree()
+    propogate_beam_into(tree, interactors, light)
+    return tree_signature(tree)
+
+
+def bake(seed: int):
+    # Two light sources into the same scene, so the second one's run doesn't start at the front of the tree.
+    interactors = scene("mixed", seed)
+    lights = {1: beam(seed), 2: beam(seed + 1000)}
+    if "gave up" in (outcome(lambda: solve(interactors, light)) for light in lights.values()):
+        pytest.skip("the sweep gives up on this scene")
+    return interactors, lights, bake_lighting("digest", interactors, lights.items())
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_round_trip(seed):
+    _, _, baked = bake(seed)
+
+    # Saved and loaded the same way as the level data does it.
+    file = BytesIO()
+    np.savez_compressed(file, **baked.to_arrays())
+    file.seek(0)
+    with np.load(file, allow_pickle=False) as arrays:
+        loaded = BakedLighting.from_arrays(dict(arrays))
+
+    assert loaded.digest == "digest"
+    assert loaded.lights == baked.lights == (1, 2)
+    assert tree_signature(loaded.tree) == tree_signature(baked.tree)
+    for light in baked.lights:
+        low, high = Vec2(-10.0, -10.0), Vec2(10.0, 10.0)
+        assert loaded.overlaps(light, low, high) == baked.overlaps(light, low, high)
+
+
+def test_missing_arrays():
+    arrays = bake(0)[2].to_arrays()
+    del arrays['lights']
+    with pytest.raises(ValueError):
+        BakedLighting.from_arrays(arrays)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_copy_into_matches_solve(seed):
+    interactors, lights, baked = bake(seed)
+    for light, source in lights.items():
+        tree = BeamTree()
+        baked.copy_into(tree, light)
+        assert tree_signature(tree) == solve(interactors, source)
+
+
+def test_movable_is_not_baked():
+    interactors = scene("mixed", 4)
+    light = beam(4)
+    assert bake_lighting("digest", interactors, ((1, light),)).lights == (1,)
+    assert bake_lighting("digest", interactors, ((1, light),), movable=interactors).lights == ()
+
+
+def make_baked_level():
+    # The level from test_light_system, with a mirror off to the side which can be moved into the light.
+    level = make_level()
+    level.add(Mirror(106, level.object(6, Vec2(0.0, 600.0), Vec2(1.0, 0.0)), 100.0))
+    return level
+
+
+def solved(level) -> tuple[LightSystem, list]:
+    system = LightSystem()
+    system.preload()
+    system.load(level)
+    system.update(0.0)
+    assert system.wait(30.0)
+    return system, tree_signature(system.tree)
+
+
+def test_moved_interactor_makes_light_live():
+    level = make_baked_level()
+    baker, live = solved(level)
+    level.baked_lighting = baker.bake("digest", frozenset({6}))
+    baker.unload()
+    assert level.baked_lighting.lights == (100,)
+
+    system, signature = solved(level)
+    try:
+        assert system._live == set()
+        assert signature == live
+
+        # Moving the mirror somewhere else the light doesn't reach keeps it baked.
+        level.objects[6].origin = Vec2(0.0, 700.0)
+        system.update(0.0)
+        assert system.wait(30.0)
+        assert system._live == set()
+        assert tree_signature(system.tree) == live
+
+        # Into the light it has to be solved again.
+        level.objects[6].origin = Vec2(100.0, 0.0)
+        system.update(0.0)
+        assert system.wait(30.0)
+        assert system._live == {100}
+
+        level.baked_lighting = None
+        fresh, expected = solved(level)
+        fresh.unload()
+        assert tree_signature(system.tree) == expected != live
+    finally:
+        system.unload()
+
+
+def test_unreadable_bake_is_ignored(monkeypatch, caplog):
+    monkeypatch.setattr("lux.level.get_baked_lighting", lambda name: {'digest': np.array("digest")})
+    level = Level("unreadable")
+    with caplog.at_level(logging.WARNING, logger="lux"):
+        assert level._get_baked_lighting({'components': []}) is None
+    assert "unreadable" in caplog.text
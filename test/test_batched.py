@@ -0,0 +1,46 @@
+from __future__ import annotations
+from math import cos, sin, tau
+from random import Random
+
+import numpy as np
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.batched import EdgeBatch, cast_rays_batched
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.tree import BeamTree
+
+from .scenes import corpus, outcome, tree_signature
+
+SCENES = tuple(corpus(100))
+
+
+def solve(interactors, beam, **kwargs) -> list:
+    tree = BeamTree()
+    propogate_beam_into(tree, interactors, beam, **kwargs)
+    return tree_signature(tree)
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_batched_matches_scalar(name, interactors, beam):
+    scalar = outcome(lambda: solve(interactors, beam))
+    assert outcome(lambda: solve(interactors, beam, edge_batch=EdgeBatch(interactors))) == scalar
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_batched_cast_matches_scalar(name, interactors, beam):
+    rng = Random(name)
+    rays = []
+    for _ in range(50):
+        angle = rng.uniform(0.0, tau)
+        rays.append(Ray(Vec2(rng.uniform(-100.0, 1000.0), rng.uniform(-400.0, 400.0)), Vec2(cos(angle), sin(angle)), rng.uniform(10.0, 1500.0), 1500.0))
+
+    batch = EdgeBatch(interactors)
+    batched = cast_rays_batched(
+        batch,
+        np.array([(ray.source.x, ray.source.y) for ray in rays]),
+        np.array([(ray.direction.x, ray.direction.y) for ray in rays]),
+        np.array([ray.length for ray in rays])
+    )
+    assert batched == [ray.calculate_ray_interaction(interactors) for ray in rays]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.benchmark import SCENES, benchmark_scene, benchmark_corpus
+from lux.depreciated.engine.new import propogate_beam
+
+
+@pytest.mark.parametrize("name", tuple(SCENES))
+def test_scene_solves(name):
+    for result in benchmark_scene(name, 16, repeats=2):
+        assert "error" not in result, result
+        assert result["best_ms"] <= result["mean_ms"]
+        assert result["beams"] > 0
+        assert 0 < result["edges_tested"]
+
+
+def test_edges_from_timed_runs(monkeypatch):
+    # The edges are counted on the timed runs, so the engine runs once per repeat and no more.
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return propogate_beam(*args, **kwargs)
+
+    monkeypatch.setattr("lux.depreciated.engine.benchmark.propogate_beam", counted)
+    (result, _, _) = benchmark_scene("stacked", 16, repeats=3)
+    assert len(calls) == 3
+    assert result["edges_tested"] > 0
+    assert instrument.COUNTERS is None
+
+
+def test_skipped(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("AHHHH")
+
+    monkeypatch.setattr("lux.depreciated.engine.benchmark.find_intersections", fail)
+    corpus = benchmark_corpus(("stacked",), (16,), repeats=1)
+    (skipped,) = [result for result in corpus["results"] if "error" in result]
+    assert skipped["function"] == "find_intersections"
+    assert "best_ms" not in skipped
+    assert corpus["skipped"] == ["find_intersections on stacked 16: AssertionError: AHHHH"]
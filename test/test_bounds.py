@@ -0,0 +1,80 @@
+from __future__ import annotations
+import heapq
+from math import cos, sin, tau
+from random import Random
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import MirrorRayInteractor
+from lux.depreciated.engine.lights.ray import Ray
+from lux.util.colour import LuxColour
+from lux.util.maths import get_segment_intersection
+
+from .scenes import KINDS, scene
+
+SEEDS = range(30)
+
+
+def heap_ray_interaction(ray: Ray, interactors):
+    # How calculate_ray_interaction used to find the closest hit, every edge of every interactor onto a heap.
+    intersecting_edges = []
+    ray_start = ray.source
+    ray_end = ray_start + ray.direction * ray.length
+    for interactor in interactors:
+        for edge, world_edge in zip(interactor.bounds, interactor.world_bounds):
+            interaction_point = get_segment_intersection(ray_start, ray_end, world_edge.start, world_edge.end)
+            if interaction_point is None:
+                continue
+            diff = (interaction_point - ray_start)
+            heapq.heappush(intersecting_edges, (diff.dot(diff), len(intersecting_edges), interaction_point, edge, interactor))
+
+    if not intersecting_edges:
+        return None
+    return heapq.heappop(intersecting_edges)[2:]
+
+
+def assert_inside(interactor):
+    centre, radius = interactor.bounding_circle
+    for edge in interactor.world_bounds:
+        # The circle is convex, so an edge is inside of it if both ends are.
+        for point in (edge.start, edge.end):
+            assert (point - centre).mag <= radius + 1e-9
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_circle_follows_moves(kind, seed):
+    rng = Random(f"circle:{kind}:{seed}")
+    for interactor in scene(kind, seed):
+        assert_inside(interactor)
+        for _ in range(5):
+            # Ask for the circle first each time, so a stale cached one would be caught after the move.
+            interactor.bounding_circle
+            if rng.random() < 0.5:
+                interactor.origin = Vec2(rng.uniform(-1000.0, 1000.0), rng.uniform(-1000.0, 1000.0))
+            else:
+                angle = rng.uniform(0.0, tau)
+                interactor.direction = Vec2(cos(angle), sin(angle))
+            assert_inside(interactor)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_closest_hit_matches_heap(kind, seed):
+    interactors = scene(kind, seed)
+    rng = Random(f"hit:{kind}:{seed}")
+    for _ in range(50):
+        angle = rng.uniform(0.0, tau)
+        ray = Ray(Vec2(rng.uniform(-100.0, 1000.0), rng.uniform(-400.0, 400.0)), Vec2(cos(angle), sin(angle)), rng.uniform(10.0, 1500.0), 1500.0)
+        assert ray.calculate_ray_interaction(interactors) == heap_ray_interaction(ray, interactors)
+
+
+def test_closest_hit_tie():
+    # Two mirrors in the same place, the heap gave the first one found and so should the running best.
+    mirrors = tuple(MirrorRayInteractor(100.0, Vec2(300.0, 0.0), Vec2(-1.0, 0.0), LuxColour.WHITE) for _ in range(2))
+    ray = Ray(Vec2(0.0, 10.0), Vec2(1.0, 0.0), 1000.0, 1000.0)
+    hit = ray.calculate_ray_interaction(mirrors)
+    assert hit == heap_ray_interaction(ray, mirrors)
+    assert hit[2] is mirrors[0]
+    assert ray.calculate_ray_interaction(mirrors[::-1])[2] is mirrors[1]
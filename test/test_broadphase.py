@@ -0,0 +1,55 @@
+from __future__ import annotations
+from math import cos, sin, tau
+from random import Random
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.batched import EdgeBatch
+from lux.depreciated.engine.broadphase import UniformGrid
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.tree import BeamTree
+
+from .scenes import beam, corpus, outcome, scene, tree_signature
+
+SCENES = tuple(corpus(100))
+
+
+def solve(interactors, beam, **kwargs) -> list:
+    tree = BeamTree()
+    propogate_beam_into(tree, interactors, beam, **kwargs)
+    return tree_signature(tree)
+
+
+def make_grid(interactors, cell_size: float) -> UniformGrid:
+    grid = UniformGrid(cell_size)
+    grid.extend(interactors)
+    return grid
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_grid_matches_everything(name, interactors, beam):
+    everything = outcome(lambda: solve(interactors, beam))
+    for cell_size in (32.0, 128.0, 1024.0):
+        grid = make_grid(interactors, cell_size)
+        assert outcome(lambda: solve(interactors, beam, broadphase=grid)) == everything
+        assert outcome(lambda: solve(interactors, beam, broadphase=grid, edge_batch=EdgeBatch(interactors))) == everything
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_grid_ray_cast_matches_everything(name, interactors, beam):
+    rng = Random(name)
+    grid = make_grid(interactors, 128.0)
+    for _ in range(20):
+        angle = rng.uniform(0.0, tau)
+        ray = Ray(Vec2(rng.uniform(-100.0, 1000.0), rng.uniform(-400.0, 400.0)), Vec2(cos(angle), sin(angle)), rng.uniform(10.0, 1500.0), 1500.0)
+        assert ray.calculate_ray_interaction(interactors, grid) == ray.calculate_ray_interaction(interactors)
+
+
+def test_moving_an_interactor_moves_it_in_the_grid():
+    interactors, light = scene("mixed", 0), beam(0)
+    grid = make_grid(interactors, 128.0)
+    for interactor in interactors:
+        interactor.origin = interactor.origin + Vec2(300.0, -120.0)
+    assert outcome(lambda: solve(interactors, light, broadphase=grid)) == outcome(lambda: solve(interactors, light))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from lux.depreciated.engine.budget import BudgetedSolver
+from lux.depreciated.engine.new import propogate_beam
+
+from .scenes import beam, corpus, light_signature, outcome, scene
+
+SCENES = tuple(corpus(60))
+
+
+def count(roots) -> int:
+    total, to_count = 0, list(roots)
+    while to_count:
+        light = to_count.pop()
+        to_count.extend(light.children)
+        total += 1
+    return total
+
+
+def largest_split(roots) -> int:
+    # The most beams any one beam was split into, which is the top level beams for the source.
+    largest, to_check = len(roots), list(roots)
+    while to_check:
+        light = to_check.pop()
+        to_check.extend(light.children)
+        largest = max(largest, len(light.children))
+    return largest
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_budgeted_matches_full_solve(name, interactors, beam):
+    full = outcome(lambda: propogate_beam(interactors, beam))
+    if full == "gave up":
+        pytest.skip("the sweep gives up on this scene")
+
+    solver = BudgetedSolver(interactors, max_beams=5)
+    solver.add_source(beam)
+    try:
+        # However the solve is split across frames it has to end up with the same tree.
+        made = 0
+        while not solver.done:
+            roots = solver.step()
+            grown, made = count(roots) - made, count(roots)
+
+            # A frame only goes over its beams when one beam splits into more than that on its own.
+            assert grown <= max(solver.max_beams, largest_split(full))
+        assert light_signature(roots) == light_signature(full)
+    finally:
+        solver.release()
+
+
+def test_removed_source_lives_on():
+    # With nothing in its way the source is its own top level beam, removing it mustn't kill it with the tree.
+    light, other = beam(0), beam(1)
+    solver = BudgetedSolver(())
+    solver.add_source(light)
+    solver.add_source(other)
+    assert set(solver.step()) == {light, other}
+
+    solver.remove_source(light)
+    assert solver.step() == (other,)
+    assert light.left is not None and light.right is not None
+    solver.release()
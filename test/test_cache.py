@@ -0,0 +1,75 @@
+from __future__ import annotations
+from gc import collect
+from weakref import ref
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.cache import PropagationCache
+from lux.depreciated.engine.new import propogate_beam
+
+from .scenes import beam, light_signature, outcome, scene, split_signature
+
+NAMES = tuple((kind, seed) for kind in ("mirrors", "polys", "mixed") for seed in range(60))
+
+
+def solve(interactors, light, cache=None):
+    return light_signature(propogate_beam(interactors, light, cache=cache))
+
+
+def assert_same(cached, uncached):
+    # Beams within the cache's quantum of each other share an entry, so the last few digits can differ.
+    if "gave up" in (cached, uncached):
+        assert cached == uncached
+        return
+    cached_shape, cached_numbers = split_signature(cached)
+    uncached_shape, uncached_numbers = split_signature(uncached)
+    assert cached_shape == uncached_shape
+    assert cached_numbers == pytest.approx(uncached_numbers, abs=0.0001)
+
+
+@pytest.mark.parametrize("kind, seed", NAMES, ids=[f"{kind}:{seed}" for kind, seed in NAMES])
+def test_cache_matches_uncached(kind, seed):
+    interactors, light = scene(kind, seed), beam(seed)
+    cache = PropagationCache()
+
+    uncached = outcome(lambda: solve(interactors, light))
+    assert_same(outcome(lambda: solve(interactors, light, cache)), uncached)
+
+    # The second time round everything comes out of the cache.
+    misses = cache.misses
+    assert_same(outcome(lambda: solve(interactors, light, cache)), uncached)
+    if uncached != "gave up":
+        assert cache.misses == misses and cache.hits > 0
+
+    # Moving something has to miss wherever it could be hit.
+    interactors[0].origin = interactors[0].origin + Vec2(25.0, -15.0)
+    assert_same(outcome(lambda: solve(interactors, light, cache)), outcome(lambda: solve(interactors, light)))
+
+
+def test_eviction_keeps_results():
+    # A cache too small to hold one solve has to keep evicting, but still give the same answer.
+    interactors, light = scene("mirrors", 1), beam(1)
+    cache = PropagationCache(max_segments=2)
+    uncached = solve(interactors, light)
+    assert_same(solve(interactors, light, cache), uncached)
+    assert_same(solve(interactors, light, cache), uncached)
+    assert cache.evictions > 0
+
+
+
+def test_entries_keep_interactors_alive():
+    # An id can be reused once its interactor is gone, so the cache holds on to the interactors in its keys.
+    # Otherwise a new interactor in the same place could hit entries that belong to the old one.
+    interactors, light = scene("mixed", 3), beam(3)
+    cache = PropagationCache()
+    solve(interactors, light, cache)
+
+    refs = [ref(interactor) for interactor in interactors]
+    del interactors
+    collect()
+    assert all(alive() is not None for alive in refs)
+
+    cache.clear()
+    collect()
+    assert all(alive() is None for alive in refs)
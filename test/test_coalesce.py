@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import RayInteractorEdge, FilterRayInteractor, MirrorRayInteractor
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.new import find_intersections
+from lux.util.colour import LuxColour
+
+from .scenes import corpus
+
+SCENES = tuple(corpus(100))
+
+
+def beam_area(beam) -> float:
+    # The quad between the two rays, from the front of the beam to where each ray ends.
+    left, right = beam.left, beam.right
+    corners = (left.source, left.source + left.direction * left.length,
+               right.source + right.direction * right.length, right.source)
+    return abs(sum(a.x * b.y - b.x * a.y for a, b in zip(corners, corners[1:] + corners[:1]))) / 2.0
+
+
+def lit_area(interactors, beam, coalesce: bool, depth: int = 3) -> tuple[float, int]:
+    """
+    The total area lit by the beam and everything that comes out of it, down to depth, and how many beams that took.
+    """
+    try:
+        replacements, edge_map = find_intersections(interactors, beam, coalesce=coalesce)
+    except AssertionError:
+        return 0.0, 0
+
+    area, count = 0.0, len(replacements)
+    for child, edge, left, right in replacements:
+        area += beam_area(child)
+        interactor = edge_map.get(edge)
+        if interactor is None or depth <= 1:
+            continue
+        for sub_child in interactor.ray_hit(child, edge, left, right):
+            sub_area, sub_count = lit_area(interactors, sub_child, coalesce, depth - 1)
+            area, count = area + sub_area, count + sub_count
+    return area, count
+
+
+def segmented_wall(pieces: int, colour: LuxColour) -> FilterRayInteractor:
+    # One wall across the beam made of lots of pieces, the case coalescing is for.
+    points = [Vec2(0.0, -300.0 + 600.0 * idx / pieces) for idx in range(pieces + 1)]
+    bounds = tuple(RayInteractorEdge(start, end, True) for start, end in zip(points, points[1:]))
+    return FilterRayInteractor(Vec2(500.0, 0.0), Vec2(1.0, 0.0), colour, bounds)
+
+
+def make_beam() -> BeamLightRay:
+    return BeamLightRay(
+        LuxColour.WHITE,
+        Ray(Vec2(0.0, 200.0), Vec2(1.0, 0.0), 2000.0, 2000.0),
+        Ray(Vec2(0.0, -200.0), Vec2(1.0, 0.0), 2000.0, 2000.0)
+    )
+
+
+def test_segmented_wall_is_one_beam():
+    interactors = (segmented_wall(12, LuxColour.RED),)
+    split_area, split_count = lit_area(interactors, make_beam(), False)
+    merged_area, merged_count = lit_area(interactors, make_beam(), True)
+
+    # One beam up to the wall, and one through it.
+    assert merged_count == 2
+    assert split_count > merged_count
+    assert merged_area == pytest.approx(split_area, rel=1e-9)
+
+
+def test_different_interactors_stay_split():
+    # Two walls which line up, but are different interactors, could come out differently.
+    interactors = (
+        MirrorRayInteractor(200.0, Vec2(500.0, 100.0), Vec2(1.0, 0.0), LuxColour.WHITE),
+        MirrorRayInteractor(200.0, Vec2(500.0, -100.0), Vec2(1.0, 0.0), LuxColour.WHITE)
+    )
+    replacements, _ = find_intersections(interactors, make_beam(), coalesce=True)
+    assert len(replacements) == 2
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_lit_area_unchanged(name, interactors, beam):
+    split_area, split_count = lit_area(interactors, beam, False)
+    merged_area, merged_count = lit_area(interactors, beam, True)
+
+    assert merged_count <= split_count
+    assert merged_area == pytest.approx(split_area, rel=1e-6, abs=1e-3)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from math import atan2, cos, sin
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import MirrorRayInteractor, WallRayInteractor
+from lux.depreciated.engine.lights.cone_light_ray import ConeLightRay, sweep_cone
+from lux.depreciated.engine.lights.ray import Ray
+from lux.util.colour import LuxColour
+from lux.util.maths import get_intersection
+
+from .scenes import KINDS, scene
+
+SAMPLES = 5
+CONES = ((-0.4, 0.4, 0.0), (-0.2, 0.6, 0.0), (-0.7, 0.1, 0.0), (-1.2, 1.2, 0.0), (-0.5, 0.3, 40.0))
+
+
+def make_cone(right_angle: float, left_angle: float, near: float, length: float = 2000.0) -> ConeLightRay:
+    # A cone out of the world origin, which starts near along its sides (like one coming off a mirror) if near isn't 0.
+    right, left = Vec2(cos(right_angle), sin(right_angle)), Vec2(cos(left_angle), sin(left_angle))
+    return ConeLightRay(LuxColour.WHITE, Ray(left * near, left, length, length), Ray(right * near, right, length, length), Vec2(0.0, 0.0))
+
+
+def segment_mirror(start: Vec2, end: Vec2) -> MirrorRayInteractor:
+    diff = end - start
+    return MirrorRayInteractor(diff.mag, (start + end) / 2.0, Vec2(diff.y, -diff.x).normalize(), LuxColour.WHITE)
+
+
+def cast_wedges(cone: ConeLightRay, interactors) -> list[tuple[int, float, object, object]]:
+    """
+    Cast rays through each wedge sweep_cone made and return (wedge, angle, edge it gave, edge the ray hit)
+    for every ray that disagrees. The back edge of the cone is a wall, so rays past it hit that.
+    """
+    world_edges = dict()
+    for interactor in interactors:
+        for edge, world_edge in zip(interactor.bounds, interactor.world_bounds):
+            world_edges[(interactor, edge)] = world_edge
+
+    replacements, back_edge = sweep_cone(cone, tuple(world_edges.values()))
+    back = WallRayInteractor(back_edge.start, back_edge.end)
+    world_edges[(back, back.edge)] = back_edge
+    everything = tuple(interactors) + (back,)
+
+    right = cone.right.direction
+    front = cone.left.source - cone.right.source
+
+    def relative(direction: Vec2) -> float:
+        return atan2(right.x * direction.y - right.y * direction.x, right.dot(direction))
+
+    wrong = []
+    for idx, (wedge, edge, _, _) in enumerate(replacements):
+        start, stop = relative(wedge.right.direction), relative(wedge.left.direction)
+        for sample in range(1, SAMPLES + 1):
+            angle = start + (stop - start) * sample / (SAMPLES + 1)
+            direction = Vec2(right.x * cos(angle) - right.y * sin(angle), right.x * sin(angle) + right.y * cos(angle))
+            source = cone.origin if front.x == 0.0 and front.y == 0.0 else get_intersection(cone.origin, direction, cone.right.source, front)
+            _, hit_edge, hit = Ray(source, direction, 5000.0, 1.0).calculate_ray_interaction(everything)
+            if world_edges[(hit, hit_edge)] is not edge:
+                wrong.append((idx, angle, edge, world_edges[(hit, hit_edge)]))
+    return wrong
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("seed", range(40))
+def test_sweep_matches_rays(kind, seed):
+    interactors = scene(kind, seed)
+    for cone in CONES:
+        assert cast_wedges(make_cone(*cone), interactors) == []
+
+
+def test_wedges_cover_cone():
+    cone = make_cone(-0.4, 0.4, 0.0)
+    replacements, _ = sweep_cone(cone, tuple(edge for interactor in scene("mixed", 59) for edge in interactor.world_bounds))
+    assert replacements[0][0].right.direction == cone.right.direction
+    assert replacements[-1][0].left.direction == cone.left.direction
+    for (first, _, _, _), (second, _, _, _) in zip(replacements, replacements[1:]):
+        assert tuple(first.left.direction) == pytest.approx(tuple(second.right.direction))
+
+
+def test_far_mirror_behind_gap():
+    # The far mirror only shows between the ends of the two near ones, so none of its wedge can go to the back edge.
+    mirrors = (
+        segment_mirror(Vec2(924.38, 108.29), Vec2(866.61, 196.19)),
+        segment_mirror(Vec2(264.43, 195.87), Vec2(276.26, 82.32)),
+        segment_mirror(Vec2(171.84, -13.24), Vec2(144.99, -1.29))
+    )
+    for right_angle in (-0.4, -0.2, -0.05):
+        for left_angle in (0.35, 0.7, 1.2, 2.5):
+            assert cast_wedges(make_cone(right_angle, left_angle, 0.0), mirrors) == []
+
+
+def test_crossing_edges():
+    # A mirror straight through another, so the sweep has to swap which is in front half way across both.
+    mirrors = (
+        segment_mirror(Vec2(400.0, -100.0), Vec2(500.0, 100.0)),
+        segment_mirror(Vec2(500.0, -100.0), Vec2(400.0, 100.0))
+    )
+    assert cast_wedges(make_cone(-0.4, 0.4, 0.0), mirrors) == []
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.new import propogate_beam
+from lux.depreciated.engine.interactors import MirrorRayInteractor, WallRayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.ray import Ray
+from lux.util.colour import LuxColour
+
+
+def bounce() -> tuple:
+    # The beam goes off the mirror and back into the wall behind its source. The other walls are behind the mirror,
+    # and off to the side where nothing reaches them.
+    interactors = (
+        MirrorRayInteractor(100.0, Vec2(200.0, -20.0), Vec2(-1.0, 0.0), LuxColour.WHITE),
+        WallRayInteractor(Vec2(300.0, -50.0), Vec2(300.0, 50.0)),
+        WallRayInteractor(Vec2(-100.0, -50.0), Vec2(-100.0, 50.0)),
+        WallRayInteractor(Vec2(0.0, 5000.0), Vec2(100.0, 5000.0))
+    )
+    beam = BeamLightRay(LuxColour.WHITE, Ray(Vec2(0.0, 10.0), Vec2(1.0, 0.0), 2000.0, 2000.0), Ray(Vec2(0.0, -10.0), Vec2(1.0, 0.0), 2000.0, 2000.0))
+    return interactors, beam
+
+
+@pytest.fixture
+def counters():
+    yield instrument.enable_counters()
+    instrument.disable_counters()
+
+
+def test_counts(counters):
+    counters.reset()
+    interactors, beam = bounce()
+    propogate_beam(interactors, beam)
+
+    assert counters.beams_propagated == 2
+    assert counters.max_depth == 2
+    assert counters.depth == 0
+    assert len(counters.depth_ns) == 2
+    # Every interactor is either culled whole or has its one edge considered, once per beam.
+    assert counters.interactors_culled + counters.edges_considered == 2 * len(interactors)
+    assert counters.interactors_culled > 0
+    assert counters.culled_behind > 0
+    assert counters.intersections > 0
+    assert counters.lights_allocated > 0
+
+
+def test_off():
+    instrument.disable_counters()
+    assert instrument.COUNTERS is None
+    propogate_beam(*bounce())
+
+    counters = instrument.enable_counters()
+    try:
+        assert counters.as_dict() == instrument.EngineCounters().as_dict()
+    finally:
+        instrument.disable_counters()
+
+
+def test_report(counters):
+    from lux.util.duration_tracker import PerfTracker
+
+    counters.reset()
+    propogate_beam(*bounce())
+    counts = counters.as_dict()
+
+    tracker = PerfTracker()
+    counters.report(tracker, "test")
+    assert tracker.get_count("engine.beams_propagated").total == 2
+    assert tracker.get_count("engine.depth_1_ns").total == counts["depth_1_ns"]
+    assert counters.as_dict() == instrument.EngineCounters().as_dict()
+
+
+def test_no_imgui():
+    # The engine has to run where imgui can't be imported, like a solver thread in a headless test.
+    code = "import sys; sys.modules['imgui'] = None; import lux.depreciated.engine.new; import lux.depreciated.engine.instrument"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from weakref import WeakSet
+
+import arcade
+import pytest
+from pyglet.math import Vec2
+
+from lux.components import LevelObject, LightSource, Mirror, Filter, Portal
+from lux.depreciated.engine.interactors import MirrorRayInteractor, FilterRayInteractor, PortalRayInteractor
+from lux.depreciated.engine.static import StaticGeometry
+from lux.get_window import get_window, set_window
+from lux.systems.light import LightSystem
+from lux.util.colour import LuxColour
+
+from util.uuid_ref import UUIDRef
+
+from .scenes import tree_signature
+
+
+class FakeLevel:
+    """
+    Just enough of a Level for LightSystem.load, the components are added with their refs resolved.
+    """
+
+    def __init__(self):
+        self.static_geometry: StaticGeometry = StaticGeometry(())
+        self.baked_lighting = None
+        self.objects: dict[int, LevelObject] = dict()
+        self.components: list = []
+
+    def resolve_UUID(self, UUID_: int):
+        return self.objects[UUID_] if UUID_ in self.objects else next(c for c in self.components if c.UUID == UUID_)
+
+    def get_components(self, component):
+        return WeakSet(c for c in self.components if type(c) is component)
+
+    def object(self, UUID: int, origin: Vec2, direction: Vec2, colour: LuxColour = LuxColour.WHITE) -> UUIDRef[LevelObject]:
+        self.objects[UUID] = LevelObject(UUID, origin, direction, colour)
+        return self.ref(UUID)
+
+    def ref(self, UUID: int) -> UUIDRef:
+        ref = UUIDRef(UUID)
+        ref.resolve(self)
+        return ref
+
+    def add(self, component):
+        self.components.append(component)
+        return component
+
+
+def make_level() -> FakeLevel:
+    # A light shining through a filter into one end of a pair of portals, out of the other end into a mirror,
+    # and back the way it came.
+    level = FakeLevel()
+    level.add(LightSource(100, level.object(1, Vec2(0.0, 0.0), Vec2(1.0, 0.0)), 20.0, 2000.0))
+    level.add(Filter(101, level.object(2, Vec2(200.0, 0.0), Vec2(1.0, 0.0), LuxColour.RED), 100.0))
+    level.add(Portal(102, level.object(3, Vec2(400.0, 0.0), Vec2(-1.0, 0.0)), 100.0, UUIDRef(103)))
+    level.add(Portal(103, level.object(4, Vec2(0.0, -400.0), Vec2(1.0, 0.0)), 100.0, UUIDRef(102)))
+    level.add(Mirror(104, level.object(5, Vec2(300.0, -400.0), Vec2(1.0, 0.0)), 100.0))
+    for portal in level.get_components(Portal):
+        portal.sibling.resolve(level)
+    return level
+
+
+@pytest.fixture(scope="module", autouse=True)
+def window():
+    last = get_window()
+    window = arcade.Window(100, 100, visible=False)
+    set_window(window)
+    yield window
+    set_window(last)
+    window.close()
+
+
+@pytest.fixture
+def loaded():
+    level = make_level()
+    system = LightSystem()
+    system.preload()
+    system.load(level)
+    yield level, system
+    system.unload()
+
+
+def test_load_builds_interactors(loaded):
+    level, system = loaded
+    assert len(system._interactors) == 4
+
+    (filter_,), (portal,), (sibling,), (mirror,) = (system._parent_map[UUID] for UUID in (2, 3, 4, 5))
+    assert isinstance(filter_, FilterRayInteractor) and filter_.colour == LuxColour.RED
+    assert isinstance(mirror, MirrorRayInteractor) and mirror.origin == Vec2(300.0, -400.0)
+    assert isinstance(portal, PortalRayInteractor) and isinstance(sibling, PortalRayInteractor)
+    assert portal.linked == (sibling,) and sibling.linked == (portal,)
+    assert system._sources == ((100, level.get_components(LightSource).pop().parent, 20.0, 2000.0),)
+
+
+def test_beams_are_solved(loaded):
+    _, system = loaded
+    system.update(0.0)
+    assert system.wait(30.0)
+
+    colours = [system.tree.view(idx).colour for idx in range(len(system.tree))]
+    assert colours == [LuxColour.WHITE] + [LuxColour.RED] * 5
+    assert system._tessellator.beams == len(system.tree)
+
+
+def test_parent_change_marks_dirty(loaded):
+    level, system = loaded
+    system.update(0.0)
+    assert system.wait(30.0)
+    assert not system._dirty
+
+    level.objects[5].origin = Vec2(320.0, -400.0)
+    assert system._dirty
+    assert system._parent_map[5][0].origin == Vec2(320.0, -400.0)
+
+    before = tree_signature(system.tree)
+    system.update(0.0)
+    assert system.wait(30.0)
+    assert tree_signature(system.tree) != before
+
+
+def test_clean_update_does_nothing(loaded, monkeypatch):
+    _, system = loaded
+    system.update(0.0)
+    assert system.wait(30.0)
+
+    calls = []
+    monkeypatch.setattr(system._solver, "submit", lambda *args: calls.append("submit"))
+    monkeypatch.setattr(system._tessellator, "tessellate_tree", lambda *args: calls.append("tessellate"))
+    for _ in range(3):
+        system.update(0.0)
+    assert calls == []
+
+
+def test_failed_solve_keeps_beams(loaded):
+    level, system = loaded
+    system.update(0.0)
+    assert system.wait(30.0)
+    before = tree_signature(system.tree)
+
+    def fail(*args):
+        raise RuntimeError("the solve fell over")
+
+    system._solver._solve = fail
+    level.objects[5].origin = Vec2(320.0, -400.0)
+    system.update(0.0)
+    assert system.wait(30.0)
+    assert tree_signature(system.tree) == before
+
+
+def test_portal_sibling_must_be_portal():
+    level = make_level()
+    level.add(Portal(105, level.object(6, Vec2(0.0, 400.0), Vec2(1.0, 0.0)), 100.0, level.ref(101)))
+
+    system = LightSystem()
+    system.preload()
+    with pytest.raises(ValueError):
+        system.load(level)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from random import Random
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine import instrument
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.order import EndpointOrders
+from lux.depreciated.engine.tree import BeamTree
+
+from .scenes import beam, outcome, scene, tree_signature
+
+NAMES = tuple((kind, seed) for kind in ("mirrors", "polys", "mixed") for seed in range(60))
+
+
+def solve(interactors, light, orders=None) -> list:
+    tree = BeamTree()
+    propogate_beam_into(tree, interactors, light, orders=orders)
+    return tree_signature(tree)
+
+
+@pytest.mark.parametrize("kind, seed", NAMES, ids=[f"{kind}:{seed}" for kind, seed in NAMES])
+def test_orders_match_fresh_sort(kind, seed):
+    # Starting from last solve's order only makes the sort quicker, so every solve has to come out the same
+    # as sorting from scratch, whether the order still holds, needs repairing, or is thrown away.
+    interactors, light = scene(kind, seed), beam(seed)
+    rng = Random(f"{kind}:{seed}")
+    orders = EndpointOrders()
+
+    for _ in range(5):
+        orders.reset()
+        assert outcome(lambda: solve(interactors, light, orders)) == outcome(lambda: solve(interactors, light))
+
+        # Nudge a few interactors, mostly a little so the old orders are worth something, sometimes a lot.
+        for interactor in rng.sample(interactors, min(3, len(interactors))):
+            scale = 40.0 if rng.random() < 0.2 else 2.0
+            interactor.origin = interactor.origin + Vec2(rng.uniform(-scale, scale), rng.uniform(-scale, scale))
+            interactor.direction = interactor.direction.rotate(rng.uniform(-scale, scale) / 100.0)
+
+
+def test_orders_are_reused():
+    # Solving the same scene twice, every beam after the first solve starts from an order which still holds.
+    interactors, light = scene("polys", 0), beam(0)
+    orders = EndpointOrders()
+    counters = instrument.enable_counters()
+    try:
+        orders.reset()
+        first = solve(interactors, light, orders)
+        counters.reset()
+        orders.reset()
+        assert solve(interactors, light, orders) == first
+        assert counters.sorts_reused > 0
+        assert counters.sorts_full == 0
+    finally:
+        instrument.disable_counters()
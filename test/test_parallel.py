@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import MirrorRayInteractor
+from lux.depreciated.engine.new import propogate_beam
+from lux.depreciated.engine.parallel import ParallelPropagator
+from lux.depreciated.engine.benchmark import make_filter_stack, make_beam
+from lux.util.colour import LuxColour
+
+from .scenes import corpus, light_signature, split_signature
+
+
+def facing_mirrors() -> tuple[MirrorRayInteractor, ...]:
+    # The light bounces between these forever if nothing stops it.
+    return (
+        MirrorRayInteractor(2000.0, Vec2(200.0, 0.0), Vec2(1.0, 0.0), LuxColour.WHITE),
+        MirrorRayInteractor(2000.0, Vec2(-100.0, 0.0), Vec2(1.0, 0.0), LuxColour.WHITE)
+    )
+
+
+SCENES = (
+    ("facing mirrors", facing_mirrors()),
+    ("filter stack", make_filter_stack(16)),
+    *((name, interactors) for name, interactors, _ in corpus(10))
+)
+
+
+@pytest.fixture(scope="module")
+def propagator():
+    propagator = ParallelPropagator(max_workers=2, min_width=2)
+    yield propagator
+    propagator.release()
+
+
+def _solve(solve):
+    try:
+        return split_signature(light_signature(solve()))
+    except AssertionError:
+        return "gave up"
+
+
+@pytest.mark.parametrize("name, interactors", SCENES, ids=[name for name, _ in SCENES])
+def test_parallel_matches_serial(propagator, name, interactors):
+    # The subtrees are cut off by the guard in the same places as the serial walk, so the merged tree is the same.
+    propagator.ship(interactors)
+    serial = _solve(lambda: propogate_beam(interactors, make_beam()))
+    parallel = _solve(lambda: propagator.propagate(make_beam()))
+    if serial == "gave up" or parallel == "gave up":
+        assert serial == parallel
+        return
+
+    assert parallel[0] == serial[0]
+    assert parallel[1] == pytest.approx(serial[1], abs=1e-6)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.new import propogate_beam
+from lux.depreciated.engine.interactors import PortalRayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.benchmark import make_portal_pairs, make_beam
+from lux.util.colour import LuxColour
+
+SIBLING_DIRECTIONS = (Vec2(1.0, 0.0), Vec2(0.0, 1.0), Vec2(-1.0, 0.0), Vec2(0.6, 0.8))
+
+
+def cross(a: Vec2, b: Vec2) -> float:
+    return a.x * b.y - a.y * b.x
+
+
+@pytest.mark.parametrize("sibling_direction", SIBLING_DIRECTIONS)
+def test_portal_exit(sibling_direction):
+    # Whichever way the sibling faces the light comes out of its edge, with its left still on its left.
+    portal, sibling = PortalRayInteractor.create_pair(100.0, LuxColour.WHITE, Vec2(200.0, 0.0), Vec2(-1.0, 0.0), Vec2(0.0, -400.0), sibling_direction)
+    beam = BeamLightRay(LuxColour.WHITE, Ray(Vec2(0.0, 30.0), Vec2(1.0, 0.0), 2000.0, 2000.0), Ray(Vec2(0.0, 10.0), Vec2(1.0, 0.0), 2000.0, 2000.0))
+    (root,) = propogate_beam((portal, sibling), beam)
+    (through,) = root.children
+
+    edge = sibling.world_bounds[0]
+    for source in (through.left.source, through.right.source):
+        assert cross(edge.direction, source - edge.start) == pytest.approx(0.0, abs=1e-9)
+        assert 0.0 <= (source - edge.start).dot(edge.direction) <= edge.diff.mag
+
+    assert (through.left.source - through.right.source).mag == pytest.approx(20.0)
+    assert cross(through.left.direction, through.left.source - through.right.source) > 0.0
+
+
+@pytest.mark.parametrize("count", (16, 64, 256))
+def test_portal_pairs_solve(count):
+    # Used to trip the assertion in propogate_beam once the light came out of a portal the wrong way round.
+    assert propogate_beam(make_portal_pairs(count), make_beam())
@@ -0,0 +1,90 @@
+from __future__ import annotations
+from random import Random
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.guard import PropagationGuard
+from lux.depreciated.engine.interactors import MirrorRayInteractor
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.new import propogate_beam
+from lux.depreciated.engine.solver import IncrementalSolver
+from lux.util.colour import LuxColour
+
+from .scenes import COLOURS, beam, beam_signature, light_signature, outcome, scene
+
+NAMES = tuple((kind, seed) for kind in ("mirrors", "polys", "mixed") for seed in range(40))
+
+
+@pytest.mark.parametrize("kind, seed", NAMES, ids=[f"{kind}:{seed}" for kind, seed in NAMES])
+def test_incremental_matches_full_solve(kind, seed):
+    interactors, light = scene(kind, seed), beam(seed)
+    rng = Random(f"{kind}:{seed}")
+
+    # The solver can only be compared once it has solved, a scene the sweep gives up on doesn't get that far.
+    solver = IncrementalSolver(interactors)
+    if outcome(lambda: solver.add_source(light)) == "gave up":
+        solver.release()
+        pytest.skip("the sweep gives up on the first solve")
+
+    try:
+        assert light_signature(solver.solve()) == light_signature(propogate_beam(interactors, light))
+
+        for _ in range(4):
+            # Move, turn, and recolour a few interactors between each solve.
+            for interactor in rng.sample(interactors, min(3, len(interactors))):
+                change = rng.random()
+                if change < 0.4:
+                    interactor.origin = interactor.origin + Vec2(rng.uniform(-40.0, 40.0), rng.uniform(-40.0, 40.0))
+                elif change < 0.8:
+                    interactor.direction = interactor.direction.rotate(rng.uniform(-0.5, 0.5))
+                else:
+                    interactor.colour = rng.choice(COLOURS)
+
+            incremental = outcome(lambda: light_signature(solver.solve()))
+            if incremental == "gave up":
+                # Once the sweep has given up part of the tree is missing, so there's nothing left to compare.
+                assert outcome(lambda: propogate_beam(interactors, light)) == "gave up"
+                return
+            assert incremental == light_signature(propogate_beam(interactors, light))
+    finally:
+        solver.release()
+
+
+def flat_signature(roots) -> list:
+    # Every beam with how deep it is, since light_signature would recurse as deep as the tree.
+    beams, stack = [], [(root, 1) for root in roots]
+    while stack:
+        light, level = stack.pop()
+        beams.append((level, beam_signature(light)))
+        stack.extend((child, level + 1) for child in light.children)
+    return sorted(beams)
+
+
+def test_deep_mirror_chain():
+    # A beam bouncing down a corridor of two long mirrors, deeper than python would let the solver recurse.
+    interactors = (
+        MirrorRayInteractor(4000.0, Vec2(2000.0, 10.0), Vec2(0.0, 1.0), LuxColour.WHITE),
+        MirrorRayInteractor(4000.0, Vec2(2000.0, -10.0), Vec2(0.0, 1.0), LuxColour.WHITE)
+    )
+    direction = Vec2(1.0, 5.0).normalize()
+    light = BeamLightRay(
+        LuxColour.WHITE,
+        Ray(Vec2(0.0, 1.0), direction, 10000000.0, 10000000.0),
+        Ray(Vec2(0.0, -1.0), direction, 10000000.0, 10000000.0)
+    )
+    guard = PropagationGuard(1500)
+
+    solver = IncrementalSolver(interactors, guard=guard)
+    try:
+        solver.add_source(light)
+        solved = flat_signature(solver.solve())
+        assert solved[-1][0] > 1000
+        assert solved == flat_signature(propogate_beam(interactors, light, guard=guard))
+
+        # Moving one of the mirrors re-splits almost the whole chain.
+        interactors[0].origin = interactors[0].origin + Vec2(0.0, 1.0)
+        assert flat_signature(solver.solve()) == flat_signature(propogate_beam(interactors, light, guard=guard))
+    finally:
+        solver.release()
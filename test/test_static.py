@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.broadphase import UniformGrid, LayeredBroadphase
+from lux.depreciated.engine.interactors import WallRayInteractor
+from lux.depreciated.engine.new import propogate_beam_into
+from lux.depreciated.engine.static import bake_bounds
+from lux.depreciated.engine.threaded import ThreadedSolver
+from lux.depreciated.engine.tree import BeamTree
+
+from .scenes import corpus, light_signature, outcome, tree_signature
+
+SCENES = tuple(corpus(30))
+
+# A closed room around every scene, a zig zag through the middle of it, and a short chain with a repeated point.
+BOUNDS = (
+    {'points': [(-700, -500), (1200, -500), (1200, 500), (-700, 500)], 'closed': True},
+    {'points': [(450, -480), (520, -300), (430, -100), (560, 60), (470, 240)]},
+    {'points': [(-300, 300), (-300, 300), (-200, 420)]}
+)
+
+
+def flat_walls() -> tuple[WallRayInteractor, ...]:
+    # The same walls as BOUNDS, made by hand.
+    walls = []
+    for chain in BOUNDS:
+        points = [Vec2(float(x), float(y)) for x, y in chain['points']]
+        if chain.get('closed', False):
+            points.append(points[0])
+        walls.extend(WallRayInteractor(start, end) for start, end in zip(points, points[1:]) if start != end)
+    return tuple(walls)
+
+
+def solve(interactors, beam, **kwargs) -> list:
+    tree = BeamTree()
+    propogate_beam_into(tree, interactors, beam, **kwargs)
+    return tree_signature(tree)
+
+
+def test_bake_bounds():
+    static = bake_bounds(BOUNDS)
+    assert len(static) == len(flat_walls()) == 4 + 4 + 1
+    assert [(wall.edge.start, wall.edge.end) for wall in static.walls] == [(wall.edge.start, wall.edge.end) for wall in flat_walls()]
+    assert all(wall in static.grid for wall in static.walls)
+
+    with pytest.raises(ValueError):
+        bake_bounds(({'points': [(0, 0)]},))
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_layered_matches_flat(name, interactors, beam):
+    flat = outcome(lambda: solve(flat_walls() + interactors, beam))
+
+    static = bake_bounds(BOUNDS)
+    grid = UniformGrid()
+    grid.extend(interactors)
+    assert outcome(lambda: solve(static.walls + interactors, beam, broadphase=LayeredBroadphase(static.grid, grid))) == flat
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES[::10], ids=[name for name, _, _ in SCENES[::10]])
+def test_threaded_layered_matches_flat(name, interactors, beam):
+    flat = outcome(lambda: solve(flat_walls() + interactors, beam))
+    if flat == "gave up":
+        pytest.skip("the sweep gives up on this scene")
+
+    solver = ThreadedSolver(interactors, static=bake_bounds(BOUNDS))
+    try:
+        solver.submit((beam,))
+        assert solver.wait(30.0)
+        assert light_signature(solver.result.beams) == flat
+    finally:
+        solver.release()
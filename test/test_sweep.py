@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from lux.depreciated.engine.new import find_intersections
+from lux.depreciated.engine.sweep import ActiveEdges, OrderedActiveEdges
+
+from .scenes import corpus, replacement_signature
+
+SCENES = tuple(corpus(300))
+
+
+def _solve(interactors, beam, active_edges_type, parent=None):
+    try:
+        replacements, edge_map = find_intersections(interactors, beam, parent, active_edges_type=active_edges_type)
+    except AssertionError:
+        # The sweep still gives up on some corners, both versions have to give up on the same ones.
+        return [], {}, "gave up"
+    return replacements, edge_map, replacement_signature(replacements, edge_map)
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_ordered_matches_unordered(name, interactors, beam):
+    # The ordered active edges are only quicker, so the sweep has to come out the same as scanning the set,
+    # for the beam and for every beam it makes.
+    replacements, edge_map, ordered = _solve(interactors, beam, OrderedActiveEdges)
+    assert ordered == _solve(interactors, beam, ActiveEdges)[2]
+
+    for child, edge, left, right in replacements:
+        interactor = edge_map.get(edge)
+        if interactor is None:
+            continue
+        for sub_child in interactor.ray_hit(child, edge, left, right):
+            assert _solve(interactors, sub_child, OrderedActiveEdges, interactor)[2] == _solve(interactors, sub_child, ActiveEdges, interactor)[2]
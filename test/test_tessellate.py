@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import numpy as np
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.new import propogate_beam, propogate_beam_into
+from lux.depreciated.engine.lights.beam_light_ray import BeamLightRay
+from lux.depreciated.engine.lights.cone_light_ray import ConeLightRay
+from lux.depreciated.engine.lights.ray import Ray
+from lux.depreciated.engine.tessellate import BeamTessellator, FLOATS_PER_VERTEX, VERTICES_PER_BEAM
+from lux.depreciated.engine.tree import BeamTree
+from lux.util.colour import LuxColour
+
+from .scenes import corpus
+
+ALPHA = 0.5
+
+
+def quad() -> BeamLightRay:
+    # 100 long and 20 wide going right, with the light 500 strong at the source.
+    return BeamLightRay(
+        LuxColour.RED,
+        Ray(Vec2(0.0, 10.0), Vec2(1.0, 0.0), 100.0, 500.0),
+        Ray(Vec2(0.0, -10.0), Vec2(1.0, 0.0), 100.0, 500.0)
+    )
+
+
+def triangle() -> ConeLightRay:
+    # A cone out of the end of the quad, a quarter turn wide, so both sources are the same point.
+    return ConeLightRay(
+        LuxColour.CYAN,
+        Ray(Vec2(100.0, 0.0), Vec2(0.0, 1.0), 50.0, 400.0),
+        Ray(Vec2(100.0, 0.0), Vec2(1.0, 0.0), 30.0, 400.0)
+    )
+
+
+def vertices(tessellator: BeamTessellator) -> np.ndarray:
+    return tessellator.data.reshape(-1, VERTICES_PER_BEAM, FLOATS_PER_VERTEX)
+
+
+def test_tessellate_tree():
+    tree = BeamTree()
+    root = tree.add(quad())
+    tree.add(triangle(), root)
+
+    tessellator = BeamTessellator(capacity=1, alpha=ALPHA)
+    assert tessellator.tessellate_tree(tree) == 2
+    assert tessellator.vertices == 2 * VERTICES_PER_BEAM
+    assert tessellator.data.shape == (2 * VERTICES_PER_BEAM * FLOATS_PER_VERTEX,)
+
+    # Right source, right sink, left sink, then right source, left sink, left source.
+    quad_vertices, triangle_vertices = vertices(tessellator)
+    np.testing.assert_allclose(quad_vertices[:, 0:2], (
+        (0.0, -10.0), (100.0, -10.0), (100.0, 10.0), (0.0, -10.0), (100.0, 10.0), (0.0, 10.0)
+    ))
+    np.testing.assert_allclose(quad_vertices[:, 2:6], [(1.0, 0.0, 0.0, ALPHA)] * VERTICES_PER_BEAM)
+    np.testing.assert_allclose(quad_vertices[:, 6], (500.0, 400.0, 400.0, 500.0, 400.0, 500.0))
+
+    # Both sources are the origin, so the second triangle has no area.
+    np.testing.assert_allclose(triangle_vertices[:, 0:2], (
+        (100.0, 0.0), (130.0, 0.0), (100.0, 50.0), (100.0, 0.0), (100.0, 50.0), (100.0, 0.0)
+    ))
+    np.testing.assert_allclose(triangle_vertices[:, 2:6], [(0.0, 1.0, 1.0, ALPHA)] * VERTICES_PER_BEAM)
+    np.testing.assert_allclose(triangle_vertices[:, 6], (400.0, 370.0, 350.0, 400.0, 350.0, 400.0))
+
+
+def test_tree_matches_linked_beams():
+    # The same beams tessellated from a BeamTree and from linked LightRays, only the order they are walked in changes.
+    for _, interactors, light in corpus(10):
+        tree = BeamTree()
+        try:
+            propogate_beam_into(tree, interactors, light)
+            roots = propogate_beam(interactors, light)
+        except AssertionError:
+            continue
+
+        flat, linked = BeamTessellator(), BeamTessellator()
+        assert flat.tessellate_tree(tree) == linked.tessellate(roots) == len(tree)
+
+        flat_rows = vertices(flat).reshape(len(tree), -1)
+        linked_rows = vertices(linked).reshape(len(tree), -1)
+        np.testing.assert_allclose(np.unique(flat_rows, axis=0), np.unique(linked_rows, axis=0), rtol=1e-6)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from threading import Event
+
+import pytest
+from pyglet.math import Vec2
+
+from lux.depreciated.engine.interactors import WallRayInteractor
+from lux.depreciated.engine.new import propogate_beam
+from lux.depreciated.engine.static import StaticGeometry
+from lux.depreciated.engine.threaded import ThreadedSolver
+
+from .scenes import beam, corpus, light_signature, outcome, scene
+
+SCENES = tuple(corpus(20))
+
+
+def box(size: float) -> StaticGeometry:
+    corners = (Vec2(-size, -size), Vec2(size, -size), Vec2(size, size), Vec2(-size, size))
+    return StaticGeometry(tuple(WallRayInteractor(corners[idx - 1], corners[idx]) for idx in range(4)))
+
+
+def solve(solver: ThreadedSolver, sources=None):
+    solver.submit(sources)
+    assert solver.wait(30.0)
+    return solver.result
+
+
+@pytest.fixture
+def make_solver():
+    solvers = []
+
+    def make(*args, **kwargs) -> ThreadedSolver:
+        solvers.append(ThreadedSolver(*args, **kwargs))
+        return solvers[-1]
+
+    yield make
+    for solver in solvers:
+        solver.release()
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_matches_propogate_beam(make_solver, name, interactors, beam):
+    full = outcome(lambda: light_signature(propogate_beam(interactors, beam)))
+    if full == "gave up":
+        pytest.skip("the sweep gives up on this scene")
+
+    solver = make_solver(interactors)
+    solver.add_source(beam)
+    assert light_signature(solve(solver).beams) == full
+
+
+def test_static_walls_are_shared(make_solver):
+    static = box(800.0)
+    interactors = scene("mixed", 3)
+    light = beam(3)
+
+    solver = make_solver(interactors, static=static)
+    assert solver._clones[:len(static)] == static.walls
+    assert light_signature(solve(solver, (light,)).beams) == light_signature(propogate_beam(static.walls + interactors, light))
+
+
+def test_moves_are_solved(make_solver):
+    interactors = scene("mirrors", 5)
+    light = beam(5)
+    solver = make_solver(interactors)
+    solver.add_source(light)
+    solve(solver)
+
+    # The solver only sees the moves it was handed a snapshot of.
+    interactors[0].origin = interactors[0].origin + Vec2(40.0, -25.0)
+    interactors[1].direction = Vec2(interactors[1].direction.y, -interactors[1].direction.x)
+    assert light_signature(solve(solver).beams) == light_signature(propogate_beam(interactors, light))
+
+
+def test_result_kept_while_busy(make_solver):
+    solver = make_solver(scene("mixed", 1))
+    solver.add_source(beam(1))
+    first = solve(solver)
+
+    started, release = Event(), Event()
+    slow = solver._solve
+
+    def blocked(*args):
+        started.set()
+        release.wait()
+        return slow(*args)
+
+    solver._solve = blocked
+    frame = solver.submit()
+    assert started.wait(30.0)
+    assert solver.busy
+    assert not solver.wait(0.01)
+    assert solver.result is first
+
+    release.set()
+    assert solver.wait(30.0)
+    assert solver.result.frame == frame
+    assert solver.result.tree is not first.tree
+
+
+def test_result_kept_after_failure(make_solver):
+    solver = make_solver(scene("mixed", 2))
+    solver.add_source(beam(2))
+    first = solve(solver)
+
+    def fail(*args):
+        raise RuntimeError("the solve fell over")
+
+    solver._solve = fail
+    frame = solver.submit()
+    assert solver.wait(30.0)
+
+    # The frame still finishes so nothing waits on it forever, but with the last tree.
+    assert solver.result.frame == frame
+    assert solver.result.tree is first.tree
+    assert light_signature(solver.result.beams) == light_signature(first.beams)
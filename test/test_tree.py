@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+from lux.depreciated.engine.new import propogate_beam, propogate_beam_into
+from lux.depreciated.engine.pool import LightPool
+from lux.depreciated.engine.tree import BeamTree
+
+from .scenes import corpus, light_signature, outcome, tree_signature
+
+SCENES = tuple(corpus(100))
+
+
+@pytest.mark.parametrize("name, interactors, beam", SCENES, ids=[name for name, _, _ in SCENES])
+def test_tree_matches_linked_beams(name, interactors, beam):
+    # The flat tree is only another way of storing the same walk, so it has to hold exactly the beams
+    # propogate_beam links together.
+    linked = outcome(lambda: light_signature(propogate_beam(interactors, beam)))
+
+    def solve(tree, pool=None):
+        propogate_beam_into(tree, interactors, beam, pool=pool)
+        return tree_signature(tree)
+
+    assert outcome(lambda: solve(BeamTree(4))) == linked
+
+    # Again into a tree which has been cleared and reused, with the beams coming out of a pool.
+    tree, pool = BeamTree(4), LightPool()
+    outcome(lambda: solve(tree, pool))
+    tree.clear()
+    pool.reset()
+    assert outcome(lambda: solve(tree, pool)) == linked